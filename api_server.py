@@ -1,17 +1,33 @@
 import os
 import json
+import functools
+import hmac
+import threading
+import time
 import bcrypt
 import jwt
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
 from tv_multimidia.database import DatabaseService, TMDBDataSource, SyncService
+from tv_multimidia.image_cache import (
+    ImageCache, ImageFetchError, collect_image_urls, is_proxy_host, start_background_warm,
+)
+from tv_multimidia.logo_sprites import LOGO_SPRITE_DIR, SpriteManifest
+from tv_multimidia.tmdb_images import TMDBImageConfig
+from tv_multimidia.catalog_events import SCOPE_CHANNELS, SCOPE_SERIES, start_catalog_listener
+from tv_multimidia.cache_store import create_cache_store
+from tv_multimidia.json_codec import FastJSONProvider, FragmentCache, encode, join_object
+from tv_multimidia import metrics
+from tv_multimidia.slow_queries import slow_log
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
 app = Flask(__name__)
+# jsonify com o codificador de JSON_ENCODER (orjson por padrão; datas, Decimal e prepared.Row)
+app.json = FastJSONProvider(app)
 CORS(app)  # Permite requisições do Flutter
 
 # --- Configuração de Segurança ---
@@ -20,16 +36,217 @@ CORS(app)  # Permite requisições do Flutter
 app.config['SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'tv_multimidia_super_secret_key_fallback')
 if app.config['SECRET_KEY'] == 'tv_multimidia_super_secret_key_fallback':
     print("AVISO: Usando chave secreta de fallback. Defina a variável de ambiente JWT_SECRET_KEY em produção.")
-
-# Inicializar serviços
-db = DatabaseService()
-tmdb = TMDBDataSource()
-sync_service = SyncService(db, tmdb)
+# Rotas /api/admin/* (Authorization: Bearer <ADMIN_TOKEN>); sem ela, ficam desligadas
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# --- Serviços ---
+# Criados no primeiro uso (ou no início de cada worker, em init_worker), não no
+# import: importar o módulo não abre conexões nem lê configuração externa, e o
+# master do gunicorn (preload_app) não cria nada que os workers herdariam.
+_services = {}
+_services_lock = threading.RLock()
+# Processo (pid) que já iniciou os serviços em segundo plano e o seu listener
+_background_pid = None
+_catalog_listener = None
+
+def lazy_service(factory=None, *, background=False):
+    """
+    get_x() que cria o serviço com factory() uma única vez por processo.
+    background=True: o primeiro get_x() de cada processo também inicia os
+    serviços em segundo plano (start_background_services).
+    """
+    if factory is None:
+        return functools.partial(lazy_service, background=background)
+    name = factory.__name__
+
+    @functools.wraps(factory)
+    def get():
+        service = _services.get(name)
+        if service is None:
+            with _services_lock:
+                service = _services.get(name)
+                if service is None:
+                    service = _services[name] = factory()
+        if background and _background_pid != os.getpid():
+            start_background_services()
+        return service
+
+    # O serviço, se já foi criado (sem criar)
+    get.current = lambda: _services.get(name)
+    return get
+
+@lazy_service(background=True)
+def get_db():
+    """DatabaseService do processo, já conectado."""
+    db = DatabaseService()
+    db.connect()
+    return db
+
+@lazy_service
+def get_tmdb():
+    return TMDBDataSource()
+
+@lazy_service(background=True)
+def get_cache_store():
+    """Cache com validade por chave (CACHE_BACKEND), compartilhado com a sincronização."""
+    return create_cache_store(get_db())
+
+@lazy_service
+def get_sync():
+    return SyncService(get_db(), get_tmdb(), get_cache_store())
+
+@lazy_service
+def get_tmdb_images():
+    """Tamanhos de imagem do TMDB (/configuration, em cache) para montar as URLs por requisição."""
+    return TMDBImageConfig(get_cache_store(), get_tmdb())
+
+image_cache = ImageCache()
+sprite_manifest = SpriteManifest()
+
+# Canais por categoria já codificados em JSON, até a próxima alteração dos canais
+channel_fragments = FragmentCache()
+
+# Variantes de imagem são endereçadas pelo hash do conteúdo: podem ficar em cache "para sempre"
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# O schema só é verificado pelo /api/ready até ficar pronto (depois não muda)
+_schema_ready = False
+
+def on_series_changed(change):
+    """NOTIFY de outro processo (sync, import): descarta os detalhes de série em cache."""
+    get_db().invalidate_series_details(change['ids'])
+
+def on_channels_changed(change):
+    """NOTIFY de importação/verificação de canais: descarta as listas já codificadas."""
+    channel_fragments.invalidate()
+
+def start_background_services():
+    """
+    Listener de alterações do catálogo (uma conexão LISTEN por processo da API)
+    e limpeza periódica das chaves vencidas do cache. Roda uma vez por processo
+    (pid), chamada pelo primeiro get_db()/get_cache_store(): threads não
+    sobrevivem ao fork, então cada worker inicia os seus. Retorna o listener.
+    """
+    global _background_pid, _catalog_listener
+    pid = os.getpid()
+    with _services_lock:
+        if _background_pid == pid:
+            return _catalog_listener
+        # Marcado antes: os get_db()/get_cache_store() abaixo não entram aqui de novo
+        _background_pid = pid
+        try:
+            get_cache_store().start_sweeper()
+        except BaseException:
+            _background_pid = None  # Banco fora do ar: a próxima chamada tenta de novo
+            raise
+        _catalog_listener = start_catalog_listener(get_db().conn_string(), [
+            (SCOPE_SERIES, on_series_changed),
+            (SCOPE_CHANNELS, on_channels_changed),
+        ])
+        return _catalog_listener
+
+def catalog_listener():
+    """Listener do catálogo deste processo, se já foi iniciado."""
+    return _catalog_listener if _background_pid == os.getpid() else None
+
+def init_worker():
+    """
+    Aquecimento: cria os serviços, abre as conexões do processo e inicia os
+    serviços em segundo plano antes da primeira requisição. No gunicorn roda
+    depois do fork de cada worker (post_fork em gunicorn.conf.py); sem ela
+    (outro servidor WSGI, ou se falhar), tudo é criado e iniciado no primeiro
+    get_db()/get_cache_store().
+    """
+    get_db()
+    return start_background_services()
+
+def arg_flag(name):
+    """Lê um parâmetro booleano da query string (?nome=1/true/yes)."""
+    return request.args.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+def page_args():
+    """Lê ?page= e ?limit= (o banco limita o tamanho máximo da página)."""
+    return {
+        'page': max(1, request.args.get('page', 1, type=int)),
+        'limit': max(1, request.args.get('limit', 20, type=int)),
+    }
+
+def paginated(results, has_more):
+    """Resposta padrão das listagens paginadas."""
+    args = page_args()
+    return {"page": args['page'], "results": results, "hasMore": has_more}
+
+def json_fragment_response(body):
+    """Resposta com um JSON já codificado (bytes), sem passar pelo jsonify."""
+    return app.response_class(body + b'\n', mimetype='application/json')
+
+def with_image_urls(rows):
+    """
+    Monta imageUrls de filmes/séries no tamanho pedido em ?size=
+    (ex: w185 no celular, w342 na TV; padrão w500).
+    """
+    return get_tmdb_images().apply_to_rows(rows, request.args.get('size'))
+
+@app.teardown_request
+def reset_failed_transaction(exc):
+    """Uma consulta que falhou não deixa a conexão da thread inutilizada para as próximas."""
+    db = get_db.current()
+    if db is not None:
+        db.reset_failed_transaction()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Latência, status e tamanho da resposta por rota (a regra, ex: /api/series/<int:series_id>)."""
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics_endpoint':
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code,
+                                time.perf_counter() - started, response.content_length)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métricas no formato do Prometheus (ver tv_multimidia/metrics.py)"""
+    body, content_type = metrics.render()
+    return app.response_class(body, content_type=content_type)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Verifica se a API está funcionando"""
-    return jsonify({"status": "OK", "timestamp": datetime.now().isoformat()})
+    """Verifica se a API está funcionando (sem tocar no banco: ver /api/ready)"""
+    status = {"status": "OK", "timestamp": datetime.now().isoformat()}
+    db = get_db.current()
+    if db is not None and len(db.replicas):
+        status["replicas"] = db.replicas.status()
+    return jsonify(status)
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """
+    Pronto para receber tráfego (probe de readiness do balanceador/orquestrador):
+    a conexão com o banco desta thread responde e o schema já tem tudo que a
+    API usa. 503 com o motivo enquanto não estiver.
+    """
+    global _schema_ready
+    checks = {}
+    try:
+        db = get_db()
+        db.ping()
+        checks["database"] = "OK"
+        if not _schema_ready:
+            missing = db.missing_schema_objects()
+            _schema_ready = not missing
+        checks["schema"] = "OK" if _schema_ready else {"missing": missing}
+    except Exception as e:
+        checks["schema" if "database" in checks else "database"] = str(e)
+    ready = checks.get("schema") == "OK"
+    if ready and len(db.replicas):
+        # Informativo: sem réplicas saudáveis as leituras vão para o primário
+        checks["replicas"] = db.replicas.status()
+    return jsonify({"status": "READY" if ready else "NOT_READY", "checks": checks}), 200 if ready else 503
 
 # --- Rotas de Filmes ---
 
@@ -39,8 +256,8 @@ def get_movies():
     try:
         # AVISO: Retornar TODOS os filmes é ineficiente.
         # Considere paginação (ex: ?page=1&limit=20)
-        movies = db.get_all_movies()
-        return jsonify(movies)
+        movies = get_db().get_all_movies()
+        return jsonify(with_image_urls(movies))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -50,8 +267,8 @@ def get_trending_movies():
     try:
         # Eficiente: Pede ao DB apenas os 20 filmes em alta.
         # Você precisará criar esta função em database.py
-        movies = db.get_trending_movies(limit=20)
-        return jsonify(movies)
+        movies = get_db().get_trending_movies(limit=20)
+        return jsonify(with_image_urls(movies))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -61,8 +278,17 @@ def get_popular_movies():
     try:
         # Eficiente: Pede ao DB apenas os 20 filmes populares.
         # Você precisará criar esta função em database.py
-        movies = db.get_popular_movies(limit=20)
-        return jsonify(movies)
+        movies = get_db().get_popular_movies(limit=20)
+        return jsonify(with_image_urls(movies))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/movies/genre/<int:genre_id>', methods=['GET'])
+def get_movies_by_genre(genre_id):
+    """Filmes de um gênero, por popularidade (?page=1&limit=20)"""
+    try:
+        movies, has_more = get_db().get_movies_by_genre(genre_id, **page_args())
+        return jsonify(paginated(with_image_urls(movies), has_more))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -73,8 +299,8 @@ def get_series():
     """Retorna todas as séries (Use paginação em produção)"""
     try:
         # AVISO: Ineficiente. Considere paginação.
-        series = db.get_all_tv_series()
-        return jsonify(series)
+        series = get_db().get_all_tv_series()
+        return jsonify(with_image_urls(series))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -84,8 +310,8 @@ def get_trending_series():
     try:
         # Eficiente: Pede ao DB apenas as 20 séries em alta.
         # Você precisará criar esta função em database.py
-        series = db.get_trending_series(limit=20)
-        return jsonify(series)
+        series = get_db().get_trending_series(limit=20)
+        return jsonify(with_image_urls(series))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -95,11 +321,38 @@ def get_popular_series():
     try:
         # Eficiente: Pede ao DB apenas as 20 séries populares.
         # Você precisará criar esta função em database.py
-        series = db.get_popular_series(limit=20)
+        series = get_db().get_popular_series(limit=20)
+        return jsonify(with_image_urls(series))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/series/<int:series_id>', methods=['GET'])
+def get_series_details(series_id):
+    """Série com temporadas e episódios (?size= para as imagens)"""
+    try:
+        details = get_db().get_series_details(series_id)
+        if details is None:
+            return jsonify({"error": "Série não encontrada"}), 404
+
+        # O objeto em cache é compartilhado: as URLs (dependentes de ?size=) vão em cópias
+        series = dict(details)
+        series['seasons'] = [dict(season) for season in details['seasons']]
+        for season in series['seasons']:
+            season['episodes'] = with_image_urls([dict(episode) for episode in season['episodes']])
+        with_image_urls([series] + series['seasons'])
         return jsonify(series)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/series/genre/<int:genre_id>', methods=['GET'])
+def get_series_by_genre(genre_id):
+    """Séries de um gênero, por popularidade (?page=1&limit=20)"""
+    try:
+        series, has_more = get_db().get_series_by_genre(genre_id, **page_args())
+        return jsonify(paginated(with_image_urls(series), has_more))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # --- Rotas de Canais ---
 
 @app.route('/api/channels', methods=['GET'])
@@ -108,7 +361,7 @@ def get_channels():
     try:
         # AVISO: Esta rota é a causa da lentidão na aba TV.
         # O app Flutter deve buscar canais por categoria.
-        channels = db.get_all_channels()
+        channels = get_db().get_all_channels()
         return jsonify(channels)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -119,33 +372,116 @@ def get_channel_categories():
     try:
         # Eficiente: Pede ao DB apenas a lista de categorias únicas.
         # Você precisará criar esta função em database.py (ex: SELECT DISTINCT category FROM channels)
-        categories = db.get_distinct_categories()
+        categories = get_db().get_distinct_categories()
         return jsonify(categories)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/channels/category/<string:category>', methods=['GET'])
 def get_channels_by_category(category):
-    """RECOMENDAÇÃO: Retorna canais por categoria diretamente do DB"""
+    """
+    RECOMENDAÇÃO: Retorna canais por categoria diretamente do DB.
+    ?hide_dead=1 omite streams verificados como fora do ar;
+    ?rank=health lista os online primeiro.
+    ?sprite=1 retorna {"channels": [...], "sprite": {...}} com o atlas dos
+    logos da categoria e as coordenadas de cada logo (chaveadas pelo logopath).
+    """
     try:
-        # Eficiente: Pede ao DB apenas os canais daquela categoria.
-        # Você precisará criar esta função em database.py (ex: SELECT * FROM channels WHERE category = ?)
-        filtered_channels = db.get_channels_by_category(category)
-        return jsonify(filtered_channels)
+        hide_dead = arg_flag('hide_dead')
+        rank_by_health = request.args.get('rank') == 'health'
+        # Eficiente: Pede ao DB apenas os canais daquela categoria, e só na primeira
+        # vez; as próximas juntam a lista já codificada (até importar/verificar canais)
+        channels = channel_fragments.get(
+            (category, hide_dead, rank_by_health),
+            lambda: get_db().get_channels_by_category(category, hide_dead=hide_dead, rank_by_health=rank_by_health)
+        )
+        if arg_flag('sprite'):
+            return json_fragment_response(join_object([
+                ("channels", channels), ("sprite", encode(sprite_info(category))),
+            ]))
+        return json_fragment_response(channels)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- Proxy de Imagens ---
+
+@app.route('/api/images', methods=['GET'])
+def get_image():
+    """
+    Proxy de logos/pôsteres com cache local: ?url=<origem>&w=<largura>.
+    A origem é baixada uma única vez; a resposta é uma variante WebP
+    redimensionada (92, 185, 342 ou 500 px de largura).
+    Só imagens do catálogo: hosts de IMAGE_PROXY_HOSTS (TMDB) ou logos de canais.
+    """
+    url = request.args.get('url', '').strip()
+    if not url.lower().startswith(('http://', 'https://')):
+        return jsonify({"error": "Parâmetro 'url' (http/https) é obrigatório"}), 400
+    if image_cache.cached_hash(url) is None and not is_proxy_host(url) and not get_db().is_catalog_logo(url):
+        return jsonify({"error": "URL fora do catálogo de imagens"}), 403
+
+    try:
+        path, content_hash, width = image_cache.get(url, request.args.get('w', type=int))
+    except ImageFetchError as e:
+        return jsonify({"error": str(e)}), 502
+
+    response = send_file(path, mimetype='image/webp', etag=f'{content_hash}-w{width}', conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+# --- Sprites de Logos ---
+
+def sprite_info(category):
+    """Atlas da categoria para a resposta da API, ou None se ainda não foi gerado."""
+    entry = sprite_manifest.get(category)
+    if not entry:
+        return None
+    return {
+        "url": f"/api/sprites/{entry['file']}",
+        "cellWidth": entry['cellWidth'],
+        "cellHeight": entry['cellHeight'],
+        "offsets": entry['offsets'],
+    }
+
+@app.route('/api/sprites/<path:filename>', methods=['GET'])
+def get_sprite(filename):
+    """Atlas de logos (o nome inclui o digest do conteúdo, então é imutável)."""
+    response = send_from_directory(LOGO_SPRITE_DIR, filename, mimetype='image/webp', conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
 # --- Rotas de Sincronização ---
 
 @app.route('/api/sync', methods=['POST'])
 def sync_data():
     """Sincroniza dados com TMDB"""
     try:
-        sync_service.force_sync()
+        get_sync().force_sync()
+        # Aquece o cache de imagens em segundo plano com os pôsteres/logos novos
+        start_background_warm(collect_image_urls(get_db(), get_tmdb_images()), image_cache)
         return jsonify({"message": "Sincronização concluída com sucesso"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- Rotas de Administração ---
+
+def admin_authorized():
+    """Confere o token de admin (comparação em tempo constante)."""
+    header = request.headers.get('Authorization', '')
+    token = header[len('Bearer '):] if header.startswith('Bearer ') else ''
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """
+    Consultas lentas recentes deste worker e os planos (EXPLAIN ANALYZE)
+    das amostradas, mais novos primeiro (ver tv_multimidia/slow_queries.py).
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Rotas de administração desligadas (defina ADMIN_TOKEN)"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Não autorizado"}), 401
+    return jsonify(slow_log.snapshot())
+
 # --- Rotas de Usuário (Segurança Aplicada) ---
 
 @app.route('/api/users/login', methods=['POST'])
@@ -159,7 +495,7 @@ def login_user():
         if not email or not password:
             return jsonify({"error": "Email e senha são obrigatórios"}), 400
 
-        user = db.get_user_by_email(email)
+        user = get_db().get_user_by_email(email)
 
         # RECOMENDAÇÃO DE SEGURANÇA (Bcrypt):
         # Verifica se o usuário existe E se a senha bate com o hash no banco.
@@ -217,7 +553,7 @@ def register_user():
         if not name or not email or not password:
             return jsonify({"error": "Nome, email e senha são obrigatórios"}), 400
 
-        if db.get_user_by_email(email):
+        if get_db().get_user_by_email(email):
             return jsonify({"error": "Email já cadastrado"}), 400
 
         # RECOMENDAÇÃO DE SEGURANÇA (Bcrypt):
@@ -225,7 +561,7 @@ def register_user():
         password_hash_bytes = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
         password_hash = password_hash_bytes.decode('utf-8') # Salva como string
 
-        user_id = db.create_user(name, email, password_hash, installation_id, android_id)
+        user_id = get_db().create_user(name, email, password_hash, installation_id, android_id)
 
         user_data = {
             "id": user_id,
@@ -255,8 +591,8 @@ def register_user():
 def get_user_movie_list():
     """Retorna lista de filmes do usuário (MOCK)"""
     try:
-        movies = db.get_all_movies()
-        return jsonify(movies[:10])
+        movies = get_db().get_all_movies()
+        return jsonify(with_image_urls(movies[:10]))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -264,8 +600,8 @@ def get_user_movie_list():
 def get_user_series_list():
     """Retorna lista de séries do usuário (MOCK)"""
     try:
-        series = db.get_all_tv_series()
-        return jsonify(series[:10])
+        series = get_db().get_all_tv_series()
+        return jsonify(with_image_urls(series[:10]))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -273,8 +609,8 @@ def get_user_series_list():
 def get_user_favorite_movies():
     """Retorna filmes favoritos do usuário (MOCK)"""
     try:
-        movies = db.get_all_movies()
-        return jsonify(movies[:5])
+        movies = get_db().get_all_movies()
+        return jsonify(with_image_urls(movies[:5]))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -282,15 +618,16 @@ def get_user_favorite_movies():
 def get_user_favorite_series():
     """Retorna séries favoritas do usuário (MOCK)"""
     try:
-        series = db.get_all_tv_series()
-        return jsonify(series[:5])
+        series = get_db().get_all_tv_series()
+        return jsonify(with_image_urls(series[:5]))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
-    # Conectar ao banco
-    db.connect()
-    db.create_tables()
+    # Servidor de desenvolvimento (reloader e debugger). Em produção:
+    #   gunicorn -c gunicorn.conf.py api_server:app
+    init_worker()
+    get_db().create_tables()
 
     # Iniciar servidor
     print("Iniciando API REST na porta 5000...")
@@ -0,0 +1,235 @@
+"""
+API de leitura do catálogo em asyncio (aiohttp), para muitas conexões ociosas.
+
+Atende as mesmas rotas de leitura do api_server.py (listas, gêneros,
+detalhes de séries, categorias e canais), com as mesmas respostas, mas cada
+requisição esperando o banco é só uma corrotina: milhares de TVs com
+keep-alive aberto ou consultas lentas não ocupam threads e não atrasam o
+/api/health. O banco é acessado pelo AsyncDatabaseService, que usa as
+mesmas consultas do DatabaseService.
+
+Login, cadastro, sincronização e proxy de imagens continuam no api_server.py
+(o proxy no nginx/balanceador pode mandar só as rotas abaixo para cá).
+
+Uso:
+    python async_api.py                (porta ASYNC_API_PORT, padrão 5001)
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from tv_multimidia.async_database import AsyncDatabaseService
+from tv_multimidia.database import DatabaseService
+from tv_multimidia.json_codec import dumps
+from tv_multimidia.logo_sprites import SpriteManifest
+from tv_multimidia import metrics
+from tv_multimidia.tmdb_images import TMDB_CONFIG_CACHE_KEY, TMDBImageConfig
+
+# Carrega variáveis de ambiente do arquivo .env
+load_dotenv()
+
+ASYNC_API_PORT = int(os.environ.get('ASYNC_API_PORT', 5001))
+# Segundos que uma conexão keep-alive ociosa fica aberta (TVs reusam a conexão entre telas)
+ASYNC_KEEPALIVE_TIMEOUT = float(os.environ.get('ASYNC_KEEPALIVE_TIMEOUT', 75))
+# Intervalo (segundos) para reler os tamanhos de imagem do TMDB gravados pelo api_server
+IMAGE_CONFIG_REFRESH = 300
+
+db = AsyncDatabaseService(DatabaseService(read_dsns=[]).conn_string())
+tmdb_images = TMDBImageConfig()
+sprite_manifest = SpriteManifest()
+
+
+def json_response(data, status=200):
+    """Mesmo JSON do jsonify do api_server.py (json_codec)."""
+    return web.Response(body=dumps(data), status=status, content_type='application/json')
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Latência, status e tamanho da resposta por rota, como no api_server.py."""
+    started = time.perf_counter()
+    status, size = 500, None
+    try:
+        response = await handler(request)
+        status, size = response.status, response.content_length
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        if resource is None or resource.canonical != '/metrics':
+            route = resource.canonical if resource is not None else 'unmatched'
+            metrics.observe_request(route, request.method, status, time.perf_counter() - started, size)
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    """Erros inesperados viram {"error": ...} com status 500, como no api_server.py."""
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+def arg_flag(request, name):
+    """Lê um parâmetro booleano da query string (?nome=1/true/yes)."""
+    return request.query.get(name, '').strip().lower() in ('1', 'true', 'yes', 'sim')
+
+
+def arg_int(request, name, default):
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+
+def page_args(request):
+    """Lê ?page= e ?limit= (o banco limita o tamanho máximo da página)."""
+    return {
+        'page': max(1, arg_int(request, 'page', 1)),
+        'limit': max(1, arg_int(request, 'limit', 20)),
+    }
+
+
+def paginated(request, results, has_more):
+    """Resposta padrão das listagens paginadas."""
+    return {"page": page_args(request)['page'], "results": results, "hasMore": has_more}
+
+
+def with_image_urls(request, rows):
+    """Monta imageUrls no tamanho pedido em ?size= (ver api_server.with_image_urls)."""
+    return tmdb_images.apply_to_rows(rows, request.query.get('size'))
+
+
+def sprite_info(category):
+    """Atlas da categoria para a resposta da API, ou None se ainda não foi gerado."""
+    entry = sprite_manifest.get(category)
+    if not entry:
+        return None
+    return {
+        "url": f"/api/sprites/{entry['file']}",
+        "cellWidth": entry['cellWidth'],
+        "cellHeight": entry['cellHeight'],
+        "offsets": entry['offsets'],
+    }
+
+
+routes = web.RouteTableDef()
+
+
+@routes.get('/api/health')
+async def health_check(request):
+    """Verifica se a API está funcionando"""
+    return json_response({"status": "OK", "timestamp": datetime.now().isoformat()})
+
+
+@routes.get('/api/movies/trending')
+async def get_trending_movies(request):
+    return json_response(with_image_urls(request, await db.get_trending_movies(limit=20)))
+
+
+@routes.get('/api/movies/popular')
+async def get_popular_movies(request):
+    return json_response(with_image_urls(request, await db.get_popular_movies(limit=20)))
+
+
+@routes.get(r'/api/movies/genre/{genre_id:\d+}')
+async def get_movies_by_genre(request):
+    movies, has_more = await db.get_movies_by_genre(int(request.match_info['genre_id']), **page_args(request))
+    return json_response(paginated(request, with_image_urls(request, movies), has_more))
+
+
+@routes.get('/api/series/trending')
+async def get_trending_series(request):
+    return json_response(with_image_urls(request, await db.get_trending_series(limit=20)))
+
+
+@routes.get('/api/series/popular')
+async def get_popular_series(request):
+    return json_response(with_image_urls(request, await db.get_popular_series(limit=20)))
+
+
+@routes.get(r'/api/series/{series_id:\d+}')
+async def get_series_details(request):
+    """Série com temporadas e episódios (?size= para as imagens)"""
+    series = await db.get_series_details(int(request.match_info['series_id']))
+    if series is None:
+        return json_response({"error": "Série não encontrada"}, 404)
+    for season in series['seasons']:
+        with_image_urls(request, season['episodes'])
+    with_image_urls(request, [series] + series['seasons'])
+    return json_response(series)
+
+
+@routes.get(r'/api/series/genre/{genre_id:\d+}')
+async def get_series_by_genre(request):
+    series, has_more = await db.get_series_by_genre(int(request.match_info['genre_id']), **page_args(request))
+    return json_response(paginated(request, with_image_urls(request, series), has_more))
+
+
+@routes.get('/api/channels/categories')
+async def get_channel_categories(request):
+    return json_response(await db.get_distinct_categories())
+
+
+@routes.get('/api/channels/category/{category}')
+async def get_channels_by_category(request):
+    """?hide_dead=1, ?rank=health e ?sprite=1 como no api_server.py."""
+    category = request.match_info['category']
+    channels = await db.get_channels_by_category(
+        category,
+        hide_dead=arg_flag(request, 'hide_dead'),
+        rank_by_health=request.query.get('rank') == 'health'
+    )
+    if arg_flag(request, 'sprite'):
+        return json_response({"channels": channels, "sprite": sprite_info(category)})
+    return json_response(channels)
+
+
+@routes.get('/metrics')
+async def metrics_endpoint(request):
+    """Métricas no formato do Prometheus (ver tv_multimidia/metrics.py)"""
+    body, content_type = metrics.render()
+    return web.Response(body=body, headers={'Content-Type': content_type})
+
+
+async def refresh_image_config(app):
+    """Relê periodicamente a configuração de imagens do TMDB do cache compartilhado."""
+    while True:
+        try:
+            tmdb_images.prime(await db.get_cache(TMDB_CONFIG_CACHE_KEY))
+        except Exception as e:
+            print(f"Erro ao ler a configuração de imagens do TMDB (usando padrão): {e}")
+        await asyncio.sleep(IMAGE_CONFIG_REFRESH)
+
+
+async def on_startup(app):
+    await db.ping()
+    app['image_config_task'] = asyncio.create_task(refresh_image_config(app))
+
+
+async def on_cleanup(app):
+    app['image_config_task'].cancel()
+    db.close()
+
+
+def create_app():
+    app = web.Application(middlewares=[metrics_middleware, error_middleware])
+    app.add_routes(routes)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    print(f"Iniciando API assíncrona na porta {ASYNC_API_PORT}...")
+    web.run_app(create_app(), host='0.0.0.0', port=ASYNC_API_PORT,
+                keepalive_timeout=ASYNC_KEEPALIVE_TIMEOUT, backlog=4096, print=None)
@@ -1,20 +1,208 @@
 #!/usr/bin/env python3
 """
 Script para verificar URLs de logos na tabela channels
+
+Uso:
+    python check_logos.py                 # Contagem de logos preenchidos/vazios
+    python check_logos.py --validate      # Testa todas as URLs de logo distintas
+    python check_logos.py --validate --report logos_report.csv
 """
 
+import argparse
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import psycopg2
+import psycopg2.extras
+import requests
+
+from tv_multimidia.catalog_events import SCOPE_CHANNELS, publish_catalog_change
+
+# Configurações do PostgreSQL (usa variáveis de ambiente, com fallback)
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': os.environ.get('DB_PORT', 5432),
+    'dbname': os.environ.get('DB_NAME', 'tv_multimidia'),
+    'user': os.environ.get('DB_USER', 'tv_user'),
+    'password': os.environ.get('DB_PASSWORD', 'tv_password'),
+}
+
+# --- Validador de URLs ---
+# Número máximo de URLs testadas ao mesmo tempo
+VALIDATE_WORKERS = int(os.environ.get('LOGO_VALIDATE_WORKERS', 32))
+# Timeout (conexão, leitura) em segundos
+VALIDATE_TIMEOUT = (5, 10)
+# Resultado guardado em logo_health é reaproveitado por este tempo (segundos)
+VALIDATE_TTL = int(os.environ.get('LOGO_VALIDATE_TTL', 24 * 60 * 60))
+# Falhas passageiras (timeout, 429, 5xx) são testadas de novo bem antes
+VALIDATE_ERROR_TTL = int(os.environ.get('LOGO_VALIDATE_ERROR_TTL', 15 * 60))
+# Acima desta latência o logo é marcado como lento (mas continua sendo usado)
+SLOW_LOGO_MS = int(os.environ.get('LOGO_SLOW_MS', 2000))
+# Não baixa mais que isto por logo (o resto é descartado, o tamanho fica como "pelo menos")
+MAX_LOGO_BYTES = 5 * 1024 * 1024
+
+STATUS_OK = 'ok'
+STATUS_SLOW = 'slow'
+STATUS_DEAD = 'dead'
+# Falha que pode ser passageira: não troca o logo pelo placeholder
+STATUS_ERROR = 'error'
+# Respostas que dizem que o logo não existe mais
+DEAD_HTTP_STATUSES = (404, 410)
+
+_thread_local = threading.local()
+
+
+def _session():
+    """Uma sessão HTTP por thread (reaproveita conexões keep-alive)."""
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
+
+
+def probe_logo(url, timeout=VALIDATE_TIMEOUT):
+    """
+    Baixa o logo e retorna (status, http_status, size_bytes, latency_ms).
+    É 'dead' só com falha definitiva (404/410, corpo vazio ou que não é
+    imagem); timeout, conexão recusada e os outros status (429, 5xx...) são 'error'.
+    """
+    inicio = time.perf_counter()
+    try:
+        with _session().get(url, stream=True, timeout=timeout) as response:
+            size = 0
+            if response.status_code == 200:
+                for chunk in response.iter_content(64 * 1024):
+                    size += len(chunk)
+                    if size >= MAX_LOGO_BYTES:
+                        break
+            latency_ms = int((time.perf_counter() - inicio) * 1000)
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code in DEAD_HTTP_STATUSES:
+                return STATUS_DEAD, response.status_code, size, latency_ms
+            if response.status_code != 200:
+                return STATUS_ERROR, response.status_code, size, latency_ms
+            if size == 0 or content_type.startswith(('text/', 'application/json')):
+                return STATUS_DEAD, response.status_code, size, latency_ms
+            status = STATUS_SLOW if latency_ms > SLOW_LOGO_MS else STATUS_OK
+            return status, response.status_code, size, latency_ms
+    except requests.RequestException:
+        return STATUS_ERROR, None, None, int((time.perf_counter() - inicio) * 1000)
+
+
+def validate_logo_urls(urls, workers=VALIDATE_WORKERS, timeout=VALIDATE_TIMEOUT):
+    """
+    Testa as URLs com um pool limitado de threads.
+    Retorna {url: (status, http_status, size_bytes, latency_ms)}.
+    """
+    urls = list(dict.fromkeys(urls))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda url: probe_logo(url, timeout), urls)
+        return dict(zip(urls, results))
+
+
+def create_logo_health_table(cursor):
+    """Tabela com o último resultado de validação de cada URL de logo."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logo_health(
+            url TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            httpStatus INTEGER,
+            sizeBytes INTEGER,
+            latencyMs INTEGER,
+            checkedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def urls_to_validate(cursor, ttl=VALIDATE_TTL, error_ttl=VALIDATE_ERROR_TTL):
+    """URLs de logo distintas que ainda não foram testadas dentro do TTL (error_ttl para as falhas passageiras)."""
+    cursor.execute('''
+        SELECT DISTINCT c.logopath
+        FROM channels c
+        LEFT JOIN logo_health lh ON lh.url = c.logopath
+        WHERE c.logopath IS NOT NULL AND c.logopath != ''
+          AND (lh.checkedAt IS NULL OR lh.checkedAt < NOW() - make_interval(
+                secs => CASE WHEN lh.status = %s THEN %s ELSE %s END))
+    ''', (STATUS_ERROR, error_ttl, ttl))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def save_logo_health(cursor, results):
+    """Grava o resultado da validação em lote."""
+    psycopg2.extras.execute_values(cursor, '''
+        INSERT INTO logo_health (url, status, httpStatus, sizeBytes, latencyMs, checkedAt)
+        VALUES %s
+        ON CONFLICT (url) DO UPDATE SET
+            status = EXCLUDED.status,
+            httpStatus = EXCLUDED.httpStatus,
+            sizeBytes = EXCLUDED.sizeBytes,
+            latencyMs = EXCLUDED.latencyMs,
+            checkedAt = EXCLUDED.checkedAt
+    ''', [(url,) + result for url, result in results.items()],
+        template='(%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)', page_size=1000)
+
+
+def write_report(cursor, path):
+    """Exporta o estado de todos os logos (uma linha por URL, com os canais que a usam)."""
+    cursor.execute('''
+        SELECT lh.url, lh.status, lh.httpStatus, lh.sizeBytes, lh.latencyMs, lh.checkedAt,
+               COUNT(c.id) AS canais
+        FROM logo_health lh
+        JOIN channels c ON c.logopath = lh.url
+        GROUP BY lh.url
+        ORDER BY lh.status, lh.latencyMs DESC NULLS LAST
+    ''')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url', 'status', 'http_status', 'size_bytes', 'latency_ms', 'checked_at', 'canais'])
+        writer.writerows(cursor.fetchall())
+    print(f"Relatório salvo em: {path}")
+
+
+def validate_logos(report_path=None, workers=VALIDATE_WORKERS):
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("=== VALIDAÇÃO DAS URLs DE LOGO ===")
+        print()
+
+        create_logo_health_table(cursor)
+        urls = urls_to_validate(cursor)
+        print(f"URLs a testar (sem resultado válido nas últimas {VALIDATE_TTL // 3600}h): {len(urls)}")
+
+        inicio = time.perf_counter()
+        results = validate_logo_urls(urls, workers=workers)
+        elapsed = time.perf_counter() - inicio
+        if results:
+            save_logo_health(cursor, results)
+            # Logos quebrados mudam as respostas de canais (placeholder) já em cache na API
+            publish_catalog_change(cursor, SCOPE_CHANNELS)
+        conn.commit()
+
+        cursor.execute('SELECT status, COUNT(*), AVG(latencyMs)::int, SUM(sizeBytes) FROM logo_health GROUP BY status ORDER BY status')
+        print(f"Testadas agora: {len(results)} em {elapsed:.1f}s ({workers} em paralelo)")
+        print()
+        print("=== SITUAÇÃO DOS LOGOS (incluindo resultados em cache) ===")
+        for status, total, latencia_media, bytes_total in cursor.fetchall():
+            print(f"{status}: {total} URLs | latência média {latencia_media}ms | {(bytes_total or 0) / 1024:.0f} KB")
+
+        if report_path:
+            write_report(cursor, report_path)
+
+        cursor.close()
+        conn.close()
+
+    except Exception as e:
+        print(f"Erro: {e}")
+
 
 def check_logos():
     try:
         # Conexão simples
-        conn = psycopg2.connect(
-            host="localhost",
-            port=5432,
-            dbname="tv_multimidia",
-            user="tv_user",
-            password="tv_password"
-        )
+        conn = psycopg2.connect(**DB_CONFIG)
 
         cursor = conn.cursor()
 
@@ -56,4 +244,13 @@ def check_logos():
         print(f"Erro: {e}")
 
 if __name__ == "__main__":
-    check_logos()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Verificação dos logos dos canais")
+    parser.add_argument('--validate', action='store_true', help='Testa as URLs de logo e grava o resultado em logo_health')
+    parser.add_argument('--report', help='Caminho do relatório CSV (com --validate)')
+    parser.add_argument('--workers', type=int, default=VALIDATE_WORKERS, help='URLs testadas em paralelo')
+    args = parser.parse_args()
+
+    if args.validate:
+        validate_logos(args.report, args.workers)
+    else:
+        check_logos()
@@ -0,0 +1,118 @@
+"""
+Configuração do gunicorn (servidor de produção da API).
+
+    gunicorn -c gunicorn.conf.py api_server:app
+
+Workers pré-forkados (processos), cada um com um pool de threads (gthread).
+O app é carregado uma vez no master (preload_app) e os workers herdam o
+código já importado; as conexões com o banco, o listener do catálogo e a
+limpeza do cache são criados em cada worker no primeiro uso, e adiantados
+para logo depois do fork (post_fork); importar o app não cria nenhum serviço.
+Cada thread usa sua própria conexão com o primário e cada worker abre mais
+três (listener do catálogo, limpeza do cache e EXPLAIN das consultas lentas):
+conte com até workers x (threads + 3) conexões por contêiner. O número padrão
+de workers cabe em DB_MAX_CONNECTIONS; o max_connections padrão do PostgreSQL
+é 100 e o restante fica para a API assíncrona, scripts e administração.
+
+No SIGTERM (docker stop) os workers param de aceitar conexões e terminam as
+requisições em andamento por até GUNICORN_GRACEFUL_TIMEOUT segundos.
+
+Configuração (variáveis de ambiente):
+    PORT / GUNICORN_BIND        endereço (padrão 0.0.0.0:5000)
+    WEB_CONCURRENCY             workers (padrão núcleos + 1, limitado por DB_MAX_CONNECTIONS)
+    DB_MAX_CONNECTIONS          conexões com o primário reservadas para este contêiner (padrão 80)
+    GUNICORN_THREADS            threads por worker (padrão 4)
+    GUNICORN_TIMEOUT            segundos sem resposta antes de reiniciar um worker
+    GUNICORN_GRACEFUL_TIMEOUT   segundos para terminar as requisições ao parar
+    GUNICORN_KEEPALIVE          segundos de keep-alive entre requisições
+    GUNICORN_MAX_REQUESTS       reinicia o worker após N requisições (0 = nunca)
+    PROMETHEUS_MULTIPROC_DIR    arquivos das métricas dos workers (padrão: diretório temporário)
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Uma conexão por thread + listener do catálogo, limpeza do cache e EXPLAIN
+CONNECTIONS_PER_WORKER = threads + 3
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 80))
+workers = int(os.environ.get('WEB_CONCURRENCY', max(
+    1, min(multiprocessing.cpu_count() + 1, DB_MAX_CONNECTIONS // CONNECTIONS_PER_WORKER))))
+worker_class = 'gthread'
+preload_app = True
+
+# /api/sync roda a sincronização com o TMDB na própria requisição
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+# Métricas do /metrics somadas entre os workers (tv_multimidia/metrics.py): cada
+# processo grava as suas em arquivos neste diretório. Precisa estar no ambiente
+# antes do import do app (o prometheus_client escolhe o modo no import)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='tv_multimidia_metrics_'))
+
+
+def on_starting(server):
+    """Descarta as métricas de uma execução anterior no mesmo diretório."""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.db'):
+            os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    """Master, antes do primeiro fork: cria/atualiza as tabelas uma única vez."""
+    from tv_multimidia.database import DatabaseService
+
+    if workers * CONNECTIONS_PER_WORKER > DB_MAX_CONNECTIONS:
+        server.log.warning(
+            "%s workers x %s conexões passam de DB_MAX_CONNECTIONS=%s: sob carga o "
+            "PostgreSQL pode recusar conexões (too many clients)",
+            workers, CONNECTIONS_PER_WORKER, DB_MAX_CONNECTIONS)
+
+    # Conexão própria e descartável: os serviços do app só são criados nos
+    # workers (um socket herdado seria compartilhado entre processos)
+    db = DatabaseService()
+    db.connect()
+    try:
+        db.create_tables()
+    finally:
+        db.close()
+
+
+def post_fork(server, worker):
+    """Aquecimento do worker; se o banco estiver fora do ar, a primeira requisição tenta de novo."""
+    import api_server
+
+    try:
+        api_server.init_worker()
+    except Exception as e:
+        server.log.warning("Worker %s sem aquecimento (%s); serviços iniciados no primeiro uso", worker.pid, e)
+        return
+    server.log.info("Worker %s pronto (%s threads)", worker.pid, threads)
+
+
+def child_exit(server, worker):
+    """Master: o worker encerrado deixa de contar nos gauges de conexões/consultas em andamento."""
+    from tv_multimidia import metrics
+
+    metrics.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    import api_server
+
+    listener = api_server.catalog_listener()
+    if listener is not None:
+        listener.stop()
+    db = api_server.get_db.current()
+    if db is not None:
+        db.close()
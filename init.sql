@@ -11,12 +11,19 @@ CREATE TABLE IF NOT EXISTS movies(
     voteAverage REAL,
     voteCount INTEGER,
     genreIds TEXT,
+    genres INTEGER[] GENERATED ALWAYS AS (
+        CASE WHEN genreIds ~ '^[0-9]+(,[0-9]+)*$'
+             THEN string_to_array(genreIds, ',')::INTEGER[]
+             ELSE '{}'::INTEGER[] END
+    ) STORED,
     adult BOOLEAN,
     originalLanguage TEXT,
     originalTitle TEXT,
     popularity REAL,
     video BOOLEAN,
-    imageUrls TEXT
+    imageUrls TEXT,
+    -- Última geração de sincronização em que o título apareceu (prune_catalog.py)
+    lastSeenGeneration BIGINT
 );
 
 CREATE TABLE IF NOT EXISTS tv_series(
@@ -29,12 +36,18 @@ CREATE TABLE IF NOT EXISTS tv_series(
     voteAverage REAL,
     voteCount INTEGER,
     genreIds TEXT,
+    genres INTEGER[] GENERATED ALWAYS AS (
+        CASE WHEN genreIds ~ '^[0-9]+(,[0-9]+)*$'
+             THEN string_to_array(genreIds, ',')::INTEGER[]
+             ELSE '{}'::INTEGER[] END
+    ) STORED,
     adult BOOLEAN,
     originalLanguage TEXT,
     originalName TEXT,
     popularity REAL,
     originCountry TEXT,
-    imageUrls TEXT
+    imageUrls TEXT,
+    lastSeenGeneration BIGINT
 );
 
 CREATE TABLE IF NOT EXISTS channels(
@@ -47,6 +60,25 @@ CREATE TABLE IF NOT EXISTS channels(
     imageUrls TEXT
 );
 
+-- Saúde dos streams (chaveada pela URL; sobrevive à reimportação do M3U)
+CREATE TABLE IF NOT EXISTS channel_health(
+    streamUrl TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    httpStatus INTEGER,
+    latencyMs INTEGER,
+    checkedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Validação das URLs de logo (check_logos.py --validate)
+CREATE TABLE IF NOT EXISTS logo_health(
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    httpStatus INTEGER,
+    sizeBytes INTEGER,
+    latencyMs INTEGER,
+    checkedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS seasons(
     id SERIAL PRIMARY KEY,
     seriesId INTEGER NOT NULL REFERENCES tv_series(id),
@@ -75,16 +107,52 @@ CREATE TABLE IF NOT EXISTS episodes(
     imageUrls TEXT
 );
 
+-- Composição das listas do TMDB (em alta, populares, por gênero) por sincronização
+CREATE SEQUENCE IF NOT EXISTS sync_generation_seq;
+
+CREATE TABLE IF NOT EXISTS list_membership(
+    listKey TEXT NOT NULL,
+    generation BIGINT NOT NULL,
+    rank INTEGER NOT NULL,
+    mediaId INTEGER NOT NULL,
+    PRIMARY KEY (listKey, generation, rank)
+);
+
+-- Geração atual de cada lista
+CREATE TABLE IF NOT EXISTS list_generation(
+    listKey TEXT PRIMARY KEY,
+    generation BIGINT NOT NULL,
+    syncedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Versão de cada escopo do catálogo (movies, series, lists, channels); quem
+-- altera incrementa e envia NOTIFY catalog_changed para as instâncias da API
+CREATE TABLE IF NOT EXISTS catalog_version(
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    changedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS sync_cache(
     key TEXT PRIMARY KEY,
     timestamp BIGINT,
-    data TEXT
+    data TEXT,
+    -- Validade de cada chave (cache_store.py); a limpeza apaga as vencidas pelo índice
+    expiresAt TIMESTAMP
 );
+CREATE INDEX IF NOT EXISTS idx_sync_cache_expires_at ON sync_cache(expiresAt);
 
 -- Índices para melhor performance
 CREATE INDEX IF NOT EXISTS idx_movies_title ON movies(title);
 CREATE INDEX IF NOT EXISTS idx_tv_series_name ON tv_series(name);
+-- Busca por gênero (genres @> ARRAY[id])
+CREATE INDEX IF NOT EXISTS idx_movies_genres ON movies USING GIN (genres);
+CREATE INDEX IF NOT EXISTS idx_tv_series_genres ON tv_series USING GIN (genres);
 CREATE INDEX IF NOT EXISTS idx_channels_name ON channels(name);
+CREATE INDEX IF NOT EXISTS idx_channels_category_name ON channels(category, name);
+-- Em alta/populares e listagens por gênero (ORDER BY popularity DESC NULLS LAST, id)
+CREATE INDEX IF NOT EXISTS idx_movies_popularity ON movies(popularity DESC NULLS LAST, id);
+CREATE INDEX IF NOT EXISTS idx_tv_series_popularity ON tv_series(popularity DESC NULLS LAST, id);
 CREATE INDEX IF NOT EXISTS idx_seasons_series_id ON seasons(seriesId);
 CREATE INDEX IF NOT EXISTS idx_episodes_series_id ON episodes(seriesId);
 CREATE INDEX IF NOT EXISTS idx_episodes_season_id ON episodes(seasonId);
\ No newline at end of file
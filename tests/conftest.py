@@ -0,0 +1,101 @@
+"""
+Configuração comum dos testes (pytest).
+
+Os módulos são importados como na API: api_server.py e check_logos.py na
+raiz e o pacote tv_multimidia/. Os testes que precisam do PostgreSQL usam a
+fixture `dsn` e são pulados quando o banco (variáveis DB_*) não responde.
+"""
+
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope='session')
+def dsn():
+    """DSN do PostgreSQL de teste (o mesmo DB_* do DatabaseService)."""
+    psycopg2 = pytest.importorskip('psycopg2')
+    from tv_multimidia.database import DatabaseService
+
+    dsn = DatabaseService(read_dsns=[]).conn_string()
+    try:
+        psycopg2.connect(dsn, connect_timeout=3).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f'PostgreSQL indisponível: {e}')
+    return dsn
+
+
+@pytest.fixture
+def db_schema(dsn, monkeypatch):
+    """Schema temporário e vazio; as conexões abertas no teste o usam (PGOPTIONS)."""
+    import psycopg2
+
+    def execute(sql):
+        connection = psycopg2.connect(dsn)
+        try:
+            with connection, connection.cursor() as cursor:
+                cursor.execute(sql)
+        finally:
+            connection.close()
+
+    schema = f'test_{os.getpid()}'
+    execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}')
+    monkeypatch.setenv('PGOPTIONS', f'-c search_path={schema}')
+    yield schema
+    execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+
+
+@pytest.fixture
+def db(db_schema):
+    """DatabaseService conectado ao schema temporário, com as tabelas criadas."""
+    from tv_multimidia.database import DatabaseService
+
+    db = DatabaseService(read_dsns=[])
+    db.connect()
+    db.create_tables()
+    yield db
+    db.close()
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Responde com as rotas do servidor: {caminho: (status, cabeçalhos, corpo)}."""
+
+    def do_GET(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        route = self.server.routes.get(self.path)
+        if callable(route):
+            route = route(self)
+        status, headers, body = route or (404, {}, b'')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """Servidor HTTP local (stand-in) numa thread; `routes` é editável pelo teste."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.routes = {}
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
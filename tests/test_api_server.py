@@ -0,0 +1,70 @@
+"""Testes da criação preguiçosa dos serviços do api_server.py."""
+
+import os
+
+import pytest
+
+api_server = pytest.importorskip('api_server')
+from tv_multimidia.cache_store import CacheStore
+
+
+@pytest.fixture
+def fresh_process(db_schema, monkeypatch):
+    """api_server sem nenhum serviço criado; listener e limpeza do cache registrados em `started`."""
+    started = []
+    monkeypatch.setattr(api_server, '_services', {})
+    monkeypatch.setattr(api_server, '_background_pid', None)
+    monkeypatch.setattr(api_server, '_catalog_listener', None)
+    monkeypatch.setattr(api_server, 'start_catalog_listener',
+                        lambda conn_string, subscriptions: started.append('listener') or object())
+    monkeypatch.setattr(CacheStore, 'start_sweeper', lambda self: started.append('sweeper'))
+    yield started
+    db = api_server.get_db.current()
+    if db is not None:
+        db.close()
+
+
+def test_first_get_db_starts_background_services_once(fresh_process):
+    api_server.get_db()
+    assert sorted(fresh_process) == ['listener', 'sweeper']
+    listener = api_server.catalog_listener()
+    assert listener is not None
+
+    api_server.get_db()
+    api_server.get_cache_store()
+    assert api_server.init_worker() is listener
+    assert sorted(fresh_process) == ['listener', 'sweeper']
+
+
+def test_first_get_cache_store_starts_background_services(fresh_process):
+    api_server.get_cache_store()
+    assert sorted(fresh_process) == ['listener', 'sweeper']
+
+
+def test_forked_process_starts_its_own(fresh_process, monkeypatch):
+    # Serviços herdados do processo pai (ex: criados no master antes do fork)
+    api_server.get_db()
+    parent = api_server.catalog_listener()
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert api_server.catalog_listener() is None
+
+    api_server.get_db()
+    assert sorted(fresh_process) == ['listener', 'listener', 'sweeper', 'sweeper']
+    assert api_server.catalog_listener() not in (None, parent)
+
+
+def test_failed_start_retries_on_next_call(fresh_process, monkeypatch):
+    create_cache_store = api_server.create_cache_store
+
+    def unavailable(db):
+        raise RuntimeError('cache indisponível')
+
+    monkeypatch.setattr(api_server, 'create_cache_store', unavailable)
+    with pytest.raises(RuntimeError):
+        api_server.get_db()
+    assert fresh_process == []
+    assert api_server.catalog_listener() is None
+
+    monkeypatch.setattr(api_server, 'create_cache_store', create_cache_store)
+    api_server.get_db()
+    assert sorted(fresh_process) == ['listener', 'sweeper']
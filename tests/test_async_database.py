@@ -0,0 +1,49 @@
+"""Testes do pool de conexões assíncronas (tv_multimidia/async_database.py)."""
+
+import asyncio
+
+from tv_multimidia.async_database import AsyncConnectionPool
+
+
+def test_discard_wakes_waiting_acquire(dsn):
+    async def scenario():
+        pool = AsyncConnectionPool(dsn, size=2)
+        first = await pool.acquire()
+        second = await pool.acquire()
+        waiting = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        # Conexões descartadas (ex: erro de rede): a vaga volta e o da fila abre outra
+        pool.release(first, discard=True)
+        pool.release(second, discard=True)
+        third = await asyncio.wait_for(waiting, 5)
+        assert not third.closed
+        assert pool._opened == 1
+        pool.release(third)
+
+        rows = await asyncio.wait_for(pool.fetch('SELECT 1 AS n'), 5)
+        assert rows == [{'n': 1}]
+        pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_pool_never_opens_more_than_size(dsn):
+    async def scenario():
+        pool = AsyncConnectionPool(dsn, size=3)
+        peak = 0
+
+        async def read():
+            nonlocal peak
+            rows = await pool.fetch('SELECT pg_sleep(0.01), 1 AS n')
+            peak = max(peak, pool._opened)
+            return rows[0]['n']
+
+        results = await asyncio.wait_for(asyncio.gather(*(read() for _ in range(20))), 10)
+        assert results == [1] * 20
+        assert peak <= 3
+        pool.close()
+        assert pool._opened == 0
+
+    asyncio.run(scenario())
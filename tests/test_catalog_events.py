@@ -0,0 +1,90 @@
+"""Testes da publicação de alterações do catálogo (NOTIFY na transação da gravação)."""
+
+import json
+import select
+
+import psycopg2
+import pytest
+
+from tv_multimidia.catalog_events import CATALOG_CHANNEL
+from tv_multimidia.database import SyncService
+
+
+class FakeTMDB:
+    def __init__(self, fail_season=None):
+        self.fail_season = fail_season
+
+    def fetch_tv_series_details(self, series_id):
+        return {'seasons': [{'season_number': 1}, {'season_number': 2}]}
+
+    def fetch_season_details(self, series_id, season_number):
+        if season_number == self.fail_season:
+            raise RuntimeError('TMDB fora')
+        return {'id': series_id * 10 + season_number, 'season_number': season_number, 'name': f'T{season_number}',
+                'episodes': [{'id': series_id * 100 + season_number * 10 + n, 'episode_number': n}
+                             for n in (1, 2)]}
+
+
+@pytest.fixture
+def listener(dsn, db_schema):
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    connection.cursor().execute(f'LISTEN {CATALOG_CHANNEL}')
+    yield connection
+    connection.close()
+
+
+def notifications(connection, timeout=0.5):
+    payloads = []
+    while select.select([connection], [], [], timeout)[0]:
+        connection.poll()
+        payloads += [json.loads(n.payload) for n in connection.notifies]
+        connection.notifies.clear()
+        timeout = 0.05
+    return payloads
+
+
+@pytest.fixture
+def commits(db, monkeypatch):
+    """Conta os commits do DatabaseService."""
+    calls = []
+    commit = db.commit
+    monkeypatch.setattr(db, 'commit', lambda: (calls.append(1), commit()))
+    return calls
+
+
+def test_movies_and_lists_publish_in_the_write_transaction(db, listener, commits):
+    sync = SyncService(db, FakeTMDB())
+    movies = [{'id': 1, 'title': 'Filme 1'}, {'id': 2, 'title': 'Filme 2'}]
+
+    sync._save_movies(movies)
+    sync._save_list('movie:popular', movies, db.next_sync_generation())
+
+    assert len(commits) == 2
+    assert [(n['scope'], n.get('ids')) for n in notifications(listener)] == [('movies', [1, 2]), ('lists', None)]
+
+
+def save_series(db, listener, commits):
+    SyncService(db, FakeTMDB())._save_tv_series([{'id': 7, 'name': 'Série'}])
+    assert [n['scope'] for n in notifications(listener)] == ['series']
+    commits.clear()
+
+
+def test_series_details_commit_once_with_the_notification(db, listener, commits):
+    save_series(db, listener, commits)
+    SyncService(db, FakeTMDB()).sync_series_details([7])
+
+    assert len(commits) == 1
+    assert [(n['scope'], n.get('ids')) for n in notifications(listener)] == [('series', [7])]
+    db.cursor.execute('SELECT COUNT(*) AS n FROM episodes WHERE seriesId = 7')
+    assert db.cursor.fetchone()['n'] == 4
+
+
+def test_failed_series_sync_leaves_nothing_behind(db, listener, commits):
+    save_series(db, listener, commits)
+    SyncService(db, FakeTMDB(fail_season=2)).sync_series_details([7])
+
+    assert commits == []
+    assert notifications(listener) == []
+    db.cursor.execute('SELECT (SELECT COUNT(*) FROM seasons) + (SELECT COUNT(*) FROM episodes) AS n')
+    assert db.cursor.fetchone()['n'] == 0
@@ -0,0 +1,108 @@
+"""Testes do validador de logos (check_logos.py) contra um servidor HTTP local."""
+
+import time
+
+import check_logos
+from check_logos import (
+    STATUS_DEAD, STATUS_ERROR, STATUS_OK, STATUS_SLOW, probe_logo, save_logo_health, urls_to_validate,
+    validate_logo_urls,
+)
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+
+def test_probe_logo_ok(http_server):
+    http_server.routes = {'/logo.png': (200, {'Content-Type': 'image/png'}, PNG)}
+    status, http_status, size, latency_ms = probe_logo(f'{http_server.url}/logo.png')
+    assert (status, http_status, size) == (STATUS_OK, 200, len(PNG))
+    assert latency_ms >= 0
+
+
+def test_probe_logo_slow(http_server, monkeypatch):
+    monkeypatch.setattr(check_logos, 'SLOW_LOGO_MS', 50)
+
+    def slow(handler):
+        time.sleep(0.1)
+        return 200, {'Content-Type': 'image/png'}, PNG
+
+    http_server.routes = {'/logo.png': slow}
+    assert probe_logo(f'{http_server.url}/logo.png')[0] == STATUS_SLOW
+
+
+def test_probe_logo_dead(http_server):
+    http_server.routes = {
+        '/html.png': (200, {'Content-Type': 'text/html'}, b'<html>nao encontrado</html>'),
+        '/vazio.png': (200, {'Content-Type': 'image/png'}, b''),
+        '/removido.png': (410, {}, b''),
+    }
+    assert probe_logo(f'{http_server.url}/html.png')[:2] == (STATUS_DEAD, 200)
+    assert probe_logo(f'{http_server.url}/vazio.png')[:2] == (STATUS_DEAD, 200)
+    assert probe_logo(f'{http_server.url}/removido.png')[:2] == (STATUS_DEAD, 410)
+    assert probe_logo(f'{http_server.url}/404.png')[:2] == (STATUS_DEAD, 404)
+
+
+def test_probe_logo_transient_errors(http_server):
+    # Falhas que podem passar: não viram 'dead' (o placeholder ficaria um dia no lugar do logo)
+    http_server.routes = {
+        '/erro.png': (500, {}, b''),
+        '/indisponivel.png': (503, {'Retry-After': '60'}, b''),
+        '/limite.png': (429, {}, b''),
+    }
+    assert probe_logo(f'{http_server.url}/erro.png')[:2] == (STATUS_ERROR, 500)
+    assert probe_logo(f'{http_server.url}/indisponivel.png')[:2] == (STATUS_ERROR, 503)
+    assert probe_logo(f'{http_server.url}/limite.png')[:2] == (STATUS_ERROR, 429)
+
+
+def test_probe_logo_timeout(http_server):
+    def stalled(handler):
+        time.sleep(0.5)
+        return 200, {'Content-Type': 'image/png'}, PNG
+
+    http_server.routes = {'/logo.png': stalled}
+    status, http_status, size, _ = probe_logo(f'{http_server.url}/logo.png', timeout=(1, 0.1))
+    assert (status, http_status, size) == (STATUS_ERROR, None, None)
+
+
+def test_probe_logo_unreachable():
+    # Porta 9 (discard) fechada: conexão recusada
+    status, http_status, size, _ = probe_logo('http://127.0.0.1:9/logo.png', timeout=(1, 1))
+    assert (status, http_status, size) == (STATUS_ERROR, None, None)
+
+
+def test_validate_logo_urls_runs_concurrently_and_deduplicates(http_server):
+    def slow(handler):
+        time.sleep(0.2)
+        return 200, {'Content-Type': 'image/png'}, PNG
+
+    urls = [f'{http_server.url}/logo{i}.png' for i in range(8)]
+    http_server.routes = {f'/logo{i}.png': slow for i in range(8)}
+
+    inicio = time.perf_counter()
+    results = validate_logo_urls(urls + urls[:3], workers=8)
+    elapsed = time.perf_counter() - inicio
+
+    assert list(results) == urls
+    assert all(result[0] == STATUS_OK for result in results.values())
+    assert len(http_server.requests) == 8
+    assert elapsed < 8 * 0.2 / 2  # Em série levaria 1,6 s
+
+
+def test_transient_errors_are_retried_sooner_and_keep_the_logo(db):
+    db.logo_placeholder = 'http://logos.exemplo/placeholder.png'
+    logos = {name: f'http://logos.exemplo/{name}.png' for name in ('morto', 'erro', 'ok')}
+    for name, url in logos.items():
+        db.cursor.execute('INSERT INTO channels (name, logoPath) VALUES (%s, %s)', (name, url))
+    save_logo_health(db.cursor, {
+        logos['morto']: (STATUS_DEAD, 404, 0, 10),
+        logos['erro']: (STATUS_ERROR, 503, 0, 10),
+        logos['ok']: (STATUS_OK, 200, 100, 10),
+    })
+    db.cursor.execute("UPDATE logo_health SET checkedAt = NOW() - INTERVAL '1 hour'")
+    db.commit()
+
+    with db.connection.cursor() as cursor:  # check_logos.py usa o cursor comum (tuplas)
+        assert urls_to_validate(cursor) == [logos['erro']]
+        assert urls_to_validate(cursor, error_ttl=2 * 60 * 60) == []
+
+    shown = {channel['name']: channel['logopath'] for channel in db.get_all_channels()}
+    assert shown == {'morto': db.logo_placeholder, 'erro': logos['erro'], 'ok': logos['ok']}
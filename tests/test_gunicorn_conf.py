@@ -0,0 +1,35 @@
+"""Testes do gunicorn.conf.py: o número padrão de workers cabe no orçamento de conexões."""
+
+import multiprocessing
+import os
+import runpy
+
+import pytest
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+
+
+def load_conf(monkeypatch, tmp_path, cpus, **env):
+    monkeypatch.setattr(multiprocessing, 'cpu_count', lambda: cpus)
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    for name in ('WEB_CONCURRENCY', 'GUNICORN_THREADS', 'DB_MAX_CONNECTIONS'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONF)
+
+
+@pytest.mark.parametrize('cpus', [1, 4, 16, 64])
+def test_default_workers_fit_max_connections(monkeypatch, tmp_path, cpus):
+    conf = load_conf(monkeypatch, tmp_path, cpus)
+    assert conf['workers'] >= 1
+    assert conf['workers'] <= cpus + 1
+    assert conf['workers'] * (conf['threads'] + 3) <= 80
+
+
+def test_budget_from_env(monkeypatch, tmp_path):
+    conf = load_conf(monkeypatch, tmp_path, 16, DB_MAX_CONNECTIONS='30', GUNICORN_THREADS='8')
+    assert conf['workers'] == 2
+    # Valor explícito prevalece (o when_ready só avisa)
+    conf = load_conf(monkeypatch, tmp_path, 16, DB_MAX_CONNECTIONS='30', WEB_CONCURRENCY='5')
+    assert conf['workers'] == 5
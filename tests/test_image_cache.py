@@ -0,0 +1,91 @@
+"""Testes do cache/proxy de imagens (tv_multimidia/image_cache.py) com servidores HTTP locais."""
+
+import http.server
+import os
+import threading
+import time
+
+import pytest
+
+from tv_multimidia import image_cache
+from tv_multimidia.image_cache import ImageCache, ImageFetchError
+
+from conftest import StandInHandler
+
+
+@pytest.fixture
+def internal_server():
+    """Segundo servidor, em 127.0.0.2: faz o papel de um endereço interno (ex: 169.254.169.254)."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.2', 0), StandInHandler)
+    server.routes = {'/segredo': (200, {}, b'credenciais')}
+    server.requests = []
+    server.url = f'http://127.0.0.2:{server.server_port}'
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def public_loopback(monkeypatch):
+    """Trata só 127.0.0.1 como endereço público (o servidor de teste "da internet")."""
+    monkeypatch.setattr(image_cache, '_is_public_address', lambda address: address == '127.0.0.1')
+
+
+def test_follows_redirects_between_public_hosts(tmp_path, http_server, public_loopback):
+    http_server.routes = {
+        '/logo.png': (302, {'Location': '/cdn/logo.png'}, b''),
+        '/cdn/logo.png': (200, {}, b'imagem'),
+    }
+    cache = ImageCache(cache_dir=str(tmp_path))
+    content_hash = cache.fetch(f'{http_server.url}/logo.png')
+    with open(cache._original_path(content_hash), 'rb') as f:
+        assert f.read() == b'imagem'
+
+
+def test_redirect_to_internal_address_is_refused(tmp_path, http_server, internal_server, public_loopback):
+    http_server.routes = {'/logo.png': (302, {'Location': f'{internal_server.url}/segredo'}, b'')}
+    cache = ImageCache(cache_dir=str(tmp_path))
+    with pytest.raises(ImageFetchError, match='não permitido'):
+        cache.fetch(f'{http_server.url}/logo.png')
+    assert internal_server.requests == []
+
+
+def test_connect_to_internal_address_is_refused_after_dns_check(tmp_path, internal_server, monkeypatch):
+    # DNS "rebinding": a conferência do nome passa, mas a conexão cai num endereço interno
+    monkeypatch.setattr(image_cache, '_is_public_host', lambda host: True)
+    cache = ImageCache(cache_dir=str(tmp_path))
+    with pytest.raises(ImageFetchError, match='não permitido'):
+        cache.fetch(f'{internal_server.url}/segredo')
+    assert internal_server.requests == []
+
+
+def test_redirect_loop_is_limited(tmp_path, http_server, public_loopback):
+    http_server.routes = {'/a': (302, {'Location': '/b'}, b''), '/b': (302, {'Location': '/a'}, b'')}
+    cache = ImageCache(cache_dir=str(tmp_path))
+    with pytest.raises(ImageFetchError, match='Redirecionamentos demais'):
+        cache.fetch(f'{http_server.url}/a')
+    assert len(http_server.requests) == image_cache.MAX_REDIRECTS + 1
+
+
+def test_evict_removes_least_recently_used_files(tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path), max_bytes=10_000)
+    now = time.time()
+    paths = []
+    for i in range(5):
+        path = cache._original_path(f'{i:02d}' + 'a' * 62)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 3000)
+        os.utime(path, (now - 1000 + i, now - 1000 + i))
+        paths.append(path)
+
+    assert cache.evict() == 6000  # 15000 bytes -> até 90% de 10000
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True, True]
+    assert cache.evict() == 0
+
+
+def test_is_proxy_host():
+    assert image_cache.is_proxy_host('https://image.tmdb.org/t/p/w342/abc.jpg')
+    assert not image_cache.is_proxy_host('https://image.tmdb.org.exemplo/abc.jpg')
+    assert not image_cache.is_proxy_host('ftp://image.tmdb.org/abc.jpg')
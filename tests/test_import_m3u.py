@@ -0,0 +1,115 @@
+"""Testes do importador de playlists M3U (tv_multimidia/import_m3u.py)."""
+
+import pytest
+
+from tv_multimidia import import_m3u
+from tv_multimidia.import_m3u import ChannelFilter
+
+
+def extinf(name, group='CANAIS'):
+    return f'#EXTINF:-1 tvg-name="{name}" group-title="{group}",{name}'
+
+
+def test_filter_equals_contains_and_regex():
+    channel_filter = ChannelFilter({
+        'include': [{'field': 'group', 'contains': 'CANAIS'}],
+        'exclude': [{'field': 'name', 'regex': 'XXX|ADULTO', 'ignore_case': True},
+                    {'field': 'name', 'equals': 'Teste'}],
+    })
+    assert channel_filter.match(extinf('Globo'))['name'] == 'Globo'
+    assert channel_filter.match(extinf('canal adulto')) is None
+    assert channel_filter.match(extinf('Teste')) is None
+    assert channel_filter.match(extinf('Globo', group='FILMES')) is None
+    assert channel_filter.hits[ChannelFilter.REJECTED_NO_INCLUDE] == 1
+
+
+def test_filter_regex_with_backreference():
+    # (\w)\1 = letra repetida; dentro da regex combinada o \1 apontaria para outro grupo
+    channel_filter = ChannelFilter({
+        'exclude': [{'field': 'name', 'contains': 'XXX'},
+                    {'field': 'name', 'regex': r'(\w)\1', 'label': 'letra dupla'}],
+    })
+    assert channel_filter.match(extinf('Globo')) is not None
+    assert channel_filter.match(extinf('Canal Sport')) is not None
+    assert channel_filter.match(extinf('Discovery Kiddo')) is None
+    assert channel_filter.hits['letra dupla'] == 1
+
+
+def test_filter_regex_with_inline_flags():
+    # (?i) só vale no início da expressão: não pode ir para dentro da regex combinada
+    channel_filter = ChannelFilter({
+        'include': [{'field': 'group', 'regex': '(?i)canais', 'label': 'canais'},
+                    {'field': 'group', 'contains': 'FILMES'}],
+    })
+    assert channel_filter.match(extinf('Globo', group='Canais Abertos')) is not None
+    assert channel_filter.match(extinf('Telecine', group='FILMES')) is not None
+    assert channel_filter.match(extinf('Novela', group='SERIES')) is None
+    assert channel_filter.hits['canais'] == 1
+
+
+def test_filter_rejects_invalid_regex():
+    with pytest.raises(ValueError, match='regex'):
+        ChannelFilter({'exclude': [{'field': 'name', 'regex': '(abc'}]})
+
+
+def test_parallel_parse_matches_sequential(tmp_path, monkeypatch):
+    # Separadores que splitlines() também reconhece dentro das linhas, finais CRLF e latin-1
+    separators = (b'\r', b'\x0b', b'\x0c', b'\x1c', b'\x1d', b'\x1e')
+    entries = []
+    for i in range(400):
+        name = f'Canal {i}'.encode()
+        if i % 5 == 0:
+            name += separators[i % len(separators)] + b'HD'
+        if i % 7 == 0:
+            name += ' Ação'.encode('latin-1')
+        ending = b'\r\n' if i % 2 else b'\n'
+        entries.append(b'#EXTINF:-1 group-title="CANAIS",' + name + ending
+                       + f'http://stream.exemplo/{i}.ts'.encode() + ending)
+    playlist = tmp_path / 'playlist.m3u'
+    playlist.write_bytes(b'#EXTM3U\n' + b''.join(entries))
+
+    monkeypatch.setattr(import_m3u, 'PARALLEL_MIN_BYTES', 0)
+    sequential = import_m3u.parse_m3u(str(playlist), ChannelFilter())
+    parallel = import_m3u.parse_m3u_parallel(str(playlist), workers=2, channel_filter=ChannelFilter())
+    assert len(sequential) == 400
+    assert parallel == sequential
+
+
+PLAYLIST = (
+    '#EXTM3U\n'
+    '#EXTINF:-1 tvg-logo="http://logos.exemplo/globo.png" group-title="CANAIS | ABERTOS",Globo\n'
+    'http://stream.exemplo/globo.ts\n'
+    '#EXTINF:-1 group-title="FILMES",Filme\n'
+    'http://stream.exemplo/filme.mp4\n'
+).encode()
+
+
+def test_remote_playlist_conditional_get(http_server, tmp_path):
+    def playlist(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return 304, {}, b''
+        return 200, {'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'}, PLAYLIST
+
+    http_server.routes = {'/playlist.m3u': playlist}
+    url = f'{http_server.url}/playlist.m3u'
+    state_path = str(tmp_path / 'estado.json')
+
+    channels, validators = import_m3u.parse_m3u_remote(url, state_path=state_path, channel_filter=ChannelFilter())
+    assert [(c['name'], c['logo'], c['stream_url']) for c in channels] == [
+        ('Globo', 'http://logos.exemplo/globo.png', 'http://stream.exemplo/globo.ts')]
+    assert validators['etag'] == '"v1"'
+
+    # Sem salvar o estado (importação não confirmada), baixa de novo
+    channels, _ = import_m3u.parse_m3u_remote(url, state_path=state_path, channel_filter=ChannelFilter())
+    assert len(channels) == 1
+
+    import_m3u.salvar_estado_remoto(state_path, validators)
+    result, validators = import_m3u.parse_m3u_remote(url, state_path=state_path, channel_filter=ChannelFilter())
+    assert result is import_m3u.PLAYLIST_NAO_MODIFICADA and validators is None
+    assert http_server.requests[-1][2]['If-Modified-Since'] == 'Mon, 05 Oct 2026 10:00:00 GMT'
+
+
+def test_remote_playlist_error(http_server, tmp_path):
+    result = import_m3u.parse_m3u_remote(f'{http_server.url}/nao-existe.m3u', state_path=str(tmp_path / 'e.json'),
+                                         channel_filter=ChannelFilter())
+    assert result == (None, None)
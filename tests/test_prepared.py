@@ -0,0 +1,74 @@
+"""Testes dos comandos preparados (tv_multimidia/prepared.py)."""
+
+import threading
+
+import psycopg2
+import pytest
+
+from tv_multimidia.database import DatabaseService
+from tv_multimidia.prepared import PreparedStatements, to_server_placeholders
+
+
+def test_to_server_placeholders():
+    assert to_server_placeholders('SELECT %s, %s') == ('SELECT $1, $2', None, 2)
+    assert to_server_placeholders("SELECT %(a)s, %(b)s, %(a)s, '100%%'") == ("SELECT $1, $2, $1, '100%'", ['a', 'b'], 2)
+    with pytest.raises(ValueError):
+        to_server_placeholders('SELECT %s, %(a)s')
+
+
+def run_concurrently(target, threads=16):
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def run():
+        barrier.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors
+
+
+def test_shared_connection_prepares_once(dsn):
+    # Conexão compartilhada entre threads, como a de uma réplica
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    prepared = PreparedStatements()
+    prepared.register('soma', 'SELECT %s::int + %s::int AS total')
+
+    results = []
+    errors = run_concurrently(lambda: results.append(prepared.execute(connection, 'soma', (1, 2))[0]['total']))
+    assert errors == []
+    assert results == [3] * 16
+    connection.close()
+
+
+def test_replica_reads_from_many_services(db, dsn):
+    db.cursor.execute("INSERT INTO channels (name, category) VALUES ('Globo', 'CANAIS | ABERTOS')")
+    db.commit()
+
+    for _ in range(5):
+        service = DatabaseService(read_dsns=[dsn])
+        service.read_your_writes = 0
+        service.connect()
+        results = []
+        errors = run_concurrently(lambda: results.append(service.get_distinct_categories()))
+        service.close()
+        assert errors == []
+        assert results == [['CANAIS | ABERTOS']] * 16
+
+
+def test_statement_prepared_outside_the_registry(dsn):
+    connection = psycopg2.connect(dsn)
+    with connection.cursor() as cursor:
+        cursor.execute('PREPARE um AS SELECT 1 AS n')
+    prepared = PreparedStatements()
+    prepared.register('um', 'SELECT 1 AS n')
+    assert prepared.execute(connection, 'um')[0]['n'] == 1
+    connection.close()
@@ -0,0 +1,79 @@
+"""Testes do rodízio de réplicas de leitura (tv_multimidia/read_replicas.py)."""
+
+import socket
+import threading
+import time
+
+import pytest
+
+from tv_multimidia.read_replicas import ReplicaSet
+
+
+@pytest.fixture
+def blackhole():
+    """Porta que aceita a conexão TCP e nunca responde (réplica travada)."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    yield f'host=127.0.0.1 port={server.getsockname()[1]} dbname=tv_multimidia user=tv_user connect_timeout=10'
+    server.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condição não foi atingida'
+        time.sleep(0.01)
+
+
+def test_stalled_replica_does_not_block_readers(dsn, blackhole):
+    replicas = ReplicaSet([blackhole, dsn], health_interval=0, connect_timeout=2)
+    durations = []
+
+    def reader():
+        for _ in range(20):
+            inicio = time.perf_counter()
+            replicas.acquire()
+            durations.append(time.perf_counter() - inicio)
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(durations) < 0.2
+
+    # A réplica boa entra no rodízio sem esperar a travada
+    wait_for(lambda: replicas.acquire() is not None, timeout=1.5)
+    replica, connection = replicas.acquire()
+    assert replica.dsn == dsn and not connection.closed
+    replicas.close()
+
+
+def test_mark_failed_keeps_connection_open_for_other_readers(dsn):
+    replicas = ReplicaSet([dsn], health_interval=60)
+    replicas.connect()
+    replica, connection = replicas.acquire()
+
+    replicas.mark_failed(replica, 'teste', connection)
+    assert not connection.closed  # Outra thread pode estar lendo nela
+    assert replica.connection is None
+    assert replicas.acquire() is None
+    connection.close()
+
+
+def test_read_falls_back_to_primary_when_replica_dies(db, dsn):
+    db.cursor.execute("INSERT INTO channels (name, category) VALUES ('Globo', 'CANAIS | ABERTOS')")
+    db.commit()
+    db.read_your_writes = 0
+    db.replicas = ReplicaSet([dsn], health_interval=60)
+    replica = db.replicas.replicas[0]
+
+    for use_prepared in (False, True):
+        db.use_prepared = use_prepared
+        assert db.replicas.check(replica)
+        db.cursor.execute('SELECT pg_terminate_backend(%s)', (replica.connection.get_backend_pid(),))
+        db.connection.rollback()
+
+        assert db.get_distinct_categories() == ['CANAIS | ABERTOS']
+        assert not replica.healthy
@@ -0,0 +1,79 @@
+"""Testes do verificador de streams (tv_multimidia/stream_prober.py) contra um servidor HTTP local."""
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('aiohttp')
+from tv_multimidia.stream_prober import (
+    STATUS_ERROR, STATUS_OFFLINE, STATUS_ONLINE, STATUS_TIMEOUT, probe_streams,
+)
+
+TS = b'\x47' + b'\x00' * 187  # Um pacote MPEG-TS
+
+
+def probe(urls, **kwargs):
+    return asyncio.run(probe_streams(urls, **kwargs))
+
+
+def test_probe_online_offline_and_empty(http_server):
+    http_server.routes = {
+        '/live/1.ts': (200, {'Content-Type': 'video/mp2t'}, TS),
+        '/live/vazio.ts': (200, {'Content-Type': 'video/mp2t'}, b''),
+        '/live/proibido.ts': (403, {}, b'conta bloqueada'),
+    }
+    urls = [f'{http_server.url}{path}' for path in
+            ('/live/1.ts', '/live/vazio.ts', '/live/proibido.ts', '/live/sumiu.ts')]
+    results = probe(urls + urls[:1], timeout=2)
+
+    assert list(results) == urls  # Duplicadas verificadas uma vez, na ordem
+    status, http_status, latency_ms = results[urls[0]]
+    assert (status, http_status) == (STATUS_ONLINE, 200)
+    assert latency_ms >= 0
+    assert results[urls[1]][:2] == (STATUS_OFFLINE, 200)  # Sem dados
+    assert results[urls[2]] == (STATUS_OFFLINE, 403, None)
+    assert results[urls[3]] == (STATUS_OFFLINE, 404, None)
+
+
+def test_probe_timeout_and_unreachable(http_server):
+    def stalled(handler):
+        time.sleep(1)
+        return 200, {'Content-Type': 'video/mp2t'}, TS
+
+    http_server.routes = {'/live/lento.ts': stalled}
+    with socket.socket() as closed:
+        closed.bind(('127.0.0.1', 0))
+        unreachable = f'http://127.0.0.1:{closed.getsockname()[1]}/live/1.ts'
+
+    started = time.perf_counter()
+    results = probe([f'{http_server.url}/live/lento.ts', unreachable], timeout=0.3)
+    assert results[f'{http_server.url}/live/lento.ts'] == (STATUS_TIMEOUT, None, None)
+    assert results[unreachable] == (STATUS_ERROR, None, None)
+    assert time.perf_counter() - started < 1
+
+
+def test_probe_respects_per_host_limit(http_server):
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def stream(handler):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return 200, {'Content-Type': 'video/mp2t'}, TS
+
+    paths = [f'/live/{n}.ts' for n in range(12)]
+    http_server.routes = dict.fromkeys(paths, stream)
+    results = probe([f'{http_server.url}{path}' for path in paths], per_host=3, timeout=5)
+
+    assert {status for status, _, _ in results.values()} == {STATUS_ONLINE}
+    assert len(http_server.requests) == 12
+    assert 2 <= peak <= 3  # Em paralelo, mas nunca acima do limite por host
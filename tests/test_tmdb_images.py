@@ -0,0 +1,70 @@
+"""Testes dos tamanhos de imagem do TMDB (tv_multimidia/tmdb_images.py)."""
+
+import threading
+import time
+
+from tv_multimidia.tmdb_images import DEFAULT_IMAGE_CONFIG, TMDB_CONFIG_CACHE_KEY, TMDBImageConfig
+
+TMDB_IMAGES = {**DEFAULT_IMAGE_CONFIG, 'secure_base_url': 'https://cdn.exemplo/t/p/', 'poster_sizes': ['w200', 'original']}
+
+
+class MemoryCache(dict):
+    def set(self, key, value, ttl=None):
+        self[key] = value
+
+
+class StalledTMDB:
+    """fetch_configuration() só responde depois de `release` (um TMDB travado)."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def fetch_configuration(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {'images': TMDB_IMAGES}
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condição não foi atingida'
+        time.sleep(0.01)
+
+
+def test_stalled_tmdb_does_not_block_requests():
+    tmdb = StalledTMDB()
+    cache = MemoryCache()
+    config = TMDBImageConfig(cache, tmdb)
+
+    inicio = time.perf_counter()
+    urls = [config.build_url('/a.jpg', size='w185') for _ in range(20)]
+    assert time.perf_counter() - inicio < 0.5
+    assert set(urls) == {'https://image.tmdb.org/t/p/w185/a.jpg'}  # Padrão enquanto o TMDB não responde
+    wait_for(lambda: tmdb.calls == 1)
+
+    tmdb.release.set()
+    wait_for(lambda: config.images()['secure_base_url'] == 'https://cdn.exemplo/t/p/')
+    assert config.build_url('/a.jpg', size='w185') == 'https://cdn.exemplo/t/p/w200/a.jpg'
+    assert cache[TMDB_CONFIG_CACHE_KEY]['poster_sizes'] == ['w200', 'original']
+    assert tmdb.calls == 1
+
+
+def test_expired_config_is_served_while_refreshing():
+    tmdb = StalledTMDB()
+    config = TMDBImageConfig(MemoryCache({TMDB_CONFIG_CACHE_KEY: TMDB_IMAGES}), tmdb, ttl=0)
+    assert config.images()['secure_base_url'] == 'https://cdn.exemplo/t/p/'  # Lida do cache compartilhado
+
+    # Vencida (ttl=0): continua servindo a anterior, sem chamar o TMDB na requisição
+    config.cache.clear()
+    assert config.images()['secure_base_url'] == 'https://cdn.exemplo/t/p/'
+    wait_for(lambda: tmdb.calls == 1)
+    assert config.images()['secure_base_url'] == 'https://cdn.exemplo/t/p/'
+    tmdb.release.set()
+
+
+def test_without_sources_uses_defaults():
+    config = TMDBImageConfig()
+    assert config.build_url('/a.jpg') == 'https://image.tmdb.org/t/p/w500/a.jpg'
+    assert config.build_url('http://logos.exemplo/a.png') == 'http://logos.exemplo/a.png'
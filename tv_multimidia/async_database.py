@@ -0,0 +1,192 @@
+"""
+Acesso assíncrono (asyncio) às leituras do catálogo, usado pelo async_api.py.
+
+Usa o modo assíncrono nativo do psycopg2 (async_=True): o comando é enviado
+sem bloquear e o loop de eventos é avisado (add_reader/add_writer) quando o
+socket da conexão fica pronto, então uma requisição esperando o banco não
+ocupa nenhuma thread. As consultas são as mesmas do DatabaseService
+(ranked_list_query, by_genre_query, ...), sem comandos preparados.
+
+Um pool de ASYNC_DB_POOL_SIZE conexões (abertas sob demanda, em autocommit)
+atende o processo inteiro: com o pool ocupado, as requisições esperam a vez
+numa fila, também sem thread. As leituras vão sempre para o primário.
+"""
+
+import asyncio
+import json
+import os
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+try:
+    from tv_multimidia.database import (
+        CACHE_GET_MANY_QUERY, DISTINCT_CATEGORIES_QUERY, LIST_POPULAR_MOVIES, LIST_POPULAR_SERIES,
+        LIST_TRENDING_MOVIES, LIST_TRENDING_SERIES, SERIES_DETAILS_QUERY, by_genre_query,
+        channels_by_category_query, page_window, popular_query, ranked_list_query,
+    )
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import (
+        CACHE_GET_MANY_QUERY, DISTINCT_CATEGORIES_QUERY, LIST_POPULAR_MOVIES, LIST_POPULAR_SERIES,
+        LIST_TRENDING_MOVIES, LIST_TRENDING_SERIES, SERIES_DETAILS_QUERY, by_genre_query,
+        channels_by_category_query, page_window, popular_query, ranked_list_query,
+    )
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def wait_ready(connection):
+    """Espera a operação em andamento na conexão terminar (poll() + loop de eventos)."""
+    loop = asyncio.get_running_loop()
+    fd = connection.fileno()
+    while True:
+        state = connection.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        future = loop.create_future()
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, _wake, future)
+            try:
+                await future
+            finally:
+                loop.remove_reader(fd)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fd, _wake, future)
+            try:
+                await future
+            finally:
+                loop.remove_writer(fd)
+        else:
+            raise psycopg2.OperationalError(f"Estado inesperado da conexão assíncrona: {state}")
+
+
+class AsyncConnectionPool:
+    """Conexões assíncronas reutilizadas; no máximo `size` abertas ao mesmo tempo."""
+
+    def __init__(self, dsn, size=ASYNC_DB_POOL_SIZE):
+        self.dsn = dsn
+        self.size = size
+        self._idle = asyncio.Queue()
+        # Uma vaga por conexão emprestada; toda devolução (inclusive descartando
+        # a conexão) libera a vaga e acorda quem está na fila
+        self._slots = asyncio.Semaphore(size)
+        self._opened = 0
+
+    async def _connect(self):
+        connection = psycopg2.connect(self.dsn, async_=True, client_encoding='UTF8')
+        await wait_ready(connection)
+        return connection
+
+    async def acquire(self):
+        await self._slots.acquire()
+        try:
+            if not self._idle.empty():
+                return self._idle.get_nowait()
+            # Sem conexão ociosa: a vaga é de uma conexão que ainda não existe
+            # (ou que foi descartada), então abre outra
+            self._opened += 1
+            try:
+                return await self._connect()
+            except BaseException:
+                self._opened -= 1
+                raise
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        """Devolve a conexão ao pool (discard: fecha, ex: após erro de rede ou cancelamento)."""
+        if discard or connection.closed:
+            self._opened -= 1
+            if not connection.closed:
+                connection.close()
+        else:
+            self._idle.put_nowait(connection)
+        self._slots.release()
+
+    async def fetch(self, query, params=None):
+        """Executa uma leitura e retorna todas as linhas (RealDictRow)."""
+        connection = await self.acquire()
+        try:
+            cursor = connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(query, params)
+            await wait_ready(connection)
+            rows = cursor.fetchall()
+        except BaseException:
+            # Conexão caída ou requisição cancelada no meio do comando: não volta ao pool
+            self.release(connection, discard=connection.closed or connection.isexecuting())
+            raise
+        self.release(connection)
+        return rows
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+            self._opened -= 1
+
+
+class AsyncDatabaseService:
+    """Leituras do catálogo do DatabaseService, em versão assíncrona."""
+
+    def __init__(self, dsn, pool_size=ASYNC_DB_POOL_SIZE):
+        self.pool = AsyncConnectionPool(dsn, pool_size)
+        # Logo usado no lugar de URLs quebradas (None = o app mostra o ícone padrão)
+        self.logo_placeholder = os.getenv('LOGO_PLACEHOLDER_URL') or None
+
+    async def ping(self):
+        await self.pool.fetch('SELECT 1')
+
+    async def get_trending_movies(self, limit=20):
+        return await self.get_ranked_list('movies', LIST_TRENDING_MOVIES, limit)
+
+    async def get_popular_movies(self, limit=20):
+        return await self.get_ranked_list('movies', LIST_POPULAR_MOVIES, limit)
+
+    async def get_trending_series(self, limit=20):
+        return await self.get_ranked_list('tv_series', LIST_TRENDING_SERIES, limit)
+
+    async def get_popular_series(self, limit=20):
+        return await self.get_ranked_list('tv_series', LIST_POPULAR_SERIES, limit)
+
+    async def get_ranked_list(self, table, list_key, limit=20):
+        rows = await self.pool.fetch(ranked_list_query(table), {'key': list_key, 'limit': limit})
+        if rows:
+            return rows
+        return await self.pool.fetch(popular_query(table), (limit,))
+
+    async def get_movies_by_genre(self, genre_id, page=1, limit=20):
+        return await self._get_by_genre('movies', genre_id, page, limit)
+
+    async def get_series_by_genre(self, genre_id, page=1, limit=20):
+        return await self._get_by_genre('tv_series', genre_id, page, limit)
+
+    async def _get_by_genre(self, table, genre_id, page, limit):
+        limit, offset = page_window(page, limit)
+        rows = await self.pool.fetch(by_genre_query(table), (genre_id, limit + 1, offset))
+        return rows[:limit], len(rows) > limit
+
+    async def get_series_details(self, series_id):
+        """Série com temporadas e episódios (None se não existir)."""
+        rows = await self.pool.fetch(SERIES_DETAILS_QUERY, (series_id,))
+        return rows[0]['details'] if rows else None
+
+    async def get_distinct_categories(self):
+        return [row['category'] for row in await self.pool.fetch(DISTINCT_CATEGORIES_QUERY)]
+
+    async def get_channels_by_category(self, category, hide_dead=False, rank_by_health=False):
+        params = {'category': category, 'logo_placeholder': self.logo_placeholder}
+        return await self.pool.fetch(channels_by_category_query(hide_dead, rank_by_health), params)
+
+    async def get_cache(self, key):
+        """Valor ainda válido do sync_cache (o mesmo cache do backend 'postgres')."""
+        rows = await self.pool.fetch(CACHE_GET_MANY_QUERY, ([key],))
+        return json.loads(rows[0]['data']) if rows else None
+
+    def close(self):
+        self.pool.close()
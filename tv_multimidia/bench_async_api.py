@@ -0,0 +1,203 @@
+"""
+Benchmark da API de catálogo: servidor com threads (gunicorn) vs. assíncrono (async_api.py).
+
+Carrega os dados sintéticos do explain_harness num schema temporário e sobe,
+um de cada vez, os dois servidores com um único processo e o mesmo número
+de conexões com o banco (--threads): o gunicorn com um worker gthread de
+--threads threads e o async_api.py com um pool de --threads conexões.
+
+Para cada servidor:
+    1. abre --idle conexões keep-alive (TVs paradas numa tela), cada uma
+       com uma requisição ao /api/health, e as deixa abertas;
+    2. com elas abertas, --clients clientes chamam --path sem parar por
+       --duration segundos, enquanto um monitor mede o /api/health.
+
+Mostra quantas conexões ociosas foram atendidas, requisições/s, latência
+(p50/p99) e a latência do /api/health sob carga.
+
+Uso:
+    python -m tv_multimidia.bench_async_api [--scale 0.05] [--idle 2000] [--clients 64]
+                                            [--threads 4] [--duration 10] [--path /api/movies/trending]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+try:
+    from tv_multimidia.database import DatabaseService
+    from tv_multimidia.explain_harness import load_synthetic_data
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import DatabaseService
+    from explain_harness import load_synthetic_data
+
+BENCH_SCHEMA = 'bench_async_api'
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5077
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def start_server(kind, threads):
+    env = dict(os.environ)
+    # Os servidores enxergam só o schema do benchmark
+    env['PGOPTIONS'] = f'-c search_path={BENCH_SCHEMA}'
+    if kind == 'threads':
+        env.update({'PORT': str(PORT), 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': str(threads)})
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app']
+    else:
+        env.update({'ASYNC_API_PORT': str(PORT), 'ASYNC_DB_POOL_SIZE': str(threads)})
+        command = [sys.executable, 'async_api.py']
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_healthy(session, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f'http://127.0.0.1:{PORT}/api/health') as response:
+                if response.status == 200:
+                    return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('O servidor não respondeu ao /api/health')
+
+
+async def open_idle(semaphore, timeout):
+    """Conexão keep-alive com uma requisição respondida; None se não foi atendida a tempo."""
+    async with semaphore:
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', PORT), timeout)
+            writer.write(b'GET /api/health HTTP/1.1\r\nHost: bench\r\nConnection: keep-alive\r\n\r\n')
+            headers = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+            length = 0
+            for line in headers.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await asyncio.wait_for(reader.readexactly(length), timeout)
+            return writer
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            if writer is not None:
+                writer.close()
+            return None
+
+
+async def client(session, path, stop_at, latencies, errors):
+    while time.monotonic() < stop_at:
+        inicio = time.perf_counter()
+        try:
+            async with session.get(f'http://127.0.0.1:{PORT}{path}') as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - inicio)
+
+
+async def health_monitor(session, stop_at, latencies):
+    while time.monotonic() < stop_at:
+        inicio = time.perf_counter()
+        try:
+            async with session.get(f'http://127.0.0.1:{PORT}/api/health') as response:
+                await response.read()
+            latencies.append(time.perf_counter() - inicio)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            latencies.append(float('inf'))
+        await asyncio.sleep(0.05)
+
+
+async def run_load(args):
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout) as probe:
+        await wait_healthy(probe)
+
+    semaphore = asyncio.Semaphore(200)
+    idle = await asyncio.gather(*(open_idle(semaphore, 5) for _ in range(args.idle)))
+    idle = [writer for writer in idle if writer is not None]
+
+    latencies, errors, health = [], [], []
+    connector = aiohttp.TCPConnector(limit=args.clients + 1)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        stop_at = time.monotonic() + args.duration
+        inicio = time.perf_counter()
+        await asyncio.gather(health_monitor(session, stop_at, health),
+                             *(client(session, args.path, stop_at, latencies, errors)
+                               for _ in range(args.clients)))
+        elapsed = time.perf_counter() - inicio
+
+    for writer in idle:
+        writer.close()
+    return {
+        'idle': len(idle),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'errors': len(errors),
+        'health_p99': percentile(health, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.05, help='Multiplicador do volume de dados sintéticos')
+    parser.add_argument('--idle', type=int, default=2000, help='Conexões keep-alive ociosas')
+    parser.add_argument('--clients', type=int, default=64, help='Clientes fazendo requisições sem parar')
+    parser.add_argument('--threads', type=int, default=4, help='Threads do gunicorn = conexões do pool assíncrono')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos de carga por servidor')
+    parser.add_argument('--path', default='/api/movies/trending', help='Rota medida')
+    args = parser.parse_args()
+
+    db = DatabaseService(read_dsns=[])
+    db.connect()
+    try:
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.cursor.execute(f'CREATE SCHEMA {BENCH_SCHEMA}')
+        db.cursor.execute(f'SET search_path TO {BENCH_SCHEMA}')
+        db.create_tables()
+        load_synthetic_data(db, args.scale)
+        # Libera os locks do ANALYZE: o master do gunicorn roda create_tables
+        db.connection.commit()
+
+        results = {}
+        for kind in ('threads', 'async'):
+            server = start_server(kind, args.threads)
+            try:
+                print(f"Medindo servidor '{kind}'...")
+                results[kind] = asyncio.run(run_load(args))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+
+        print(f"\n{args.idle} conexões ociosas, {args.clients} clientes em {args.path}, "
+              f"{args.threads} conexões com o banco, {args.duration:.0f}s")
+        print(f"{'servidor':<10} {'ociosas':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+              f"{'erros':>6} {'health p99 (ms)':>16}")
+        for kind, r in results.items():
+            print(f"{kind:<10} {r['idle']:>8} {r['rps']:>9.0f} {r['p50']:>9.1f} {r['p99']:>9.1f} "
+                  f"{r['errors']:>6} {r['health_p99']:>16.1f}")
+    finally:
+        db.connection.rollback()
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.connection.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark da serialização JSON das respostas: jsonify padrão vs. json_codec.
+
+Mede o tempo de CPU (process_time) por resposta, dentro de um app Flask, de:
+
+    antes      DefaultJSONProvider do Flask (json da biblioteca padrão)
+    depois     FastJSONProvider (codificador de JSON_ENCODER, padrão orjson)
+    fragmento  lista já codificada no FragmentCache, só juntada na resposta
+
+para três respostas típicas, com linhas sintéticas no formato do banco
+(prepared.Row, datas de lançamento, timestamps da verificação dos streams):
+20 filmes em alta, uma série com temporadas/episódios e os canais de uma
+categoria (a única servida pelo FragmentCache).
+
+Uso:
+    python -m tv_multimidia.bench_json [--iterations 2000] [--channels 300]
+    JSON_ENCODER=json python -m tv_multimidia.bench_json    # o fallback sem orjson
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    from tv_multimidia import json_codec
+    from tv_multimidia.prepared import Row, row_class
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    import json_codec
+    from prepared import Row, row_class
+
+MOVIE_COLUMNS = ('id', 'title', 'originaltitle', 'overview', 'posterpath', 'backdroppath', 'voteaverage',
+                 'votecount', 'releasedate', 'genreids', 'genres', 'popularity', 'adult',
+                 'originallanguage', 'imageurls', 'lastseengeneration')
+CHANNEL_COLUMNS = ('id', 'name', 'logopath', 'streamurl', 'category', 'description', 'imageurls',
+                   'streamstatus', 'streamlatencyms', 'streamcheckedat')
+
+
+class RowJSONProvider(DefaultJSONProvider):
+    """O provider de antes: json da biblioteca padrão + prepared.Row."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Row):
+            return o._asdict()
+        return DefaultJSONProvider.default(o)
+
+
+def make_movies(count=20):
+    cls = row_class(MOVIE_COLUMNS)
+    return [cls((i, f'Título {i}', f'Original {i}', 'Sinopse do filme ' * 12, f'/p{i}.jpg', f'/b{i}.jpg',
+                 7.25, 1234, date(2020, 1, 1) + timedelta(days=i), '28,12', [28, 12], 512.5, False, 'pt',
+                 f'https://image.tmdb.org/t/p/w500/p{i}.jpg,https://image.tmdb.org/t/p/w780/b{i}.jpg', 42))
+            for i in range(count)]
+
+
+def make_series_details(seasons=5, episodes=10):
+    return {
+        'id': 1, 'name': 'Série', 'overview': 'Sinopse da série ' * 12, 'firstairdate': '2019-05-01',
+        'posterpath': '/p.jpg', 'imageurls': 'https://image.tmdb.org/t/p/w500/p.jpg',
+        'seasons': [{
+            'id': s, 'seasonnumber': s, 'name': f'Temporada {s}', 'episodecount': episodes,
+            'imageurls': f'https://image.tmdb.org/t/p/w500/t{s}.jpg',
+            'episodes': [{'id': s * 100 + e, 'episodenumber': e, 'name': f'Episódio {e}', 'runtime': 45,
+                          'overview': 'Resumo do episódio ' * 6, 'airdate': '2019-05-01',
+                          'imageurls': f'https://image.tmdb.org/t/p/w300/e{s}_{e}.jpg'}
+                         for e in range(1, episodes + 1)],
+        } for s in range(1, seasons + 1)],
+    }
+
+
+def make_channels(count):
+    cls = row_class(CHANNEL_COLUMNS)
+    checked_at = datetime(2024, 5, 6, 7, 8, 9)
+    return [cls((i, f'Canal {i} FHD', f'http://logos.exemplo/{i}.png', f'http://stream.exemplo/live/{i}.ts',
+                 'CANAIS | ABERTOS', None, f'http://logos.exemplo/{i}.png', 'online', 120 + i % 50, checked_at))
+            for i in range(count)]
+
+
+def cpu_per_call(func, iterations):
+    """Tempo de CPU médio (µs) de func()."""
+    for _ in range(min(100, iterations)):
+        func()
+    inicio = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - inicio) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000, help='Respostas medidas por caso')
+    parser.add_argument('--channels', type=int, default=300, help='Canais na categoria')
+    args = parser.parse_args()
+
+    before = Flask('antes')
+    before.json = RowJSONProvider(before)
+    after = Flask('depois')
+    after.json = json_codec.FastJSONProvider(after)
+    cache = json_codec.FragmentCache()
+
+    # (rótulo, dados, servida pelo FragmentCache na API)
+    cases = [
+        ('20 filmes em alta', make_movies(), False),
+        ('série + 50 episódios', make_series_details(), False),
+        (f'{args.channels} canais da categoria', make_channels(args.channels), True),
+    ]
+    print(f"Codificador: {json_codec.JSON_ENCODER}\n")
+    print(f"{'resposta':<26} {'antes (µs)':>11} {'depois (µs)':>12} {'fragmento (µs)':>15} {'ganho':>7}")
+    for label, data, cached in cases:
+        with before.app_context():
+            old = cpu_per_call(lambda: before.json.response(data).get_data(), args.iterations)
+        with after.app_context():
+            new = cpu_per_call(lambda: after.json.response(data).get_data(), args.iterations)
+            fragment = '-'
+            best = new
+            if cached:
+                def from_cache():
+                    body = cache.get(label, lambda: data)
+                    return after.response_class(body + b'\n', mimetype='application/json').get_data()
+                best = cpu_per_call(from_cache, args.iterations)
+                fragment = f'{best:.1f}'
+        print(f"{label:<26} {old:>11.1f} {new:>12.1f} {fragment:>15} {old / best:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark do parse de playlists M3U: sequencial vs. paralelo (mmap + pool de processos).
+
+Gera uma playlist sintética (por padrão com 1 milhão de entradas) e mede o
+tempo de parse_m3u e de parse_m3u_parallel com 1, 2, 4, ... núcleos.
+
+Uso:
+    python bench_parse_m3u.py [--entries 1000000] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+try:
+    from tv_multimidia import import_m3u
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    import import_m3u
+
+GROUPS = ['CANAIS | ABERTOS', 'CANAIS | ESPORTES', 'FILMES | AÇÃO', 'SÉRIES | DRAMA', 'FILMES | COMÉDIA']
+
+
+def gerar_playlist(path, entries):
+    """Escreve uma playlist sintética com `entries` canais em `path`."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U\n')
+        for i in range(entries):
+            group = GROUPS[i % len(GROUPS)]
+            f.write(
+                f'#EXTINF:-1 tvg-id="canal{i}.br" tvg-name="Canal {i} FHD" '
+                f'tvg-logo="http://logos.exemplo/{i}.png" group-title="{group}",Canal {i} FHD\n'
+                f'http://stream.exemplo/live/usuario/senha/{i}.ts\n'
+            )
+
+
+def medir(func, *args):
+    """Executa func(*args) e retorna (segundos, resultado)."""
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1_000_000, help='Entradas na playlist sintética')
+    parser.add_argument('--workers', default=None, help='Lista de núcleos a testar, ex: 1,2,4,8')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(',')]
+    else:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpus:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cpus:
+            worker_counts.append(cpus)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sintetica.m3u')
+        print(f"Gerando playlist sintética com {args.entries} entradas...")
+        gerar_playlist(path, args.entries)
+        print(f"Tamanho: {os.path.getsize(path) / (1024 * 1024):.1f} MB | Núcleos disponíveis: {cpus}\n")
+
+        # Força o caminho paralelo mesmo em arquivos pequenos
+        import_m3u.PARALLEL_MIN_BYTES = 0
+
+        base, canais = medir(import_m3u.parse_m3u, path)
+        resultados = [('sequencial', base, len(canais))]
+        for workers in worker_counts:
+            segundos, canais_par = medir(import_m3u.parse_m3u_parallel, path, workers)
+            if canais_par != canais:
+                raise SystemExit(f"ERRO: resultado paralelo com {workers} processos difere do sequencial")
+            resultados.append((f'{workers} processo(s)', segundos, len(canais_par)))
+
+    print("\n--- Resultado ---")
+    print(f"{'modo':<16}{'tempo (s)':>12}{'canais':>12}{'speedup':>10}")
+    for modo, segundos, total in resultados:
+        print(f"{modo:<16}{segundos:>12.2f}{total:>12}{base / segundos:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
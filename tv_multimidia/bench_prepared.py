@@ -0,0 +1,92 @@
+"""
+Benchmark das consultas quentes do DatabaseService: SQL comum vs. comandos preparados.
+
+Carrega os dados sintéticos do explain_harness num schema temporário e
+chama cada método de leitura `--iterations` vezes em dois modos:
+
+    sql        cursor RealDictCursor, o SQL completo a cada chamada
+    preparado  PREPARE uma vez por conexão, depois EXECUTE + prepared.Row
+
+Mostra o tempo médio por chamada (µs) e o ganho do modo preparado.
+
+Uso:
+    python -m tv_multimidia.bench_prepared [--scale 0.2] [--iterations 2000]
+"""
+
+import argparse
+import time
+
+try:
+    from tv_multimidia.database import DatabaseService
+    from tv_multimidia.explain_harness import load_synthetic_data
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import DatabaseService
+    from explain_harness import load_synthetic_data
+
+BENCH_SCHEMA = 'bench_prepared'
+
+# (rótulo, método, argumentos)
+CALLS = [
+    ('get_trending_movies', 'get_trending_movies', {}),
+    ('get_popular_series', 'get_popular_series', {}),
+    ('get_movies_by_genre', 'get_movies_by_genre', {'genre_id': 27}),
+    ('get_channels_by_category', 'get_channels_by_category', {'category': 'CANAIS | CATEGORIA 7'}),
+    ('get_distinct_categories', 'get_distinct_categories', {}),
+    ('get_series_details', 'get_series_details', {'series_id': 150}),
+    ('get_user_by_email', 'get_user_by_email', {'email': 'usuario500@exemplo.com'}),
+    ('get_cache', 'get_cache', {'key': 'last_sync'}),
+]
+
+
+def medir(db, method, kwargs, iterations):
+    """Tempo médio (µs) de uma chamada, depois de algumas de aquecimento."""
+    func = getattr(db, method)
+    details = method == 'get_series_details'
+    for _ in range(20):
+        if details:
+            db.invalidate_series_details()
+        func(**kwargs)
+    inicio = time.perf_counter()
+    for _ in range(iterations):
+        if details:
+            # Mede a consulta, não o cache em memória dos detalhes
+            db.invalidate_series_details()
+        func(**kwargs)
+    return (time.perf_counter() - inicio) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.2, help='Multiplicador do volume de dados sintéticos')
+    parser.add_argument('--iterations', type=int, default=2000, help='Chamadas medidas por consulta e modo')
+    args = parser.parse_args()
+
+    db = DatabaseService(read_dsns=[])
+    db.connect()
+    try:
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.cursor.execute(f'CREATE SCHEMA {BENCH_SCHEMA}')
+        db.cursor.execute(f'SET search_path TO {BENCH_SCHEMA}')
+        db.create_tables()
+        load_synthetic_data(db, args.scale)
+
+        print(f"\n{'consulta':<26} {'sql (µs)':>10} {'preparado (µs)':>15} {'ganho':>7}")
+        total_sql = total_prepared = 0
+        for label, method, kwargs in CALLS:
+            db.use_prepared = False
+            sql = medir(db, method, kwargs, args.iterations)
+            db.use_prepared = True
+            prepared = medir(db, method, kwargs, args.iterations)
+            total_sql += sql
+            total_prepared += prepared
+            print(f"{label:<26} {sql:>10.1f} {prepared:>15.1f} {sql / prepared:>6.2f}x")
+        print(f"{'total':<26} {total_sql:>10.1f} {total_prepared:>15.1f} {total_sql / total_prepared:>6.2f}x")
+    finally:
+        db.connection.rollback()
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.connection.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
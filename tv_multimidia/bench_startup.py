@@ -0,0 +1,150 @@
+"""
+Mede o tempo de início da API (api_server.py), do import ao primeiro tráfego.
+
+    1. import: `import api_server` num interpretador novo (mediana de --runs),
+       os módulos que mais pesam (python -X importtime) e se o import deixou
+       o processo intocado (nenhum serviço criado, variáveis de ambiente iguais);
+    2. servidor: sobe o gunicorn (um worker, schema temporário criado pelo
+       master) e mede, desde o início do processo, quando o /api/health e o
+       /api/ready respondem 200, e a latência da primeira e da segunda
+       requisição a --path.
+
+Uso:
+    python -m tv_multimidia.bench_startup [--runs 7] [--path /api/channels/categories]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+try:
+    from tv_multimidia.database import DatabaseService
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import DatabaseService
+
+BENCH_SCHEMA = 'bench_startup'
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5078
+
+# Roda num interpretador novo: tempo do import e o que ele mudou no processo
+IMPORT_PROBE = '''
+import json, os, time
+environ = dict(os.environ)
+inicio = time.perf_counter()
+import api_server
+elapsed = time.perf_counter() - inicio
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "services": sorted(api_server._services),
+    "env_changed": sorted(k for k in set(environ) | set(os.environ) if environ.get(k) != os.environ.get(k)),
+}))
+'''
+
+
+def run_import_probe():
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def heaviest_imports(count):
+    """(ms acumulados, módulo) dos imports diretos do api_server que mais pesam."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import api_server'], cwd=ROOT_DIR,
+                            check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Um nível abaixo do api_server: dois espaços de recuo
+        if name.startswith('   ') and not name.startswith('    '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def get_status(path, timeout=5):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{PORT}{path}', timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def measure_server(path, timeout=60):
+    """Segundos desde o início do gunicorn até cada marco."""
+    env = dict(os.environ)
+    env['PGOPTIONS'] = f'-c search_path={BENCH_SCHEMA}'
+    env.update({'PORT': str(PORT), 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': '4'})
+    inicio = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app'],
+                              cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    marks = {}
+    try:
+        deadline = inicio + timeout
+        while 'ready' not in marks and time.perf_counter() < deadline:
+            if 'health' not in marks and get_status('/api/health') == 200:
+                marks['health'] = time.perf_counter() - inicio
+            if 'health' in marks and get_status('/api/ready') == 200:
+                marks['ready'] = time.perf_counter() - inicio
+            else:
+                time.sleep(0.02)
+        if 'ready' not in marks:
+            raise RuntimeError('O servidor não ficou pronto (/api/ready)')
+        for label in ('first', 'second'):
+            t = time.perf_counter()
+            status = get_status(path, timeout=30)
+            marks[label] = time.perf_counter() - t
+            if status != 200:
+                raise RuntimeError(f'{path} respondeu {status}')
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7, help='Imports medidos (mediana)')
+    parser.add_argument('--path', default='/api/channels/categories', help='Rota da primeira requisição')
+    args = parser.parse_args()
+
+    probes = [run_import_probe() for _ in range(args.runs)]
+    print(f"import api_server: mediana {statistics.median(p['ms'] for p in probes):.0f} ms "
+          f"(mín {min(p['ms'] for p in probes):.0f} ms, {args.runs} execuções)")
+    print(f"  serviços criados no import: {probes[0]['services'] or 'nenhum'}")
+    print(f"  variáveis de ambiente alteradas: {probes[0]['env_changed'] or 'nenhuma'}")
+    print("  imports que mais pesam:")
+    for ms, name in heaviest_imports(8):
+        print(f"    {ms:>7.1f} ms  {name}")
+
+    db = DatabaseService(read_dsns=[])
+    db.connect()
+    try:
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.cursor.execute(f'CREATE SCHEMA {BENCH_SCHEMA}')
+        db.connection.commit()
+
+        marks = measure_server(args.path)
+        print("\ngunicorn (1 worker, schema vazio criado pelo master):")
+        print(f"  /api/health 200 em {marks['health'] * 1000:>7.0f} ms")
+        print(f"  /api/ready  200 em {marks['ready'] * 1000:>7.0f} ms")
+        print(f"  {args.path}: 1ª requisição {marks['first'] * 1000:.1f} ms, "
+              f"2ª {marks['second'] * 1000:.1f} ms")
+    finally:
+        db.connection.rollback()
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE')
+        db.connection.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
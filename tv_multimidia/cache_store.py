@@ -0,0 +1,216 @@
+"""
+Cache chave/valor com validade (TTL) por chave e backends plugáveis.
+
+    cache = create_cache_store(db)            # backend de CACHE_BACKEND
+    cache.set('last_sync', agora, ttl=3600)
+    cache.get_many(['a', 'b'])                # {'a': ...} (só as válidas)
+    cache.set_many({'a': 1, 'b': 2}, ttl=60)  # uma única transação/escrita
+
+Backends (CACHE_BACKEND):
+    postgres  tabela sync_cache (padrão): compartilhado entre processos e
+              contêineres; expiresAt indexado para a limpeza
+    memory    dicionário do processo (testes, instância única)
+    file      um arquivo JSON por chave em CACHE_FILE_DIR (compartilhado
+              entre os processos da mesma máquina)
+
+Os valores precisam ser serializáveis em JSON. As chaves vencidas deixam de
+ser retornadas na hora; a remoção física é feita por sweep(), que
+start_sweeper() roda periodicamente numa thread em segundo plano.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'postgres')
+CACHE_FILE_DIR = os.environ.get(
+    'CACHE_FILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_store')
+)
+# Validade padrão (segundos) de quem não informa ttl: as 24h de antes
+CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 24 * 60 * 60))
+# Intervalo (segundos) entre as limpezas das chaves vencidas
+CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', 5 * 60))
+
+
+class CacheStore:
+    """Interface comum; get/set/delete são atalhos para as versões em lote."""
+
+    name = None
+
+    def get_many(self, keys):
+        raise NotImplementedError
+
+    def set_many(self, items, ttl=None):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def sweep(self):
+        """Remove as chaves vencidas; retorna quantas foram removidas."""
+        raise NotImplementedError
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    @staticmethod
+    def _ttl(ttl):
+        return CACHE_DEFAULT_TTL if ttl is None else ttl
+
+    def start_sweeper(self, interval=CACHE_SWEEP_INTERVAL):
+        """Roda sweep() a cada `interval` segundos numa thread daemon."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep()
+                    if removed:
+                        print(f"Cache ({self.name}): {removed} chaves vencidas removidas.")
+                except Exception as e:
+                    print(f"Erro na limpeza do cache ({self.name}): {e}")
+
+        thread = threading.Thread(target=run, name=f'cache-sweeper-{self.name}', daemon=True)
+        thread.start()
+        return thread
+
+
+class MemoryCacheStore(CacheStore):
+    """Dicionário do processo. Os valores são guardados como recebidos (sem cópia)."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            entries = {key: self._data.get(key) for key in keys}
+        return {key: entry[1] for key, entry in entries.items() if entry and entry[0] > now}
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.time() + self._ttl(ttl)
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (expires_at, value)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class FileCacheStore(CacheStore):
+    """Um arquivo JSON por chave ({key, expiresAt, value}), gravado de forma atômica."""
+
+    name = 'file'
+
+    def __init__(self, cache_dir=CACHE_FILE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_many(self, keys):
+        now = time.time()
+        result = {}
+        for key in keys:
+            entry = self._load(self._path(key))
+            if entry and entry['key'] == key and entry['expiresAt'] > now:
+                result[key] = entry['value']
+        return result
+
+    def set_many(self, items, ttl=None):
+        expires_at = time.time() + self._ttl(ttl)
+        for key, value in items.items():
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'expiresAt': expires_at, 'value': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    def delete_many(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def sweep(self):
+        now = time.time()
+        removed = 0
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            entry = self._load(path)
+            if entry is None or entry['expiresAt'] <= now:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class PostgresCacheStore(CacheStore):
+    """Tabela sync_cache, pelos métodos cache_* do DatabaseService."""
+
+    name = 'postgres'
+
+    def __init__(self, db):
+        self.db = db
+
+    def get_many(self, keys):
+        return self.db.cache_get_many(list(keys)) if keys else {}
+
+    def set_many(self, items, ttl=None):
+        if items:
+            self.db.cache_set_many(items, self._ttl(ttl))
+
+    def delete_many(self, keys):
+        if keys:
+            self.db.cache_delete_many(list(keys))
+
+    def sweep(self):
+        return self.db.cache_sweep()
+
+
+def create_cache_store(db=None, backend=None):
+    """Cria o cache do backend pedido (ou de CACHE_BACKEND); 'postgres' exige o DatabaseService."""
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend == 'memory':
+        return MemoryCacheStore()
+    if backend == 'file':
+        return FileCacheStore()
+    if backend == 'postgres':
+        if db is None:
+            raise ValueError("O backend 'postgres' do cache precisa do DatabaseService")
+        return PostgresCacheStore(db)
+    raise ValueError(f"CACHE_BACKEND desconhecido: {backend} (use postgres, memory ou file)")
@@ -0,0 +1,169 @@
+"""
+Invalidação de caches entre processos via LISTEN/NOTIFY do PostgreSQL.
+
+Quem altera o catálogo (SyncService, import_m3u.py, update_logos.py, ...)
+incrementa a versão do escopo alterado na tabela catalog_version e envia um
+NOTIFY no canal 'catalog_changed', na mesma transação da alteração: a
+notificação só é entregue no commit, quando os dados novos já estão visíveis.
+
+Cada processo da API roda um CatalogListener (uma thread com conexão
+própria) que recebe as notificações em milissegundos e chama os callbacks
+registrados para o escopo. Se a conexão cair, ao reconectar ele compara as
+versões da tabela com as últimas vistas e dispara os escopos que mudaram
+no intervalo, então nenhuma alteração é perdida.
+"""
+
+import json
+import os
+import select
+import threading
+
+import psycopg2
+
+CATALOG_CHANNEL = 'catalog_changed'
+
+# Escopos de alteração do catálogo
+SCOPE_MOVIES = 'movies'
+SCOPE_SERIES = 'series'
+SCOPE_LISTS = 'lists'
+SCOPE_CHANNELS = 'channels'
+ALL_SCOPES = '*'
+
+# O payload do NOTIFY é limitado a 8000 bytes: acima disto os IDs são
+# omitidos e o escopo inteiro é invalidado
+MAX_NOTIFY_IDS = 500
+# Intervalo (s) entre verificações da conexão do listener e espera máxima para reconectar
+LISTEN_POLL_SECONDS = 5
+RECONNECT_MAX_SECONDS = 30
+
+CREATE_CATALOG_VERSION_SQL = '''
+    CREATE TABLE IF NOT EXISTS catalog_version(
+        scope TEXT PRIMARY KEY,
+        version BIGINT NOT NULL,
+        changedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def publish_catalog_change(cursor, scope, ids=None):
+    """
+    Incrementa a versão do escopo e envia o NOTIFY, dentro da transação do
+    cursor (o chamador faz o commit). ids: IDs alterados, se conhecidos.
+    Retorna a nova versão.
+    """
+    # Scripts avulsos podem rodar antes do create_tables da API
+    cursor.execute(CREATE_CATALOG_VERSION_SQL)
+    cursor.execute('''
+        INSERT INTO catalog_version (scope, version, changedAt)
+        VALUES (%s, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (scope) DO UPDATE SET
+            version = catalog_version.version + 1,
+            changedAt = EXCLUDED.changedAt
+        RETURNING version
+    ''', (scope,))
+    row = cursor.fetchone()
+    version = row['version'] if isinstance(row, dict) else row[0]
+
+    payload = {'scope': scope, 'version': version, 'pid': os.getpid()}
+    if ids is not None and len(ids) <= MAX_NOTIFY_IDS:
+        payload['ids'] = list(ids)
+    cursor.execute('SELECT pg_notify(%s, %s)', (CATALOG_CHANNEL, json.dumps(payload)))
+    return version
+
+
+class CatalogListener:
+    """Thread que escuta 'catalog_changed' e chama os callbacks de cada escopo."""
+
+    def __init__(self, conn_string):
+        self.conn_string = conn_string
+        self._callbacks = {}
+        self._versions = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = threading.Event()
+
+    def subscribe(self, scope, callback):
+        """
+        Registra callback(change) para um escopo (ou ALL_SCOPES).
+        change: {'scope', 'version', 'ids' (None = escopo inteiro)}.
+        """
+        self._callbacks.setdefault(scope, []).append(callback)
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='catalog-listener', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _dispatch(self, change):
+        version = change.get('version') or 0
+        if version <= self._versions.get(change['scope'], 0):
+            return  # Já processada (ex: entregue de novo após reconectar)
+        self._versions[change['scope']] = version
+        for callback in self._callbacks.get(change['scope'], []) + self._callbacks.get(ALL_SCOPES, []):
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"Erro no callback de invalidação ({change['scope']}): {e}")
+
+    def _catch_up(self, conn, first_connection):
+        """Compara catalog_version com as versões já vistas (alterações perdidas sem conexão)."""
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_CATALOG_VERSION_SQL)
+            cursor.execute('SELECT scope, version FROM catalog_version')
+            rows = cursor.fetchall()
+        for scope, version in rows:
+            if first_connection:
+                self._versions[scope] = version  # Ponto de partida: o cache local ainda está vazio
+            else:
+                self._dispatch({'scope': scope, 'version': version, 'ids': None})
+
+    def _run(self):
+        delay = 1
+        first_connection = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.conn_string)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CATALOG_CHANNEL}')
+                # Só depois do LISTEN: nada publicado entre a leitura e a escuta se perde
+                self._catch_up(conn, first_connection)
+                first_connection = False
+                self.connected.set()
+                delay = 1
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        with conn.cursor() as cursor:
+                            cursor.execute('SELECT 1')  # Detecta conexão perdida
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            change = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        change.setdefault('ids', None)
+                        self._dispatch(change)
+            except psycopg2.Error as e:
+                self.connected.clear()
+                print(f"Listener de catálogo desconectado ({e}); reconectando em {delay}s...")
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+def start_catalog_listener(conn_string, subscriptions):
+    """Cria e inicia o listener. subscriptions: [(escopo, callback), ...]."""
+    listener = CatalogListener(conn_string)
+    for scope, callback in subscriptions:
+        listener.subscribe(scope, callback)
+    return listener.start()
@@ -4,46 +4,392 @@ import os
 import requests
 import json
 import time
-import csv
-from datetime import datetime, timedelta
+import threading
+import weakref
+from collections import OrderedDict
+
+# Colunas de canal com o logo trocado pelo placeholder (LOGO_PLACEHOLDER_URL)
+# quando o validador (check_logos.py --validate) marcou a URL como quebrada.
+CHANNEL_COLUMNS = """
+    c.id, c.name,
+    CASE WHEN lh.status = 'dead' THEN %(logo_placeholder)s ELSE c.logoPath END AS logoPath,
+    c.streamUrl, c.category, c.description,
+    CASE WHEN lh.status = 'dead' THEN %(logo_placeholder)s ELSE c.imageUrls END AS imageUrls
+"""
+CHANNEL_LOGO_JOIN = "LEFT JOIN logo_health lh ON lh.url = c.logoPath"
+
+# genreIds ("28,12") -> ARRAY[28, 12]; valores fora do formato viram array vazio
+GENRES_EXPRESSION = r"""
+    CASE WHEN genreIds ~ '^[0-9]+(,[0-9]+)*$'
+         THEN string_to_array(genreIds, ',')::INTEGER[]
+         ELSE '{}'::INTEGER[] END
+"""
+# Limite de itens por página nas listagens paginadas
+MAX_PAGE_SIZE = 100
+
+# Listas do TMDB gravadas em list_membership pelo SyncService ("<tipo>:<lista>")
+LIST_TRENDING_MOVIES = 'movie:trending/day'
+LIST_POPULAR_MOVIES = 'movie:popular'
+LIST_TRENDING_SERIES = 'tv:trending/day'
+LIST_POPULAR_SERIES = 'tv:popular'
+
+# Intervalo (segundos) entre sincronizações automáticas com o TMDB
+SYNC_INTERVAL = int(os.environ.get('SYNC_INTERVAL', 24 * 60 * 60))
+# Timeout (conexão, leitura) em segundos de cada chamada ao TMDB
+TMDB_TIMEOUT = (5, 20)
+
+USE_PREPARED_STATEMENTS = os.environ.get('USE_PREPARED_STATEMENTS', '1').lower() not in ('0', 'false', 'no')
+
+# Geração da sincronização em andamento (ou da última): carimba filmes/séries
+# vistos pela sincronização em lastSeenGeneration (usado pelo prune_catalog.py)
+CURRENT_GENERATION_SQL = "(SELECT last_value FROM sync_generation_seq)"
+
+# O que a API precisa no schema (tabelas e a coluna mais recente de cada
+# migração do create_tables); o /api/ready responde 503 enquanto faltar algo
+REQUIRED_TABLES = (
+    'movies', 'tv_series', 'channels', 'channel_health', 'logo_health', 'seasons', 'episodes',
+    'sync_cache', 'list_membership', 'list_generation', 'catalog_version', 'users',
+)
+REQUIRED_COLUMNS = (
+    ('sync_cache', 'expiresat'),
+    ('movies', 'genres'), ('movies', 'lastseengeneration'),
+    ('tv_series', 'genres'), ('tv_series', 'lastseengeneration'),
+)
+MISSING_SCHEMA_QUERY = """
+    SELECT name FROM unnest(%(tables)s::TEXT[]) AS name
+    WHERE to_regclass(name) IS NULL
+    UNION ALL
+    SELECT t || '.' || c FROM unnest(%(column_tables)s::TEXT[], %(columns)s::TEXT[]) AS required(t, c)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = to_regclass(t) AND attname = c AND NOT attisdropped
+    )
+"""
+
+# Cache dos detalhes de série (série + temporadas + episódios) por processo
+SERIES_DETAILS_CACHE_SIZE = int(os.environ.get('SERIES_DETAILS_CACHE_SIZE', 256))
+# Validade máxima (segundos); a sincronização da série invalida antes disso
+SERIES_DETAILS_TTL = int(os.environ.get('SERIES_DETAILS_TTL', 60 * 60))
+
+# Série com as temporadas e os episódios aninhados, montada num único
+# comando (json_agg); a ordem vem dos índices seriesId/seasonId.
+SERIES_DETAILS_QUERY = """
+    SELECT to_jsonb(s) || jsonb_build_object('seasons', COALESCE((
+        SELECT jsonb_agg(to_jsonb(se) || jsonb_build_object('episodes', COALESCE((
+                   SELECT jsonb_agg(to_jsonb(e) ORDER BY e.episodeNumber)
+                   FROM episodes e WHERE e.seasonId = se.id
+               ), '[]'::jsonb)) ORDER BY se.seasonNumber)
+        FROM seasons se WHERE se.seriesId = s.id
+    ), '[]'::jsonb)) AS details
+    FROM tv_series s
+    WHERE s.id = %s
+"""
+
+
+def genre_list_key(media_type, genre_id):
+    """Chave da lista de um gênero ('movie', 28) -> 'movie:genre/28'."""
+    return f'{media_type}:genre/{genre_id}'
+
+
+# --- Consultas de leitura do catálogo ---
+# Compartilhadas pelo DatabaseService e pelo AsyncDatabaseService (async_database.py)
+
+def ranked_list_query(table):
+    """
+    Itens da geração atual de uma lista, pela posição. A geração vem de uma
+    subconsulta escalar: list_membership é lida já na ordem do índice (sem
+    Sort) e cada item é buscado pela chave primária.
+    """
+    return f"""
+        SELECT t.* FROM list_membership l
+        JOIN {table} t ON t.id = l.mediaId
+        WHERE l.listKey = %(key)s
+          AND l.generation = (SELECT generation FROM list_generation WHERE listKey = %(key)s)
+        ORDER BY l.rank
+        LIMIT %(limit)s
+    """
+
+
+def popular_query(table):
+    """Itens por popularidade (antes da primeira sincronização que grava as listas)."""
+    return f"SELECT * FROM {table} ORDER BY popularity DESC NULLS LAST, id LIMIT %s"
+
+
+def by_genre_query(table):
+    """Página de um gênero pelo índice GIN de `genres`; parâmetros (gênero, limite, offset)."""
+    return f"""
+        SELECT * FROM {table}
+        WHERE genres @> ARRAY[%s]::INTEGER[]
+        ORDER BY popularity DESC NULLS LAST, id
+        LIMIT %s OFFSET %s
+    """
+
+
+def page_window(page, limit):
+    """(limite, offset) de uma página, com o limite em [1, MAX_PAGE_SIZE]."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    return limit, (max(1, int(page)) - 1) * limit
+
+
+# "Loose index scan": pula de categoria em categoria pelo índice (category, name),
+# uma busca por categoria, em vez de ler a tabela inteira para o DISTINCT.
+DISTINCT_CATEGORIES_QUERY = """
+    WITH RECURSIVE cats AS (
+        (SELECT category FROM channels WHERE category > '' ORDER BY category LIMIT 1)
+        UNION ALL
+        SELECT (SELECT c.category FROM channels c
+                WHERE c.category > cats.category ORDER BY c.category LIMIT 1)
+        FROM cats WHERE cats.category IS NOT NULL
+    )
+    SELECT category FROM cats WHERE category IS NOT NULL
+"""
+
+
+# Chaves ainda válidas do sync_cache (statement_timestamp: a transação de leitura pode estar aberta há tempo)
+CACHE_GET_MANY_QUERY = """
+    SELECT key, data FROM sync_cache
+    WHERE key = ANY(%s) AND (expiresAt IS NULL OR expiresAt > statement_timestamp())
+"""
+
+
+def channels_by_category_query(hide_dead=False, rank_by_health=False):
+    """Canais de uma categoria com a saúde do stream; parâmetros (category, logo_placeholder)."""
+    query = f"""
+        SELECT {CHANNEL_COLUMNS},
+               h.status AS streamStatus, h.latencyMs AS streamLatencyMs, h.checkedAt AS streamCheckedAt
+        FROM channels c
+        LEFT JOIN channel_health h ON h.streamUrl = c.streamUrl
+        {CHANNEL_LOGO_JOIN}
+        WHERE c.category = %(category)s
+    """
+    if hide_dead:
+        query += " AND (h.status IS NULL OR h.status = 'online')"
+    if rank_by_health:
+        query += " ORDER BY CASE WHEN h.status = 'online' THEN 0 WHEN h.status IS NULL THEN 1 ELSE 2 END, c.name"
+    else:
+        query += " ORDER BY c.name"
+    return query
+
+try:
+    from tv_multimidia.logo_matcher import LogoMatcher, MATCH_TRIGRAM
+    from tv_multimidia.logo_index import load_logo_index
+    from tv_multimidia.read_replicas import READ_YOUR_WRITES_SECONDS, ReplicaSet
+    from tv_multimidia.cache_store import CACHE_DEFAULT_TTL, PostgresCacheStore
+    from tv_multimidia.prepared import PreparedStatements
+    from tv_multimidia import metrics
+    from tv_multimidia.slow_queries import connection_factory
+    from tv_multimidia.catalog_events import (
+        CREATE_CATALOG_VERSION_SQL, SCOPE_CHANNELS, SCOPE_LISTS, SCOPE_MOVIES, SCOPE_SERIES,
+        publish_catalog_change,
+    )
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from logo_matcher import LogoMatcher, MATCH_TRIGRAM
+    from logo_index import load_logo_index
+    from read_replicas import READ_YOUR_WRITES_SECONDS, ReplicaSet
+    from cache_store import CACHE_DEFAULT_TTL, PostgresCacheStore
+    from prepared import PreparedStatements
+    import metrics
+    from slow_queries import connection_factory
+    from catalog_events import (
+        CREATE_CATALOG_VERSION_SQL, SCOPE_CHANNELS, SCOPE_LISTS, SCOPE_MOVIES, SCOPE_SERIES,
+        publish_catalog_change,
+    )
 
 class DatabaseService:
-    def __init__(self, host='localhost', port=5432, dbname='tv_multimidia', user='tv_user', password='tv_password'):
+    def __init__(self, host='localhost', port=5432, dbname='tv_multimidia', user='tv_user', password='tv_password',
+                 read_dsns=None):
         self.host = host
         self.port = port
         self.dbname = dbname
         self.user = user
         self.password = password
-        self.connection = None
-        self.cursor = None
-
-        # Configurar locale para Windows - problema de encoding
-        import os
-        os.environ['PYTHONIOENCODING'] = 'utf-8'
-        os.environ['LC_ALL'] = 'C.UTF-8'
-        os.environ['LANG'] = 'C.UTF-8'
-        # Forçar ASCII para evitar problemas com caracteres especiais
-        os.environ['PYTHONUTF8'] = '0'
+        # Uma conexão com o primário por thread (o "pool" do processo): com vários
+        # threads por worker, cada requisição usa a sua conexão e a sua transação.
+        # Referência fraca: a conexão de uma thread encerrada é fechada junto com ela
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        self._connected = False
+        # Réplicas de leitura (DB_READ_DSNS); sem réplicas, tudo vai para o primário
+        self.replicas = ReplicaSet(read_dsns)
+        self.read_your_writes = READ_YOUR_WRITES_SECONDS
+        self._last_write_at = None
+        # Consultas quentes como comandos preparados (desligue com um pooler em
+        # modo transação, ex: PgBouncer, onde a sessão não é fixa)
+        self.prepared = PreparedStatements()
+        self.use_prepared = USE_PREPARED_STATEMENTS
+
+        # Logo usado no lugar de URLs quebradas (None = o app mostra o ícone padrão)
+        self.logo_placeholder = os.getenv('LOGO_PLACEHOLDER_URL') or None
+
+        # {id da série: (expira_em, detalhes)}, em ordem de uso (LRU)
+        self._series_details_cache = OrderedDict()
+        self._series_details_lock = threading.Lock()
+
+    def conn_string(self):
+        """String de conexão (valores do __init__, com override por env vars)."""
+        host = os.getenv('DB_HOST', self.host)
+        port = os.getenv('DB_PORT', self.port)
+        dbname = os.getenv('DB_NAME', self.dbname)
+        user = os.getenv('DB_USER', self.user)
+        password = os.getenv('DB_PASSWORD', self.password)
+        return f"host={host} port={port} dbname={dbname} user={user} password={password}"
+
+    @property
+    def connection(self):
+        """Conexão com o primário da thread atual (aberta no primeiro uso após connect())."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None and self._connected:
+            connection = self._open_connection()
+        return connection
+
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
+
+    @property
+    def cursor(self):
+        """Cursor (RealDictCursor) da conexão da thread atual."""
+        if getattr(self._local, 'cursor', None) is None:
+            self.connection  # Abre a conexão (e o cursor) desta thread, se preciso
+        return getattr(self._local, 'cursor', None)
+
+    @cursor.setter
+    def cursor(self, value):
+        self._local.cursor = value
+
+    def _open_connection(self):
+        # Cursores cronometrados: comandos acima de SLOW_QUERY_MS vão para o log (slow_queries.py)
+        connection = psycopg2.connect(self.conn_string(), connection_factory=connection_factory())
+        connection.set_client_encoding('UTF8')
+        metrics.connection_opened(connection)
+        self._local.connection = connection
+        self._local.cursor = connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        with self._connections_lock:
+            self._connections.add(connection)
+        return connection
 
     def connect(self):
         """Conecta ao banco de dados PostgreSQL."""
         try:
             # RECOMENDAÇÃO: Usa os valores do __init__, permitindo override por env vars
-            host = os.getenv('DB_HOST', self.host)
-            port = os.getenv('DB_PORT', self.port)
-            dbname = os.getenv('DB_NAME', self.dbname)
-            user = os.getenv('DB_USER', self.user)
-            password = os.getenv('DB_PASSWORD', self.password)
-            
-            conn_string = f"host={host} port={port} dbname={dbname} user={user} password={password}"
-            self.connection = psycopg2.connect(conn_string)
-            self.connection.set_client_encoding('UTF8')
-            self.cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            print(f"Conectado ao banco de dados PostgreSQL em {host}:{port}")
+            connection = self._open_connection()
+            self._connected = True
+            print(f"Conectado ao banco de dados PostgreSQL em "
+                  f"{connection.info.host}:{connection.info.port}")
+            self.replicas.connect()
         except psycopg2.Error as e:
             print(f"Erro ao conectar ao PostgreSQL: {e}")
             raise
 
+    def ping(self):
+        """
+        Confirma que a conexão desta thread responde (SELECT 1), descartando
+        uma transação abortada; se a conexão caiu, abre outra uma vez.
+        """
+        for attempt in range(2):
+            try:
+                self.connection.rollback()
+                self.cursor.execute('SELECT 1')
+                self.cursor.fetchall()
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if attempt:
+                    raise
+                self._open_connection()
+
+    def reset_failed_transaction(self):
+        """
+        Desfaz a transação desta thread se um comando falhou nela (senão todos
+        os próximos da mesma conexão falham). Não abre conexão.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if (connection is not None and not connection.closed
+                and connection.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR):
+            connection.rollback()
+
+    def missing_schema_objects(self):
+        """Tabelas/colunas de REQUIRED_TABLES/REQUIRED_COLUMNS que não existem (vazio = pronto)."""
+        self.cursor.execute(MISSING_SCHEMA_QUERY, {
+            'tables': list(REQUIRED_TABLES),
+            'column_tables': [table for table, _ in REQUIRED_COLUMNS],
+            'columns': [column for _, column in REQUIRED_COLUMNS],
+        })
+        missing = [row['name'] for row in self.cursor.fetchall()]
+        self.connection.rollback()
+        return missing
+
+    @metrics.timed_query('commit')
+    def commit(self):
+        """Confirma a transação no primário (e abre a janela de read-your-writes)."""
+        self.connection.commit()
+        self._last_write_at = time.monotonic()
+
+    def _read_replica(self):
+        """(réplica, conexão) para a próxima leitura, ou None para ler no primário."""
+        if not self.replicas:
+            return None
+        if (self._last_write_at is not None
+                and time.monotonic() - self._last_write_at < self.read_your_writes):
+            return None
+        return self.replicas.acquire()
+
+    def _read(self, query, params=None, name='other'):
+        """
+        Executa uma leitura numa réplica (ou no primário) e retorna todas as linhas.
+        `name` identifica a consulta nas métricas (db_query_duration_seconds).
+        """
+        lease = self._read_replica()
+        if lease is not None:
+            replica, connection = lease
+            try:
+                # Cursor próprio: a conexão da réplica é compartilhada entre as threads
+                with metrics.track_query(name, 'replica'), \
+                        connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                metrics.observe_rows(name, rows)
+                return rows
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self.replicas.mark_failed(replica, e, connection)
+        with metrics.track_query(name):
+            self.cursor.execute(query, params)
+            rows = self.cursor.fetchall()
+        metrics.observe_rows(name, rows)
+        return rows
+
+    def _read_prepared(self, name, query, params=None, primary=False):
+        """
+        Como _read, para as consultas quentes: `query` é registrada como o
+        comando preparado `name` (PREPARE uma vez por conexão, depois só
+        EXECUTE) e as linhas voltam como prepared.Row.
+        primary=True ignora as réplicas.
+        """
+        if not self.use_prepared:
+            if primary:
+                with metrics.track_query(name):
+                    self.cursor.execute(query, params)
+                    rows = self.cursor.fetchall()
+                metrics.observe_rows(name, rows)
+                return rows
+            return self._read(query, params, name)
+        if name not in self.prepared:
+            self.prepared.register(name, query)
+        lease = None if primary else self._read_replica()
+        if lease is not None:
+            replica, connection = lease
+            try:
+                with metrics.track_query(name, 'replica'):
+                    rows = self.prepared.execute(connection, name, params)
+                metrics.observe_rows(name, rows)
+                return rows
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self.replicas.mark_failed(replica, e, connection)
+        with metrics.track_query(name):
+            rows = self.prepared.execute(self.connection, name, params)
+        metrics.observe_rows(name, rows)
+        return rows
+
     def create_tables(self):
         """Cria as tabelas do banco de dados."""
         # Tabela de filmes
@@ -102,8 +448,37 @@ class DatabaseService:
         ''')
         # Adiciona um índice na coluna 'name' para otimizar a atualização pelo CSV
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_channels_name ON channels(name);')
-        # Adiciona um índice na coluna 'category' para otimizar a busca por categoria
-        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_channels_category ON channels(category);')
+        # Índice composto para a busca por categoria: filtra por 'category' e já
+        # entrega os canais ordenados por nome (sem Sort). Substitui o índice só
+        # de 'category', que virou prefixo deste.
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_channels_category_name ON channels(category, name);')
+        self.cursor.execute('DROP INDEX IF EXISTS idx_channels_category;')
+        # Busca pela URL do logo: o proxy de imagens só serve logos do catálogo
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_channels_logopath ON channels(logoPath);')
+
+        # Tabela de saúde dos streams (preenchida pelo stream_prober.py).
+        # Chaveada pela URL para sobreviver ao TRUNCATE de channels a cada importação.
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS channel_health(
+                streamUrl TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                httpStatus INTEGER,
+                latencyMs INTEGER,
+                checkedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Tabela de validação dos logos (preenchida por check_logos.py --validate)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS logo_health(
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                httpStatus INTEGER,
+                sizeBytes INTEGER,
+                latencyMs INTEGER,
+                checkedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
         # Tabela de temporadas
         self.cursor.execute('''
@@ -139,6 +514,10 @@ class DatabaseService:
             )
         ''')
 
+        # Detalhes da série: temporadas por série e episódios por temporada
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_seasons_series_id ON seasons(seriesId);')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_episodes_season_id ON episodes(seasonId);')
+
         # Tabela para cache de sincronização
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS sync_cache(
@@ -147,6 +526,37 @@ class DatabaseService:
                 data TEXT
             )
         ''')
+        # Validade por chave (cache_store.py); as chaves antigas valiam 24h
+        self.cursor.execute('ALTER TABLE sync_cache ADD COLUMN IF NOT EXISTS expiresAt TIMESTAMP')
+        self.cursor.execute('''
+            UPDATE sync_cache SET expiresAt = to_timestamp(timestamp / 1000.0)::timestamp + INTERVAL '1 day'
+            WHERE expiresAt IS NULL AND timestamp IS NOT NULL
+        ''')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_sync_cache_expires_at ON sync_cache(expiresAt);')
+
+        # Composição das listas do TMDB (em alta, populares, por gênero) em cada
+        # sincronização: só os IDs e a posição. list_generation aponta a geração
+        # atual de cada lista; as anteriores são apagadas ao gravar uma nova.
+        self.cursor.execute('CREATE SEQUENCE IF NOT EXISTS sync_generation_seq')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS list_membership(
+                listKey TEXT NOT NULL,
+                generation BIGINT NOT NULL,
+                rank INTEGER NOT NULL,
+                mediaId INTEGER NOT NULL,
+                PRIMARY KEY (listKey, generation, rank)
+            )
+        ''')
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS list_generation(
+                listKey TEXT PRIMARY KEY,
+                generation BIGINT NOT NULL,
+                syncedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Versão de cada escopo do catálogo (invalidação de caches entre processos)
+        self.cursor.execute(CREATE_CATALOG_VERSION_SQL)
 
         # Tabela de usuários
         self.cursor.execute('''
@@ -161,14 +571,39 @@ class DatabaseService:
             )
         ''')
 
-        self.connection.commit()
+        # Gêneros como INTEGER[] (coluna gerada a partir de genreIds, que continua
+        # sendo gravado como texto "28,12"), com índice GIN para a busca por gênero.
+        for table in ('movies', 'tv_series'):
+            self.cursor.execute(f'''
+                ALTER TABLE {table} ADD COLUMN IF NOT EXISTS genres INTEGER[]
+                GENERATED ALWAYS AS ({GENRES_EXPRESSION}) STORED
+            ''')
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_genres ON {table} USING GIN (genres);')
+            # Em alta/populares e listagens por gênero: ORDER BY popularity DESC NULLS LAST, id
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_popularity ON {table}(popularity DESC NULLS LAST, id);')
+            # Última geração de sincronização em que o título apareceu; os títulos
+            # já existentes contam como vistos agora (não são podados de imediato)
+            self.cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS lastSeenGeneration BIGINT')
+            self.cursor.execute(f'UPDATE {table} SET lastSeenGeneration = {CURRENT_GENERATION_SQL} WHERE lastSeenGeneration IS NULL')
+
+        # imageUrls passou a guardar só os caminhos do TMDB (a URL é montada na API
+        # com o tamanho pedido). Converte as URLs completas gravadas antes.
+        for table in ('movies', 'tv_series', 'seasons', 'episodes'):
+            self.cursor.execute(f'''
+                UPDATE {table}
+                SET imageUrls = regexp_replace(imageUrls, 'https?://image\\.tmdb\\.org/t/p/[^/]+', '', 'g')
+                WHERE imageUrls LIKE '%image.tmdb.org/t/p/%'
+            ''')
+
+        self.commit()
         print("Tabelas criadas com sucesso.")
 
+    @metrics.timed_query('save_movies_batch')
     def save_movies_batch(self, movies):
         """Salva múltiplos filmes no banco de dados."""
         query = '''
-            INSERT INTO movies (id, title, overview, posterPath, backdropPath, releaseDate, voteAverage, voteCount, genreIds, adult, originalLanguage, originalTitle, popularity, video, imageUrls)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO movies (id, title, overview, posterPath, backdropPath, releaseDate, voteAverage, voteCount, genreIds, adult, originalLanguage, originalTitle, popularity, video, imageUrls, lastSeenGeneration)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, {current_generation})
             ON CONFLICT (id) DO UPDATE SET
                 title = EXCLUDED.title,
                 overview = EXCLUDED.overview,
@@ -183,17 +618,21 @@ class DatabaseService:
                 originalTitle = EXCLUDED.originalTitle,
                 popularity = EXCLUDED.popularity,
                 video = EXCLUDED.video,
-                imageUrls = EXCLUDED.imageUrls
-        '''
+                imageUrls = EXCLUDED.imageUrls,
+                lastSeenGeneration = EXCLUDED.lastSeenGeneration
+        '''.format(current_generation=CURRENT_GENERATION_SQL)
         psycopg2.extras.execute_batch(self.cursor, query, movies)
-        self.connection.commit()
+        # Mesma transação: o NOTIFY só é entregue no commit, com os filmes já visíveis
+        publish_catalog_change(self.cursor, SCOPE_MOVIES, [movie[0] for movie in movies])
+        self.commit()
         print(f"{len(movies)} filmes salvos com sucesso.")
 
+    @metrics.timed_query('save_tv_series_batch')
     def save_tv_series_batch(self, series):
         """Salva múltiplas séries no banco de dados."""
         query = '''
-            INSERT INTO tv_series (id, name, overview, posterPath, backdropPath, firstAirDate, voteAverage, voteCount, genreIds, adult, originalLanguage, originalName, popularity, originCountry, imageUrls)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO tv_series (id, name, overview, posterPath, backdropPath, firstAirDate, voteAverage, voteCount, genreIds, adult, originalLanguage, originalName, popularity, originCountry, imageUrls, lastSeenGeneration)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, {current_generation})
             ON CONFLICT (id) DO UPDATE SET
                 name = EXCLUDED.name,
                 overview = EXCLUDED.overview,
@@ -208,12 +647,15 @@ class DatabaseService:
                 originalName = EXCLUDED.originalName,
                 popularity = EXCLUDED.popularity,
                 originCountry = EXCLUDED.originCountry,
-                imageUrls = EXCLUDED.imageUrls
-        '''
+                imageUrls = EXCLUDED.imageUrls,
+                lastSeenGeneration = EXCLUDED.lastSeenGeneration
+        '''.format(current_generation=CURRENT_GENERATION_SQL)
         psycopg2.extras.execute_batch(self.cursor, query, series)
-        self.connection.commit()
+        publish_catalog_change(self.cursor, SCOPE_SERIES, [serie[0] for serie in series])
+        self.commit()
         print(f"{len(series)} séries salvas com sucesso.")
 
+    @metrics.timed_query('save_channels_batch')
     def save_channels_batch(self, channels):
         """Salva múltiplos canais no banco de dados."""
         query = '''
@@ -228,11 +670,17 @@ class DatabaseService:
                 imageUrls = EXCLUDED.imageUrls
         '''
         psycopg2.extras.execute_batch(self.cursor, query, channels)
-        self.connection.commit()
+        publish_catalog_change(self.cursor, SCOPE_CHANNELS)
+        self.commit()
         print(f"{len(channels)} canais salvos com sucesso.")
 
-    def save_seasons_batch(self, seasons):
-        """Salva múltiplas temporadas no banco de dados."""
+    @metrics.timed_query('save_seasons_batch')
+    def save_seasons_batch(self, seasons, commit=True):
+        """
+        Salva múltiplas temporadas no banco de dados. commit=False deixa a
+        transação aberta (ex: temporadas e episódios de uma série confirmados
+        juntos pelo publish_catalog_change).
+        """
         query = '''
             INSERT INTO seasons (id, seriesId, seasonNumber, name, overview, airDate, episodeCount, posterPath, voteAverage, imageUrls)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
@@ -248,11 +696,13 @@ class DatabaseService:
                 imageUrls = EXCLUDED.imageUrls
         '''
         psycopg2.extras.execute_batch(self.cursor, query, seasons)
-        self.connection.commit()
+        if commit:
+            self.commit()
         print(f"{len(seasons)} temporadas salvas com sucesso.")
 
-    def save_episodes_batch(self, episodes):
-        """Salva múltiplos episódios no banco de dados."""
+    @metrics.timed_query('save_episodes_batch')
+    def save_episodes_batch(self, episodes, commit=True):
+        """Salva múltiplos episódios no banco de dados (commit=False: ver save_seasons_batch)."""
         query = '''
             INSERT INTO episodes (id, seriesId, seasonId, episodeNumber, name, overview, airDate, runtime, stillPath, voteAverage, voteCount, imageUrls)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
@@ -270,23 +720,22 @@ class DatabaseService:
                 imageUrls = EXCLUDED.imageUrls
         '''
         psycopg2.extras.execute_batch(self.cursor, query, episodes)
-        self.connection.commit()
+        if commit:
+            self.commit()
         print(f"{len(episodes)} episódios salvos com sucesso.")
 
     def get_all_movies(self):
         """(Ineficiente) Retorna TODOS os filmes. Use com cuidado."""
-        self.cursor.execute('SELECT * FROM movies')
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in self._read('SELECT * FROM movies', name='all_movies')]
 
     def get_all_tv_series(self):
         """(Ineficiente) Retorna TODAS as séries. Use com cuidado."""
-        self.cursor.execute('SELECT * FROM tv_series')
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in self._read('SELECT * FROM tv_series', name='all_tv_series')]
 
     def get_all_channels(self):
         """(Ineficiente) Retorna TODOS os canais. Use com cuidado."""
-        self.cursor.execute('SELECT * FROM channels')
-        return [dict(row) for row in self.cursor.fetchall()]
+        query = f"SELECT {CHANNEL_COLUMNS} FROM channels c {CHANNEL_LOGO_JOIN}"
+        return [dict(row) for row in self._read(query, {'logo_placeholder': self.logo_placeholder}, 'all_channels')]
     
     ## --- NOVAS FUNÇÕES EFICIENTES ---
     # Estas funções são chamadas pelo app.py atualizado para 
@@ -294,44 +743,198 @@ class DatabaseService:
     # de filtrar e ordenar, o que é muito mais rápido.
 
     def get_trending_movies(self, limit=20):
-        """(Eficiente) Retorna filmes em alta, ordenados por popularidade."""
-        query = "SELECT * FROM movies ORDER BY popularity DESC LIMIT %s"
-        self.cursor.execute(query, (limit,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        """(Eficiente) Retorna os filmes em alta do dia, na ordem do TMDB."""
+        return self.get_ranked_list('movies', LIST_TRENDING_MOVIES, limit)
 
     def get_popular_movies(self, limit=20):
-        """(Eficiente) Retorna filmes populares, ordenados por popularidade."""
-        # Nota: Usando a mesma lógica de 'trending' por popularidade.
-        # Ajuste o 'ORDER BY' se tiver um critério diferente.
-        query = "SELECT * FROM movies ORDER BY popularity DESC LIMIT %s"
-        self.cursor.execute(query, (limit,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        """(Eficiente) Retorna os filmes populares, na ordem do TMDB."""
+        return self.get_ranked_list('movies', LIST_POPULAR_MOVIES, limit)
 
     def get_trending_series(self, limit=20):
-        """(Eficiente) Retorna séries em alta, ordenadas por popularidade."""
-        query = "SELECT * FROM tv_series ORDER BY popularity DESC LIMIT %s"
-        self.cursor.execute(query, (limit,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        """(Eficiente) Retorna as séries em alta do dia, na ordem do TMDB."""
+        return self.get_ranked_list('tv_series', LIST_TRENDING_SERIES, limit)
 
     def get_popular_series(self, limit=20):
-        """(Eficiente) Retorna séries populares, ordenadas por popularidade."""
-        query = "SELECT * FROM tv_series ORDER BY popularity DESC LIMIT %s"
-        self.cursor.execute(query, (limit,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        """(Eficiente) Retorna as séries populares, na ordem do TMDB."""
+        return self.get_ranked_list('tv_series', LIST_POPULAR_SERIES, limit)
+
+    def get_ranked_list(self, table, list_key, limit=20):
+        """
+        Itens da geração atual de uma lista, pela posição: busca no índice
+        (listKey, generation, rank) e um acesso por chave primária por item.
+        Antes da primeira sincronização que grava a lista, usa a popularidade.
+        """
+        rows = self._read_prepared(f'ranked_list_{table}', ranked_list_query(table),
+                                   {'key': list_key, 'limit': limit})
+        if rows:
+            return rows
+        return self._read_prepared(f'popular_{table}', popular_query(table), (limit,))
+
+    def next_sync_generation(self):
+        """Número da nova geração (uma por sincronização)."""
+        self.cursor.execute("SELECT nextval('sync_generation_seq') AS generation")
+        return self.cursor.fetchone()['generation']
+
+    @metrics.timed_query('save_list_membership')
+    def save_list_membership(self, list_key, media_ids, generation):
+        """
+        Grava os IDs de uma lista, na ordem recebida, como a geração atual dela
+        e apaga as gerações anteriores (uma única transação, com o aviso aos
+        outros processos: quem lê vê a lista antiga ou a nova inteira).
+        """
+        rows = [(list_key, generation, rank, media_id) for rank, media_id in enumerate(media_ids, 1)]
+        if not rows:
+            return
+        psycopg2.extras.execute_values(self.cursor, '''
+            INSERT INTO list_membership (listKey, generation, rank, mediaId)
+            VALUES %s
+            ON CONFLICT (listKey, generation, rank) DO UPDATE SET mediaId = EXCLUDED.mediaId
+        ''', rows)
+        self.cursor.execute('''
+            INSERT INTO list_generation (listKey, generation, syncedAt)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (listKey) DO UPDATE SET
+                generation = EXCLUDED.generation,
+                syncedAt = EXCLUDED.syncedAt
+            WHERE list_generation.generation <= EXCLUDED.generation
+        ''', (list_key, generation))
+        self.cursor.execute(
+            'DELETE FROM list_membership WHERE listKey = %s AND generation < %s',
+            (list_key, generation)
+        )
+        publish_catalog_change(self.cursor, SCOPE_LISTS)
+        self.commit()
+
+    def get_series_details(self, series_id):
+        """
+        (Eficiente) Série com suas temporadas e episódios, num único comando.
+        O resultado fica em cache por série até a próxima sincronização dela
+        (ou até SERIES_DETAILS_TTL). Retorna None se a série não existir.
+        """
+        now = time.monotonic()
+        with self._series_details_lock:
+            cached = self._series_details_cache.get(series_id)
+            if cached and cached[0] > now:
+                self._series_details_cache.move_to_end(series_id)
+                return cached[1]
+
+        rows = self._read_prepared('series_details', SERIES_DETAILS_QUERY, (series_id,))
+        details = rows[0]['details'] if rows else None
+        if details is not None:
+            with self._series_details_lock:
+                self._series_details_cache[series_id] = (now + SERIES_DETAILS_TTL, details)
+                self._series_details_cache.move_to_end(series_id)
+                while len(self._series_details_cache) > SERIES_DETAILS_CACHE_SIZE:
+                    self._series_details_cache.popitem(last=False)
+        return details
+
+    def invalidate_series_details(self, series_ids=None):
+        """Descarta do cache os detalhes das séries alteradas (None = todas)."""
+        with self._series_details_lock:
+            if series_ids is None:
+                self._series_details_cache.clear()
+                return
+            for series_id in series_ids:
+                self._series_details_cache.pop(series_id, None)
+
+    def publish_catalog_change(self, scope, ids=None):
+        """
+        Avisa os outros processos (NOTIFY 'catalog_changed') que o escopo mudou,
+        para que descartem seus caches locais, e confirma a transação da thread
+        junto (com as gravações ainda pendentes nela).
+        """
+        publish_catalog_change(self.cursor, scope, ids)
+        self.commit()
+
+    def get_movies_by_genre(self, genre_id, page=1, limit=20):
+        """
+        (Eficiente) Filmes de um gênero, por popularidade, paginados.
+        Usa o índice GIN de `genres` (genres @> ARRAY[id]).
+        Retorna (itens, tem_mais).
+        """
+        return self._get_by_genre('movies', genre_id, page, limit)
+
+    def get_series_by_genre(self, genre_id, page=1, limit=20):
+        """(Eficiente) Séries de um gênero, por popularidade, paginadas. Retorna (itens, tem_mais)."""
+        return self._get_by_genre('tv_series', genre_id, page, limit)
+
+    def _get_by_genre(self, table, genre_id, page, limit):
+        limit, offset = page_window(page, limit)
+        # Pede um item a mais só para saber se existe próxima página (sem COUNT)
+        rows = self._read_prepared(f'by_genre_{table}', by_genre_query(table), (genre_id, limit + 1, offset))
+        return rows[:limit], len(rows) > limit
 
     def get_distinct_categories(self):
         """(Eficiente) Retorna uma lista de categorias de canais únicas."""
-        query = "SELECT DISTINCT category FROM channels WHERE category IS NOT NULL AND category != '' ORDER BY category"
-        self.cursor.execute(query)
         # Converte lista de dicts [{'category': 'A'}, {'category': 'B'}] para lista de strings ['A', 'B']
-        categories = [row['category'] for row in self.cursor.fetchall()]
-        return categories
+        rows = self._read_prepared('distinct_categories', DISTINCT_CATEGORIES_QUERY)
+        return [row['category'] for row in rows]
+
+    def get_channels_by_category(self, category, hide_dead=False, rank_by_health=False):
+        """
+        (Eficiente) Retorna canais por uma categoria específica, com o último
+        status de saúde do stream (streamstatus, streamlatencyms, streamcheckedat).
+        Logos marcados como quebrados são trocados pelo placeholder.
 
-    def get_channels_by_category(self, category):
-        """(Eficiente) Retorna canais por uma categoria específica."""
-        query = "SELECT * FROM channels WHERE category = %s ORDER BY name"
-        self.cursor.execute(query, (category,))
-        return [dict(row) for row in self.cursor.fetchall()]
+        hide_dead: omite canais cujo stream foi verificado e não está 'online'
+                   (canais ainda não verificados continuam na lista).
+        rank_by_health: ordena online primeiro, depois não verificados, depois fora do ar.
+        """
+        params = {'category': category, 'logo_placeholder': self.logo_placeholder}
+        name = f'channels_by_category_{int(hide_dead)}{int(rank_by_health)}'
+        return self._read_prepared(name, channels_by_category_query(hide_dead, rank_by_health), params)
+
+    def get_stream_urls(self):
+        """Retorna as URLs de stream distintas dos canais (entrada do stream_prober)."""
+        rows = self._read("SELECT DISTINCT streamUrl FROM channels WHERE streamUrl IS NOT NULL AND streamUrl != ''", name='stream_urls')
+        return [row['streamurl'] for row in rows]
+
+    @metrics.timed_query('save_channel_health_batch')
+    def save_channel_health_batch(self, results):
+        """
+        Salva o resultado da verificação dos streams.
+        results: lista de tuplas (streamUrl, status, httpStatus, latencyMs).
+        """
+        query = '''
+            INSERT INTO channel_health (streamUrl, status, httpStatus, latencyMs, checkedAt)
+            VALUES %s
+            ON CONFLICT (streamUrl) DO UPDATE SET
+                status = EXCLUDED.status,
+                httpStatus = EXCLUDED.httpStatus,
+                latencyMs = EXCLUDED.latencyMs,
+                checkedAt = EXCLUDED.checkedAt
+        '''
+        psycopg2.extras.execute_values(
+            self.cursor, query, results,
+            template='(%s, %s, %s, %s, CURRENT_TIMESTAMP)', page_size=1000
+        )
+        # ?hide_dead / ?rank=health dependem da saúde dos streams
+        publish_catalog_change(self.cursor, SCOPE_CHANNELS)
+        self.commit()
+        print(f"{len(results)} resultados de saúde de streams salvos.")
+
+    def get_distinct_logo_urls(self):
+        """Retorna as URLs de logos distintas dos canais (usado pelo cache de imagens)."""
+        rows = self._read("SELECT DISTINCT logoPath FROM channels WHERE logoPath IS NOT NULL AND logoPath != ''", name='logo_urls')
+        return [row['logopath'] for row in rows]
+
+    def is_catalog_logo(self, url):
+        """True se a URL é o logo de algum canal (ou o LOGO_PLACEHOLDER_URL); usado pelo proxy de imagens."""
+        if url == self.logo_placeholder:
+            return True
+        rows = self._read("SELECT EXISTS (SELECT 1 FROM channels WHERE logoPath = %s) AS found", (url,),
+                          name='catalog_logo')
+        return rows[0]['found']
+
+    def get_tmdb_image_paths(self):
+        """Retorna os caminhos (crus) das imagens de filmes e séries: [(caminho, tipo)]."""
+        rows = self._read('''
+            SELECT posterPath AS path, 'poster' AS kind FROM movies
+            UNION SELECT backdropPath, 'backdrop' FROM movies
+            UNION SELECT posterPath, 'poster' FROM tv_series
+            UNION SELECT backdropPath, 'backdrop' FROM tv_series
+        ''', name='tmdb_image_paths')
+        return [(row['path'], row['kind']) for row in rows if row['path']]
 
     ## --- FIM DAS NOVAS FUNÇÕES ---
 
@@ -340,62 +943,108 @@ class DatabaseService:
         RECOMENDAÇÃO: Atualiza logotipos de canais EXISTENTES a partir de um CSV.
         Isso assume que os canais já estão no banco (ex: de um M3U) e o CSV
         é usado apenas para adicionar/corrigir os logotipos.
+
+        Os nomes do M3U ("GLOBO SP FHD") raramente são iguais aos do catálogo
+        ("Globo.br"), então o casamento é feito pelo LogoMatcher (nome
+        normalizado, prefixo de tokens e trigramas) numa única passada, e
+        gravado num único UPDATE em lote. Casamentos por trigrama (aproximados)
+        só preenchem canais que ainda não têm logo.
+
+        O CSV é compilado para um índice binário (<csv>.idx) que só é
+        refeito quando o conteúdo do CSV muda; nas demais execuções o
+        índice é apenas mapeado em memória.
         """
-        updates = []
+        inicio = time.perf_counter()
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    name = row.get('channel', '').strip()
-                    logo_url = row.get('url', '').strip()
-                    if name and logo_url:
-                        # Prepara tupla para (logoPath, imageUrls, name)
-                        updates.append((logo_url, logo_url, name))
+            matcher = LogoMatcher.from_index(load_logo_index(csv_file_path))
         except FileNotFoundError:
             print(f"Arquivo CSV '{csv_file_path}' não encontrado.")
             return
         except Exception as e:
             print(f"Erro ao ler CSV: {e}")
             return
+        tempo_indice = time.perf_counter() - inicio
+
+        self.cursor.execute('SELECT DISTINCT name FROM channels')
+        names = [row['name'] for row in self.cursor.fetchall()]
+        matches = matcher.match_all(names)
 
-        if updates:
+        if matches:
             query = """
-                UPDATE channels SET 
-                    logoPath = %s, 
-                    imageUrls = %s 
-                WHERE name = %s
+                UPDATE channels AS c SET
+                    logoPath = v.url,
+                    imageUrls = v.url
+                FROM (VALUES %s) AS v(name, url, fuzzy)
+                WHERE c.name = v.name
+                  AND (NOT v.fuzzy OR c.logoPath IS NULL OR c.logoPath = '')
+                RETURNING c.id
             """
-            # psycopg2.extras.execute_batch é mais eficiente para updates em massa
-            psycopg2.extras.execute_batch(self.cursor, query, updates)
-            self.connection.commit()
-            print(f"{self.cursor.rowcount} canais atualizados com logotipos do CSV.")
+            updates = [(name, url, method == MATCH_TRIGRAM) for name, (url, method) in matches.items()]
+            # execute_values envia tudo em poucas instruções (um VALUES grande por página)
+            atualizados = len(psycopg2.extras.execute_values(self.cursor, query, updates, page_size=5000, fetch=True))
+            publish_catalog_change(self.cursor, SCOPE_CHANNELS)
+            self.commit()
         else:
-            print("Nenhum dado válido de logotipo encontrado no CSV.")
+            atualizados = 0
+
+        tempo_total = time.perf_counter() - inicio
+        taxa = (len(matches) / len(names)) if names else 0.0
+        print(f"Casamento de logotipos: {len(matches)}/{len(names)} nomes casados ({taxa:.1%}) "
+              f"- {dict(matcher.stats)}")
+        print(f"{atualizados} canais atualizados com logotipos do CSV "
+              f"(índice: {tempo_indice:.2f}s, total: {tempo_total:.2f}s).")
 
-    def save_cache(self, key, data):
-        """Salva dados no cache."""
+    def save_cache(self, key, data, ttl=None):
+        """Salva dados no cache (validade de ttl segundos, padrão CACHE_DEFAULT_TTL)."""
+        self.cache_set_many({key: data}, CACHE_DEFAULT_TTL if ttl is None else ttl)
+
+    def get_cache(self, key):
+        """Retorna dados do cache se ainda válidos."""
+        return self.cache_get_many([key]).get(key)
+
+    def cache_get_many(self, keys):
+        """{chave: valor} das chaves pedidas que ainda não venceram (um único SELECT)."""
+        rows = self._read_prepared('cache_get_many', CACHE_GET_MANY_QUERY, (keys,))
+        return {row['key']: json.loads(row['data']) for row in rows}
+
+    @metrics.timed_query('cache_set_many')
+    def cache_set_many(self, items, ttl):
+        """
+        Grava várias chaves com validade de ttl segundos num único comando e commit.
+        A validade conta do comando (statement_timestamp), não do início da transação.
+        """
         timestamp = int(time.time() * 1000)
-        self.cursor.execute('''
-            INSERT INTO sync_cache (key, timestamp, data)
-            VALUES (%s, %s, %s)
+        rows = [(key, timestamp, json.dumps(value), ttl) for key, value in items.items()]
+        psycopg2.extras.execute_values(self.cursor, '''
+            INSERT INTO sync_cache (key, timestamp, data, expiresAt)
+            VALUES %s
             ON CONFLICT (key) DO UPDATE SET
                 timestamp = EXCLUDED.timestamp,
-                data = EXCLUDED.data
-        ''', (key, timestamp, json.dumps(data)))
-        self.connection.commit()
-
-    def get_cache(self, key):
-        """Retorna dados do cache se ainda válidos (24h)."""
-        one_day_ago = int((datetime.now() - timedelta(days=1)).timestamp() * 1000)
-        self.cursor.execute('''
-            SELECT data, timestamp FROM sync_cache
-            WHERE key = %s AND timestamp > %s
-        ''', (key, one_day_ago))
-        result = self.cursor.fetchone()
-        if result:
-            return json.loads(result['data'])
-        return None
+                data = EXCLUDED.data,
+                expiresAt = EXCLUDED.expiresAt
+        ''', rows, template="(%s, %s, %s, statement_timestamp() + %s * INTERVAL '1 second')")
+        self.commit()
+
+    @metrics.timed_query('cache_delete_many')
+    def cache_delete_many(self, keys):
+        self.cursor.execute('DELETE FROM sync_cache WHERE key = ANY(%s)', (keys,))
+        self.commit()
+
+    @metrics.timed_query('cache_sweep')
+    def cache_sweep(self):
+        """
+        Apaga as chaves vencidas (pelo índice de expiresAt). Usa uma conexão
+        própria: roda na thread de limpeza, sem disputar o cursor das requisições.
+        """
+        connection = psycopg2.connect(self.conn_string())
+        try:
+            with connection, connection.cursor() as cursor:
+                cursor.execute('DELETE FROM sync_cache WHERE expiresAt <= statement_timestamp()')
+                return cursor.rowcount
+        finally:
+            connection.close()
 
+    @metrics.timed_query('create_user')
     def create_user(self, name, email, password_hash, installation_id=None, android_id=None):
         """Cria um novo usuário."""
         self.cursor.execute('''
@@ -405,28 +1054,32 @@ class DatabaseService:
         ''', (name, email, password_hash, installation_id, android_id))
         # fetchone() retornará um dict como {'id': 1} por causa do RealDictCursor
         user_id = self.cursor.fetchone()['id']
-        self.connection.commit()
+        self.commit()
         print(f"Usuário criado: {user_id}")
         return user_id
 
     def get_user_by_email(self, email):
-        """Busca usuário por email."""
-        self.cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
-        result = self.cursor.fetchone()
-        return dict(result) if result else None
+        """Busca usuário por email (sempre no primário: login logo após o cadastro)."""
+        rows = self._read_prepared('user_by_email', 'SELECT * FROM users WHERE email = %s', (email,), primary=True)
+        return rows[0] if rows else None
 
     def get_user_by_id(self, user_id):
         """Busca usuário por ID."""
-        self.cursor.execute('SELECT * FROM users WHERE id = %s', (user_id,))
-        result = self.cursor.fetchone()
-        return dict(result) if result else None
+        rows = self._read_prepared('user_by_id', 'SELECT * FROM users WHERE id = %s', (user_id,), primary=True)
+        return rows[0] if rows else None
 
     def close(self):
-        """Fecha a conexão com o banco de dados."""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        """Fecha as conexões com o banco de dados (de todas as threads)."""
+        self._connected = False
+        with self._connections_lock:
+            connections, self._connections = list(self._connections), weakref.WeakSet()
+        # Threads que ainda guardam uma conexão fechada passam a ver uma nova área local
+        self._local = threading.local()
+        self.replicas.close()
+        for connection in connections:
+            if not connection.closed:
+                connection.close()
+        if connections:
             print("Conexão com o banco de dados fechada.")
 
 class TMDBDataSource:
@@ -444,156 +1097,158 @@ class TMDBDataSource:
         }
         self.language = 'pt-BR'  # Idioma português brasileiro
 
-    def fetch_popular_movies(self):
-        """Busca filmes populares."""
-        url = f'{self.base_url}/movie/popular?language={self.language}'
-        response = requests.get(url, headers=self.headers)
+    def _get(self, endpoint, path, error_message):
+        """
+        GET em base_url + path; `endpoint` (ex: 'tv/{id}') identifica a chamada
+        nas métricas (latência, erros e respostas 429 do TMDB).
+        """
+        started = time.perf_counter()
+        try:
+            response = requests.get(f'{self.base_url}{path}', headers=self.headers, timeout=TMDB_TIMEOUT)
+        except requests.RequestException as e:
+            metrics.observe_tmdb(endpoint, time.perf_counter() - started, error=e)
+            raise
+        metrics.observe_tmdb(endpoint, time.perf_counter() - started, status=response.status_code)
         if response.status_code == 200:
-            data = response.json()
-            return data['results']
+            return response.json()
         else:
-            raise Exception(f'Erro ao buscar filmes populares: {response.status_code}')
+            raise Exception(f'{error_message}: {response.status_code}')
+
+    def fetch_configuration(self):
+        """Busca a configuração da API (URL base e tamanhos válidos das imagens)."""
+        return self._get('configuration', '/configuration', 'Erro ao buscar configuração do TMDB')
+
+    def fetch_popular_movies(self):
+        """Busca filmes populares."""
+        return self._get('movie/popular', f'/movie/popular?language={self.language}',
+                         'Erro ao buscar filmes populares')['results']
 
     def fetch_trending_movies(self):
         """Busca filmes em alta."""
-        url = f'{self.base_url}/trending/movie/day?language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['results']
-        else:
-            raise Exception(f'Erro ao buscar filmes em alta: {response.status_code}')
+        return self._get('trending/movie/day', f'/trending/movie/day?language={self.language}',
+                         'Erro ao buscar filmes em alta')['results']
 
     def fetch_popular_tv_series(self):
         """Busca séries populares."""
-        url = f'{self.base_url}/tv/popular?language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['results']
-        else:
-            raise Exception(f'Erro ao buscar séries populares: {response.status_code}')
+        return self._get('tv/popular', f'/tv/popular?language={self.language}',
+                         'Erro ao buscar séries populares')['results']
 
     def fetch_trending_tv_series(self):
         """Busca séries em alta."""
-        url = f'{self.base_url}/trending/tv/day?language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['results']
-        else:
-            raise Exception(f'Erro ao buscar séries em alta: {response.status_code}')
+        return self._get('trending/tv/day', f'/trending/tv/day?language={self.language}',
+                         'Erro ao buscar séries em alta')['results']
 
     def fetch_movies_by_genre(self, genre_id):
         """Busca filmes por gênero."""
-        url = f'{self.base_url}/discover/movie?with_genres={genre_id}&language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['results']
-        else:
-            raise Exception(f'Erro ao buscar filmes por gênero: {response.status_code}')
+        return self._get('discover/movie', f'/discover/movie?with_genres={genre_id}&language={self.language}',
+                         'Erro ao buscar filmes por gênero')['results']
 
     def fetch_tv_series_by_genre(self, genre_id):
         """Busca séries por gênero."""
-        url = f'{self.base_url}/discover/tv?with_genres={genre_id}&language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['results']
-        else:
-            raise Exception(f'Erro ao buscar séries por gênero: {response.status_code}')
+        return self._get('discover/tv', f'/discover/tv?with_genres={genre_id}&language={self.language}',
+                         'Erro ao buscar séries por gênero')['results']
 
     def fetch_tv_series_details(self, series_id):
         """Busca detalhes de uma série."""
-        url = f'{self.base_url}/tv/{series_id}?language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f'Erro ao buscar detalhes da série: {response.status_code}')
+        return self._get('tv/{id}', f'/tv/{series_id}?language={self.language}',
+                         'Erro ao buscar detalhes da série')
 
     def fetch_season_details(self, series_id, season_number):
         """Busca detalhes de uma temporada."""
-        url = f'{self.base_url}/tv/{series_id}/season/{season_number}?language={self.language}'
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f'Erro ao buscar detalhes da temporada: {response.status_code}')
+        return self._get('tv/{id}/season/{n}', f'/tv/{series_id}/season/{season_number}?language={self.language}',
+                         'Erro ao buscar detalhes da temporada')
 
 class SyncService:
-    def __init__(self, db_service, tmdb_source):
+    def __init__(self, db_service, tmdb_source, cache=None):
         self.db = db_service
         self.tmdb = tmdb_source
+        # Cache compartilhado com a API (cache_store.create_cache_store); padrão: sync_cache
+        self.cache = cache or PostgresCacheStore(db_service)
 
     def sync_data_if_needed(self):
-        """Sincroniza dados se necessário (cache expirado)."""
-        last_sync = self.db.get_cache('last_sync')
-        now = int(time.time() * 1000)
-        one_day_in_millis = 24 * 60 * 60 * 1000
-
-        if not last_sync or (now - last_sync) > one_day_in_millis:
+        """Sincroniza dados se necessário (a chave last_sync vence após SYNC_INTERVAL)."""
+        if self.cache.get('last_sync') is None:
             self._perform_sync()
-            self.db.save_cache('last_sync', now)
+            self.cache.set('last_sync', int(time.time() * 1000), ttl=SYNC_INTERVAL)
         else:
             print("Dados já sincronizados recentemente.")
 
     def force_sync(self):
         """Força sincronização."""
         self._perform_sync()
-        now = int(time.time() * 1000)
-        self.db.save_cache('last_sync', now)
+        self.cache.set('last_sync', int(time.time() * 1000), ttl=SYNC_INTERVAL)
 
     def _perform_sync(self):
-        """Executa a sincronização."""
+        """Executa a sincronização (cada fase medida em sync_phase_duration_seconds)."""
         try:
             print('Iniciando sincronização de dados...')
+            # Todas as listas gravadas nesta sincronização compartilham a geração
+            generation = self.db.next_sync_generation()
 
             # Sincronizar filmes
             print('Sincronizando filmes em alta...')
-            trending_movies = self.tmdb.fetch_trending_movies()
-            self._save_movies(trending_movies)
+            with metrics.sync_phase('trending_movies'):
+                trending_movies = self.tmdb.fetch_trending_movies()
+                self._save_movies(trending_movies)
+                self._save_list(LIST_TRENDING_MOVIES, trending_movies, generation)
             print('Filmes em alta sincronizados')
 
             print('Sincronizando filmes populares...')
-            popular_movies = self.tmdb.fetch_popular_movies()
-            self._save_movies(popular_movies)
+            with metrics.sync_phase('popular_movies'):
+                popular_movies = self.tmdb.fetch_popular_movies()
+                self._save_movies(popular_movies)
+                self._save_list(LIST_POPULAR_MOVIES, popular_movies, generation)
             print('Filmes populares sincronizados')
 
             # Sincronizar séries
             print('Sincronizando séries em alta...')
-            trending_series = self.tmdb.fetch_trending_tv_series()
-            self._save_tv_series(trending_series)
+            with metrics.sync_phase('trending_series'):
+                trending_series = self.tmdb.fetch_trending_tv_series()
+                self._save_tv_series(trending_series)
+                self._save_list(LIST_TRENDING_SERIES, trending_series, generation)
             print('Séries em alta sincronizadas')
 
             print('Sincronizando séries populares...')
-            popular_series = self.tmdb.fetch_popular_tv_series()
-            self._save_tv_series(popular_series)
+            with metrics.sync_phase('popular_series'):
+                popular_series = self.tmdb.fetch_popular_tv_series()
+                self._save_tv_series(popular_series)
+                self._save_list(LIST_POPULAR_SERIES, popular_series, generation)
             print('Séries populares sincronizadas')
 
             # Sincronizar gêneros principais
             print('Sincronizando filmes por gênero...')
-            self._sync_genres()
+            with metrics.sync_phase('genres'):
+                self._sync_genres(generation)
 
             # Sincronizar detalhes das séries (temporadas e episódios)
             print('Sincronizando detalhes das séries...')
-            self.sync_series_details()
+            with metrics.sync_phase('series_details'):
+                self.sync_series_details()
 
             print('Sincronização concluída com sucesso')
+            metrics.sync_finished(True)
         except Exception as e:
             print(f'Erro durante sincronização: {e}')
+            metrics.sync_finished(False)
             raise
 
-    def _sync_genres(self):
+    def _save_list(self, list_key, items, generation):
+        """Grava a ordem dos itens retornados pelo TMDB como a composição atual da lista."""
+        self.db.save_list_membership(list_key, [item['id'] for item in items], generation)
+
+    def _sync_genres(self, generation=None):
         """Sincroniza gêneros principais."""
+        if generation is None:
+            generation = self.db.next_sync_generation()
         main_genres = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
         for genre_id in main_genres:
             try:
                 movies = self.tmdb.fetch_movies_by_genre(genre_id)
                 self._save_movies(movies)
+                self._save_list(genre_list_key('movie', genre_id), movies, generation)
                 series = self.tmdb.fetch_tv_series_by_genre(genre_id)
                 self._save_tv_series(series)
+                self._save_list(genre_list_key('tv', genre_id), series, generation)
             except Exception as e:
                 print(f'Erro ao sincronizar gênero {genre_id}: {e}')
 
@@ -616,20 +1271,25 @@ class SyncService:
                         self._save_season(season_details, series_id)
                         self._save_episodes(season_details, series_id)
 
+                # Temporadas, episódios e o aviso aos outros processos num único commit
+                self.db.publish_catalog_change(SCOPE_SERIES, [series_id])
+                self.db.invalidate_series_details([series_id])
                 print(f'Detalhes da série {series_id} sincronizados')
             except Exception as e:
+                # Nada da série fica pela metade (nem entra no commit da próxima)
+                self.db.connection.rollback()
                 print(f'Erro ao sincronizar série {series_id}: {e}')
 
     def _save_movies(self, movies):
         """Salva filmes no banco."""
         movie_data = []
-        base_image_url = 'https://image.tmdb.org/t/p/w500'
         for movie in movies:
+            # Só os caminhos do TMDB: a URL (com tamanho) é montada pela API
             image_urls = []
             if movie.get('poster_path'):
-                image_urls.append(f"{base_image_url}{movie['poster_path']}")
+                image_urls.append(movie['poster_path'])
             if movie.get('backdrop_path'):
-                image_urls.append(f"{base_image_url}{movie['backdrop_path']}")
+                image_urls.append(movie['backdrop_path'])
             
             # Garante que release_date é nulo se for string vazia
             release_date = movie.get('release_date', '')
@@ -659,13 +1319,12 @@ class SyncService:
     def _save_tv_series(self, series):
         """Salva séries no banco."""
         series_data = []
-        base_image_url = 'https://image.tmdb.org/t/p/w500'
         for serie in series:
             image_urls = []
             if serie.get('poster_path'):
-                image_urls.append(f"{base_image_url}{serie['poster_path']}")
+                image_urls.append(serie['poster_path'])
             if serie.get('backdrop_path'):
-                image_urls.append(f"{base_image_url}{serie['backdrop_path']}")
+                image_urls.append(serie['backdrop_path'])
             
             first_air_date = serie.get('first_air_date', '')
             if not first_air_date:
@@ -690,13 +1349,13 @@ class SyncService:
             ))
         if series_data:
             self.db.save_tv_series_batch(series_data)
+            self.db.invalidate_series_details([serie[0] for serie in series_data])
 
     def _save_season(self, season_details, series_id):
-        """Salva temporada no banco."""
-        base_image_url = 'https://image.tmdb.org/t/p/w500'
+        """Salva temporada no banco (sem commit: ver sync_series_details)."""
         image_urls = []
         if season_details.get('poster_path'):
-            image_urls.append(f"{base_image_url}{season_details['poster_path']}")
+            image_urls.append(season_details['poster_path'])
         
         air_date = season_details.get('air_date', '')
         if not air_date:
@@ -714,19 +1373,18 @@ class SyncService:
             season_details.get('vote_average', 0.0),
             ','.join(image_urls)
         )]
-        self.db.save_seasons_batch(season_data)
+        self.db.save_seasons_batch(season_data, commit=False)
 
     def _save_episodes(self, season_details, series_id):
-        """Salva episódios no banco."""
+        """Salva episódios no banco (sem commit: ver sync_series_details)."""
         episodes = season_details.get('episodes', [])
         episode_data = []
         season_id = season_details['id']
-        base_image_url = 'https://image.tmdb.org/t/p/w500'
 
         for episode in episodes:
             image_urls = []
             if episode.get('still_path'):
-                image_urls.append(f"{base_image_url}{episode['still_path']}")
+                image_urls.append(episode['still_path'])
             
             air_date = episode.get('air_date', '')
             if not air_date:
@@ -748,7 +1406,7 @@ class SyncService:
             ))
 
         if episode_data:
-            self.db.save_episodes_batch(episode_data)
+            self.db.save_episodes_batch(episode_data, commit=False)
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -0,0 +1,278 @@
+"""
+Teste de regressão dos planos de execução das consultas do DatabaseService.
+
+Cria um schema temporário, carrega um conjunto de dados sintético com volume
+parecido com o de produção, chama os métodos de leitura do DatabaseService
+gravando cada SQL executado e roda EXPLAIN (ANALYZE) em cada um.
+
+As consultas "quentes" (as que o app chama a cada tela) falham se o plano
+tiver um nó proibido, como Seq Scan ou Sort. As demais são apenas
+exibidas no relatório.
+
+Uso:
+    python -m tv_multimidia.explain_harness [--scale 1.0] [--keep] [--random-page-cost 1.1]
+Rodar contra o Postgres do docker-compose (já configurado para SSD), ou com
+--random-page-cost 1.1 contra um servidor com os custos padrão.
+Sai com código 1 se alguma consulta quente regredir.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+try:
+    from tv_multimidia.database import (
+        DatabaseService, LIST_POPULAR_MOVIES, LIST_POPULAR_SERIES, LIST_TRENDING_MOVIES,
+        LIST_TRENDING_SERIES, genre_list_key,
+    )
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import (
+        DatabaseService, LIST_POPULAR_MOVIES, LIST_POPULAR_SERIES, LIST_TRENDING_MOVIES,
+        LIST_TRENDING_SERIES, genre_list_key,
+    )
+
+HARNESS_SCHEMA = 'explain_harness'
+
+SEQ_SCAN = {'Seq Scan'}
+# Seq Scan em tabelas deste tamanho (páginas de 8 KB) é o acesso mais barato
+# (ex: list_generation, uma linha por lista) e não conta como regressão
+SMALL_TABLE_PAGES = 1
+SEQ_SCAN_OR_SORT = {'Seq Scan', 'Sort', 'Incremental Sort'}
+
+# (método, argumentos, nós proibidos no plano; None = apenas relatório)
+CALLS = [
+    ('get_trending_movies', {}, SEQ_SCAN_OR_SORT),
+    ('get_popular_movies', {}, SEQ_SCAN_OR_SORT),
+    ('get_trending_series', {}, SEQ_SCAN_OR_SORT),
+    ('get_popular_series', {}, SEQ_SCAN_OR_SORT),
+    ('get_ranked_list', {'table': 'movies', 'list_key': genre_list_key('movie', 28)}, SEQ_SCAN_OR_SORT),
+    ('get_channels_by_category', {'category': 'CANAIS | CATEGORIA 7'}, SEQ_SCAN_OR_SORT),
+    ('get_channels_by_category', {'category': 'CANAIS | CATEGORIA 7', 'hide_dead': True}, SEQ_SCAN_OR_SORT),
+    # Ordenar por saúde depende do status de cada canal: o Sort é esperado, o Seq Scan não
+    ('get_channels_by_category', {'category': 'CANAIS | CATEGORIA 7', 'rank_by_health': True}, SEQ_SCAN),
+    # O índice GIN filtra; a página vem de um Sort pequeno do resultado (esperado)
+    ('get_movies_by_genre', {'genre_id': 27}, SEQ_SCAN),
+    ('get_series_by_genre', {'genre_id': 9648}, SEQ_SCAN),
+    # Agregação das temporadas/episódios de uma série: o Sort de poucas linhas é esperado
+    ('get_series_details', {'series_id': 1500}, SEQ_SCAN),
+    ('get_user_by_email', {'email': 'usuario500@exemplo.com'}, SEQ_SCAN_OR_SORT),
+    ('get_user_by_id', {'user_id': 500}, SEQ_SCAN_OR_SORT),
+    ('get_cache', {'key': 'last_sync'}, SEQ_SCAN_OR_SORT),
+    ('cache_get_many', {'keys': ['last_sync', 'chave_10', 'chave_20', 'tmdb_configuration']}, SEQ_SCAN_OR_SORT),
+    ('get_distinct_categories', {}, SEQ_SCAN_OR_SORT),
+    ('is_catalog_logo', {'url': 'http://logos.exemplo/123.png'}, SEQ_SCAN_OR_SORT),
+    ('get_all_movies', {}, None),
+    ('get_all_tv_series', {}, None),
+    ('get_all_channels', {}, None),
+    ('get_stream_urls', {}, None),
+    ('get_distinct_logo_urls', {}, None),
+    ('get_tmdb_image_paths', {}, None),
+]
+
+GENRES = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+
+
+def load_synthetic_data(db, scale=1.0):
+    """Preenche as tabelas do schema do harness com dados sintéticos."""
+    n_movies = int(50_000 * scale)
+    n_series = int(20_000 * scale)
+    n_channels = int(60_000 * scale)
+    n_users = int(10_000 * scale)
+    genres = '{' + ','.join(map(str, GENRES)) + '}'
+    cur = db.cursor
+
+    for table, total in (('movies', n_movies), ('tv_series', n_series)):
+        title = 'title' if table == 'movies' else 'name'
+        # Dois gêneros por item, sorteados da lista principal
+        cur.execute(f'''
+            INSERT INTO {table} (id, {title}, overview, posterPath, backdropPath, voteAverage,
+                                 voteCount, genreIds, popularity, imageUrls)
+            SELECT i, 'Título ' || i, 'Sinopse ' || i, '/p' || i || '.jpg', '/b' || i || '.jpg',
+                   random() * 10, (random() * 5000)::int,
+                   g[1 + i %% array_length(g, 1)] || ',' || g[1 + (i / 7) %% array_length(g, 1)],
+                   CASE WHEN i %% 500 = 0 THEN NULL ELSE random() * 1000 END,
+                   '/p' || i || '.jpg,/b' || i || '.jpg'
+            FROM generate_series(1, %s) AS i, (SELECT %s::int[] AS g) AS genres
+        ''', (total, genres))
+
+    # Listas do TMDB: 12 sincronizações antigas já apagadas, a atual com 20 itens por lista
+    generation = 12
+    for list_key, table in ((LIST_TRENDING_MOVIES, 'movies'), (LIST_POPULAR_MOVIES, 'movies'),
+                            (LIST_TRENDING_SERIES, 'tv_series'), (LIST_POPULAR_SERIES, 'tv_series')):
+        cur.execute(f'SELECT id FROM {table} ORDER BY random() LIMIT 20')
+        db.save_list_membership(list_key, [row['id'] for row in cur.fetchall()], generation)
+    for genre_id in GENRES:
+        for media_type, table in (('movie', 'movies'), ('tv', 'tv_series')):
+            cur.execute(f'SELECT id FROM {table} WHERE genres @> ARRAY[%s] LIMIT 20', (genre_id,))
+            db.save_list_membership(genre_list_key(media_type, genre_id), [row['id'] for row in cur.fetchall()], generation)
+
+    # Temporadas e episódios das 2000 primeiras séries (5 temporadas x 10 episódios)
+    n_detailed = min(2000, n_series)
+    cur.execute('''
+        INSERT INTO seasons (id, seriesId, seasonNumber, name, episodeCount, posterPath)
+        SELECT s * 10 + n, s, n, 'Temporada ' || n, 10, '/t' || s || '_' || n || '.jpg'
+        FROM generate_series(1, %s) AS s, generate_series(1, 5) AS n
+    ''', (n_detailed,))
+    cur.execute('''
+        INSERT INTO episodes (id, seriesId, seasonId, episodeNumber, name, runtime, stillPath)
+        SELECT se.id * 100 + n, se.seriesId, se.id, n, 'Episódio ' || n, 45, '/e' || se.id || '_' || n || '.jpg'
+        FROM seasons se, generate_series(1, 10) AS n
+    ''')
+
+    cur.execute('''
+        INSERT INTO channels (name, logoPath, streamUrl, category, imageUrls)
+        SELECT 'Canal ' || i, 'http://logos.exemplo/' || (i %% 8000) || '.png',
+               'http://stream.exemplo/live/' || i || '.ts', 'CANAIS | CATEGORIA ' || (i %% 300),
+               'http://logos.exemplo/' || (i %% 8000) || '.png'
+        FROM generate_series(1, %s) AS i
+    ''', (n_channels,))
+    cur.execute('''
+        INSERT INTO channel_health (streamUrl, status, httpStatus, latencyMs)
+        SELECT streamUrl, (ARRAY['online', 'offline', 'timeout'])[1 + id % 3], 200, id % 900
+        FROM channels
+    ''')
+    cur.execute('''
+        INSERT INTO logo_health (url, status, httpStatus, sizeBytes, latencyMs)
+        SELECT DISTINCT logoPath, 'ok', 200, 4096, 120 FROM channels
+    ''')
+    cur.execute('''
+        INSERT INTO users (name, email, password)
+        SELECT 'Usuário ' || i, 'usuario' || i || '@exemplo.com', 'hash'
+        FROM generate_series(1, %s) AS i
+    ''', (n_users,))
+    cur.execute('''
+        INSERT INTO sync_cache (key, timestamp, data, expiresAt)
+        SELECT 'chave_' || i, (extract(epoch FROM now()) * 1000)::bigint, '{}',
+               CURRENT_TIMESTAMP + (i %% 48 - 4) * INTERVAL '1 hour'
+        FROM generate_series(1, %s) AS i
+        UNION ALL SELECT 'last_sync', (extract(epoch FROM now()) * 1000)::bigint, '0',
+               CURRENT_TIMESTAMP + INTERVAL '1 day'
+    ''', (n_users,))
+    db.connection.commit()
+    cur.execute('ANALYZE')
+    print(f"Dados sintéticos: {n_movies} filmes, {n_series} séries, {n_channels} canais, {n_users} usuários")
+
+
+class RecordingCursor:
+    """Repassa as chamadas ao cursor real, guardando cada (sql, parâmetros) executado."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def plan_nodes(plan):
+    """Todos os nós de um plano (JSON do EXPLAIN), em profundidade."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+def explain(db, query, params):
+    """Roda EXPLAIN (ANALYZE, FORMAT JSON); retorna (nós, tempo de execução em ms)."""
+    db.cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}', params)
+    result = db.cursor.fetchone()
+    document = next(iter(result.values()))
+    if isinstance(document, str):
+        document = json.loads(document)
+    root = document[0]
+    return list(plan_nodes(root['Plan'])), root['Execution Time']
+
+
+def is_small_table_scan(db, node):
+    """True para Seq Scan numa tabela que cabe em SMALL_TABLE_PAGES páginas."""
+    if node['Node Type'] != 'Seq Scan':
+        return False
+    db.cursor.execute(
+        "SELECT pg_relation_size(%s::regclass) / current_setting('block_size')::int AS pages",
+        (node['Relation Name'],)
+    )
+    return db.cursor.fetchone()['pages'] <= SMALL_TABLE_PAGES
+
+
+def run_harness(db, calls=CALLS):
+    """Executa as chamadas e verifica os planos. Retorna a lista de falhas."""
+    failures = []
+    print(f"\n{'consulta':<48}{'nós do plano':<60}{'ms':>8}  resultado")
+    for method, kwargs, forbidden in calls:
+        recorder = RecordingCursor(db.cursor)
+        real_cursor, db.cursor = db.cursor, recorder
+        try:
+            getattr(db, method)(**kwargs)
+        finally:
+            db.cursor = real_cursor
+
+        label = method + (f"({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})" if kwargs else '')
+        for query, params in recorder.statements:
+            nodes, elapsed = explain(db, query, params)
+            node_types = [node['Node Type'] + (f" ({node['Relation Name']})" if 'Relation Name' in node else '')
+                          for node in nodes]
+            bad = sorted({node['Node Type'] for node in nodes
+                          if not is_small_table_scan(db, node)} & (forbidden or set()))
+            if forbidden is None:
+                verdict = 'relatório'
+            elif bad:
+                verdict = f"FALHOU: {', '.join(bad)}"
+                failures.append((label, bad, query))
+            else:
+                verdict = 'ok'
+            summary = ' > '.join(dict.fromkeys(node_types))
+            print(f"{label[:47]:<48}{summary[:59]:<60}{elapsed:>8.2f}  {verdict}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplicador do volume de dados sintéticos')
+    parser.add_argument('--keep', action='store_true', help=f'Não apaga o schema {HARNESS_SCHEMA} ao final')
+    parser.add_argument('--random-page-cost', type=float,
+                        help='Sobrescreve random_page_cost na sessão (o docker-compose usa 1.1, para SSD)')
+    args = parser.parse_args()
+
+    # O esquema do harness (search_path) só existe na sessão do primário
+    db = DatabaseService(read_dsns=[])
+    # Executa o SQL de cada consulta pelo cursor (gravado pelo RecordingCursor) em vez de EXECUTE
+    db.use_prepared = False
+    db.connect()
+    try:
+        # Tudo acontece num schema separado: as tabelas reais não são tocadas
+        db.cursor.execute(f'DROP SCHEMA IF EXISTS {HARNESS_SCHEMA} CASCADE')
+        db.cursor.execute(f'CREATE SCHEMA {HARNESS_SCHEMA}')
+        db.cursor.execute(f'SET search_path TO {HARNESS_SCHEMA}')
+        if args.random_page_cost is not None:
+            db.cursor.execute('SET random_page_cost = %s', (args.random_page_cost,))
+        db.cursor.execute('SHOW random_page_cost')
+        # Os planos dependem dos custos configurados no servidor
+        print(f"random_page_cost = {db.cursor.fetchone()['random_page_cost']}")
+        db.create_tables()
+
+        inicio = time.perf_counter()
+        load_synthetic_data(db, args.scale)
+        print(f"Carga em {time.perf_counter() - inicio:.1f}s")
+
+        failures = run_harness(db)
+    finally:
+        db.connection.rollback()
+        if not args.keep:
+            db.cursor.execute(f'DROP SCHEMA IF EXISTS {HARNESS_SCHEMA} CASCADE')
+            db.connection.commit()
+        db.close()
+
+    if failures:
+        print(f"\n{len(failures)} consulta(s) quente(s) com plano proibido:")
+        for label, bad, query in failures:
+            print(f"- {label}: {', '.join(bad)}\n  {' '.join(query.split())}")
+        sys.exit(1)
+    print("\nTodas as consultas quentes usam índices, sem Seq Scan/Sort proibidos.")
+
+
+if __name__ == "__main__":
+    main()
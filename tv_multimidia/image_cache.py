@@ -0,0 +1,401 @@
+"""
+Cache local de imagens (logos de canais e pôsteres do TMDB).
+
+Cada URL de origem é baixada uma única vez e o original é guardado em disco
+pelo hash do conteúdo (sha256). A partir dele são geradas variantes
+redimensionadas em larguras adequadas para TV/celular (WebP), servidas pela
+API com cabeçalhos de cache imutáveis.
+
+Estrutura em disco (IMAGE_CACHE_DIR):
+    urls/<sha1 da url>          -> hash do conteúdo
+    orig/<ab>/<sha256>          -> bytes originais
+    w<largura>/<ab>/<sha256>.webp -> variantes redimensionadas
+
+O total em disco é limitado por IMAGE_CACHE_MAX_BYTES: passando do limite,
+os arquivos usados há mais tempo (mtime, renovado no uso) são removidos.
+
+Só são buscados endereços públicos: o host é conferido antes de cada
+requisição (redirecionamentos são seguidos um a um, com a mesma conferência)
+e o endereço da conexão é conferido de novo no connect, o que também cobre
+um DNS que muda de resposta entre a conferência e a conexão.
+"""
+
+import hashlib
+import ipaddress
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from tv_multimidia.tmdb_images import TMDBImageConfig
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from tmdb_images import TMDBImageConfig
+
+IMAGE_CACHE_DIR = os.environ.get(
+    'IMAGE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image_cache')
+)
+# Larguras geradas (as mesmas faixas de tamanho que o TMDB usa para pôsteres)
+IMAGE_WIDTHS = (92, 185, 342, 500)
+DEFAULT_IMAGE_WIDTH = 342
+WEBP_QUALITY = 80
+# Limites para baixar a origem
+MAX_SOURCE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = (5, 20)
+MAX_REDIRECTS = 5
+# Hosts de imagens servidos pelo /api/images sem consultar o catálogo (CDN do TMDB);
+# as demais URLs precisam ser logos de canais cadastrados
+IMAGE_PROXY_HOSTS = frozenset(
+    host.strip().lower() for host in os.environ.get('IMAGE_PROXY_HOSTS', 'image.tmdb.org').split(',') if host.strip()
+)
+# Por segurança o proxy não busca endereços internos (127.0.0.1, 10.x, ...),
+# a não ser que seja explicitamente liberado (ex: testes com servidor local)
+ALLOW_PRIVATE_HOSTS = os.environ.get('IMAGE_PROXY_ALLOW_PRIVATE', '').lower() in ('1', 'true', 'yes')
+WARM_WORKERS = int(os.environ.get('IMAGE_WARM_WORKERS', 8))
+# Tamanho máximo do cache em disco; a limpeza remove até sobrar EVICT_TARGET do limite
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+EVICT_TARGET = 0.9
+# O mtime de um arquivo em uso é renovado no máximo uma vez por intervalo (segundos)
+TOUCH_INTERVAL = 60 * 60
+
+
+class ImageFetchError(Exception):
+    """Falha ao baixar ou decodificar a imagem de origem."""
+
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _write_atomic(path, data):
+    """Grava o arquivo de forma atômica (outro processo nunca lê um arquivo pela metade)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _is_public_address(address):
+    """True para um endereço IP roteável na internet (nem interno, nem multicast)."""
+    address = ipaddress.ip_address(address.split('%')[0])
+    return address.is_global and not address.is_multicast
+
+
+def _is_public_host(host):
+    """True se todos os endereços do host forem públicos."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(_is_public_address(info[4][0]) for info in infos)
+
+
+def is_proxy_host(url, hosts=IMAGE_PROXY_HOSTS):
+    """True se a URL é http(s) de um dos hosts de imagens liberados (IMAGE_PROXY_HOSTS)."""
+    parts = urlsplit(url)
+    return parts.scheme in ('http', 'https') and (parts.hostname or '') in hosts
+
+
+class _PublicPeerMixin:
+    """Conexão do urllib3 que recusa o socket se o endereço conectado não for público."""
+
+    def _new_conn(self):
+        sock = super()._new_conn()
+        peer = sock.getpeername()[0]
+        if not _is_public_address(peer):
+            sock.close()
+            raise requests.ConnectionError(f"Endereço não permitido para o proxy de imagens: {peer}")
+        return sock
+
+
+class _PublicHTTPConnection(_PublicPeerMixin, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicPeerMixin, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class PublicOnlyAdapter(HTTPAdapter):
+    """Adapter do requests cujas conexões só vão para endereços públicos."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _PublicHTTPConnectionPool,
+            'https': _PublicHTTPSConnectionPool,
+        }
+
+
+class ImageCache:
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, widths=IMAGE_WIDTHS, allow_private_hosts=ALLOW_PRIVATE_HOSTS,
+                 max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.widths = tuple(sorted(widths))
+        self.allow_private_hosts = allow_private_hosts
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        # Sem proxies do ambiente: o endereço conferido no connect tem que ser o da origem
+        self.session.trust_env = False
+        if not allow_private_hosts:
+            adapter = PublicOnlyAdapter()
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        # Locks por faixa de URL: requisições simultâneas da mesma imagem baixam a origem uma vez só
+        self._locks = [threading.Lock() for _ in range(64)]
+        # Bytes gravados desde a última limpeza; começa "cheio" para a 1ª gravação do
+        # processo já conferir o total em disco
+        self._evict_every = max(1, max_bytes // 20)
+        self._written = self._evict_every
+        self._evict_lock = threading.Lock()
+        self._evicting = False
+
+    def _url_map_path(self, url):
+        return os.path.join(self.cache_dir, 'urls', _sha1(url))
+
+    def _original_path(self, content_hash):
+        return os.path.join(self.cache_dir, 'orig', content_hash[:2], content_hash)
+
+    def variant_path(self, content_hash, width):
+        return os.path.join(self.cache_dir, f'w{width}', content_hash[:2], f'{content_hash}.webp')
+
+    def snap_width(self, width):
+        """Arredonda a largura pedida para a menor variante que a cobre."""
+        if not width:
+            return DEFAULT_IMAGE_WIDTH
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    def _lock_for(self, url):
+        return self._locks[hash(url) % len(self._locks)]
+
+    def _touch(self, path):
+        """True se o arquivo existe; renova o mtime (usado pela limpeza) se estiver velho."""
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        if time.time() - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass  # Removido pela limpeza de outro processo
+        return True
+
+    def cached_hash(self, url):
+        """Hash do conteúdo já baixado para a URL, ou None."""
+        try:
+            with open(self._url_map_path(url), 'r', encoding='ascii') as f:
+                content_hash = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return content_hash if self._touch(self._original_path(content_hash)) else None
+
+    def _check_url(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ImageFetchError(f"URL de imagem inválida: {url}")
+        if not self.allow_private_hosts and not _is_public_host(parts.hostname):
+            raise ImageFetchError(f"Host não permitido para o proxy de imagens: {parts.hostname}")
+
+    def _download(self, url):
+        try:
+            # Redirecionamentos seguidos à mão: cada destino passa pela mesma conferência
+            for _ in range(MAX_REDIRECTS + 1):
+                self._check_url(url)
+                with self.session.get(url, stream=True, timeout=FETCH_TIMEOUT, allow_redirects=False) as response:
+                    if response.is_redirect:
+                        url = urljoin(url, response.headers['Location'])
+                        continue
+                    if response.status_code != 200:
+                        raise ImageFetchError(f"Origem respondeu {response.status_code}: {url}")
+                    data = bytearray()
+                    for chunk in response.iter_content(64 * 1024):
+                        data.extend(chunk)
+                        if len(data) > MAX_SOURCE_BYTES:
+                            raise ImageFetchError(f"Imagem maior que {MAX_SOURCE_BYTES} bytes: {url}")
+                    return bytes(data)
+        except requests.RequestException as e:
+            raise ImageFetchError(f"Erro ao baixar {url}: {e}") from e
+        raise ImageFetchError(f"Redirecionamentos demais (mais de {MAX_REDIRECTS}): {url}")
+
+    def fetch(self, url):
+        """Garante que a origem esteja em disco; retorna o hash do conteúdo."""
+        content_hash = self.cached_hash(url)
+        if content_hash:
+            return content_hash
+
+        with self._lock_for(url):
+            content_hash = self.cached_hash(url)
+            if content_hash:
+                return content_hash
+
+            data = self._download(url)
+            content_hash = hashlib.sha256(data).hexdigest()
+            original_path = self._original_path(content_hash)
+            # Conteúdo idêntico vindo de outra URL já está salvo: só aponta o mapa para ele
+            if not os.path.exists(original_path):
+                _write_atomic(original_path, data)
+                self._wrote(len(data))
+            _write_atomic(self._url_map_path(url), content_hash.encode('ascii'))
+            return content_hash
+
+    def ensure_variant(self, content_hash, width):
+        """Gera (se ainda não existir) a variante WebP na largura dada; retorna o caminho."""
+        path = self.variant_path(content_hash, width)
+        if self._touch(path):
+            return path
+
+        # Importado só aqui: o Pillow pesa no tempo de início dos processos da API
+        from PIL import Image
+
+        try:
+            with Image.open(self._original_path(content_hash)) as image:
+                image.load()
+                has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    image = image.resize((width, height), Image.LANCZOS)
+                buffer = BytesIO()
+                image.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ImageFetchError(f"Não foi possível decodificar a imagem {content_hash}: {e}") from e
+
+        _write_atomic(path, buffer.getvalue())
+        self._wrote(buffer.tell())
+        return path
+
+    def _wrote(self, size):
+        """Conta os bytes gravados; a cada ~5% do limite, dispara a limpeza em segundo plano."""
+        with self._evict_lock:
+            self._written += size
+            if self._evicting or self._written < self._evict_every:
+                return
+            self._evicting = True
+            self._written = 0
+        threading.Thread(target=self._evict_in_background, name='image-cache-evict', daemon=True).start()
+
+    def _evict_in_background(self):
+        try:
+            self.evict()
+        except OSError as e:
+            print(f"Erro na limpeza do cache de imagens: {e}")
+        finally:
+            with self._evict_lock:
+                self._evicting = False
+
+    def evict(self):
+        """
+        Se o cache passou de max_bytes, remove os arquivos usados há mais tempo
+        até ficar em EVICT_TARGET do limite. Retorna os bytes removidos.
+        """
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue  # Gravação em andamento (_write_atomic)
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        target = self.max_bytes * EVICT_TARGET
+        removed = 0
+        for _, size, path in sorted(files):
+            if total - removed <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += size
+        print(f"Cache de imagens: {removed} bytes removidos (limite {self.max_bytes} bytes).")
+        return removed
+
+    def get(self, url, width=None):
+        """
+        Retorna (caminho da variante, hash do conteúdo, largura efetiva),
+        baixando a origem e gerando a variante se necessário.
+        """
+        width = self.snap_width(width)
+        content_hash = self.fetch(url)
+        return self.ensure_variant(content_hash, width), content_hash, width
+
+    def warm(self, urls, widths=None, workers=WARM_WORKERS):
+        """
+        Pré-aquece o cache: baixa cada URL e gera todas as variantes.
+        Retorna (ok, falhas).
+        """
+        widths = widths or self.widths
+        urls = list(dict.fromkeys(url for url in urls if url))
+
+        def warm_one(url):
+            try:
+                content_hash = self.fetch(url)
+                for width in widths:
+                    self.ensure_variant(content_hash, width)
+                return True
+            except ImageFetchError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(warm_one, urls))
+        ok = sum(results)
+        print(f"Cache de imagens aquecido: {ok} imagens prontas, {len(results) - ok} falhas.")
+        return ok, len(results) - ok
+
+
+def collect_image_urls(db, tmdb_images=None):
+    """
+    URLs de todas as imagens do catálogo (logos de canais e imagens do TMDB).
+    tmdb_images: TMDBImageConfig usado para montar as URLs do TMDB.
+    """
+    tmdb_images = tmdb_images or TMDBImageConfig()
+    tmdb_urls = [tmdb_images.build_url(path, kind) for path, kind in db.get_tmdb_image_paths()]
+    return db.get_distinct_logo_urls() + tmdb_urls
+
+
+def warm_catalog_images(db, cache=None, tmdb_images=None):
+    """Aquece o cache com todas as imagens do catálogo (chamado após importação/sincronização)."""
+    cache = cache or ImageCache()
+    urls = collect_image_urls(db, tmdb_images)
+    print(f"Aquecendo cache de imagens com {len(urls)} URLs...")
+    return cache.warm(urls)
+
+
+def start_background_warm(urls, cache=None):
+    """
+    Dispara o aquecimento numa thread em segundo plano (não bloqueia a requisição).
+    Recebe a lista de URLs já lida do banco, para não compartilhar o cursor entre threads.
+    """
+    cache = cache or ImageCache()
+    thread = threading.Thread(target=cache.warm, args=(urls,), name='image-cache-warmer', daemon=True)
+    thread.start()
+    return thread
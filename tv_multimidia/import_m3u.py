@@ -1,8 +1,21 @@
 import re
+import json
 import psycopg2
 import psycopg2.extras  # Importante para a performance (execute_batch)
+import requests         # Download da playlist remota em streaming
 import sys
 import os               # Para ler variáveis de ambiente
+import mmap             # Leitura paralela sem copiar o arquivo inteiro
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from tv_multimidia.image_cache import ImageCache
+    from tv_multimidia.logo_sprites import LogoSpriteBuilder, group_logos_by_category
+    from tv_multimidia.catalog_events import SCOPE_CHANNELS, publish_catalog_change
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from image_cache import ImageCache
+    from logo_sprites import LogoSpriteBuilder, group_logos_by_category
+    from catalog_events import SCOPE_CHANNELS, publish_catalog_change
 
 # --- 1. CONFIGURAÇÕES ---
 
@@ -10,6 +23,50 @@ import os               # Para ler variáveis de ambiente
 ARQUIVO_M3U = os.environ.get('M3U_FILE_PATH', '/app/playlist_253588464_plus.m3u')
 # Para execução local, comente a linha acima e descomente a abaixo:
 # ARQUIVO_M3U = './playlist_253588464_plus.m3u'
+# Também aceita uma URL http(s): a playlist é baixada em streaming e
+# parseada sem gravar arquivo temporário.
+# ARQUIVO_M3U = 'http://provedor.exemplo/get.php?type=m3u_plus'
+
+# Onde guardar ETag/Last-Modified da última playlist remota importada
+ARQUIVO_ESTADO_M3U = os.environ.get(
+    'M3U_STATE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.m3u_state.json')
+)
+
+# (conexão, leitura) em segundos e tamanho dos blocos lidos do corpo HTTP
+HTTP_TIMEOUT = (10, 60)
+HTTP_CHUNK_SIZE = 64 * 1024
+
+# Sentinela retornada quando o servidor responde 304 Not Modified
+PLAYLIST_NAO_MODIFICADA = object()
+
+# Parse paralelo de playlists locais: número de processos ('auto' = todos os
+# núcleos, 1 = sequencial) e tamanho mínimo do arquivo para valer a pena.
+M3U_PARSE_WORKERS = os.environ.get('M3U_PARSE_WORKERS', '1')
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+# Blocos por processo: blocos menores equilibram melhor a carga entre núcleos
+CHUNKS_PER_WORKER = 4
+
+# Filtro de canais: arquivo JSON opcional com regras include/exclude.
+# Sem arquivo, vale o FILTRO_PADRAO (apenas grupos que contêm "CANAIS").
+# Exemplo de arquivo:
+# {
+#   "include": [{"field": "group", "contains": "CANAIS"}],
+#   "exclude": [{"field": "name", "regex": "XXX|ADULTO", "ignore_case": true},
+#               {"field": "tvg-country", "equals": "PT", "label": "sem canais PT"}]
+# }
+# Campos: "group" (group-title), "name" (tvg-name ou texto após a vírgula),
+# "logo" (tvg-logo) ou qualquer atributo "tvg-*".
+# Operadores: "equals" (busca em conjunto), "contains" e "regex" (regex única combinada).
+ARQUIVO_FILTRO_M3U = os.environ.get('M3U_FILTER_FILE')
+FILTRO_PADRAO = {
+    'include': [{'field': 'group', 'contains': 'CANAIS'}],
+    'exclude': [],
+}
+
+# Aquece o cache local de imagens (proxy da API) com os logos importados
+# e recompõe os sprites de logos por categoria
+AQUECER_IMAGENS = os.environ.get('M3U_WARM_IMAGES', '1').lower() in ('1', 'true', 'yes')
 
 # Configurações do PostgreSQL (usa variáveis de ambiente, com fallback)
 DB_CONFIG = {
@@ -22,94 +79,440 @@ DB_CONFIG = {
 }
 
 
-def parse_m3u(filepath):
+# Expressões pré-compiladas (usadas em todas as linhas #EXTINF)
+RE_GROUP_TITLE = re.compile(r'group-title="(.*?)"')
+RE_TVG_NAME = re.compile(r'tvg-name="(.*?)"')
+RE_TVG_LOGO = re.compile(r'tvg-logo="(.*?)"')
+_RE_ATRIBUTOS = {'group': RE_GROUP_TITLE, 'tvg-name': RE_TVG_NAME, 'logo': RE_TVG_LOGO, 'tvg-logo': RE_TVG_LOGO}
+
+FILTER_OPERATORS = ('equals', 'contains', 'regex')
+
+
+def _decode_line(raw_line):
     """
-    Lê um arquivo .m3u e extrai os dados de cada canal.
+    Decodifica uma linha em bytes com UTF-8, usando 'latin-1' como fallback.
     """
-    print(f"Iniciando leitura do arquivo: {filepath}...")
-    channels = []
-    current_channel_info = {}
-
     try:
-        # Tenta abrir com utf-8, que é comum
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.readlines()
+        return raw_line.decode('utf-8')
     except UnicodeDecodeError:
-        # Se falhar, tenta com 'latin-1' ou 'iso-8859-1'
-        print("Falha no UTF-8, tentando com 'latin-1'...")
-        try:
-            with open(filepath, 'r', encoding='latin-1') as f:
-                content = f.readlines()
-        except Exception as e_latin:
-            print(f"--- ERRO FATAL ---")
-            print(f"Não consegui ler o arquivo nem com UTF-8 nem com Latin-1: {e_latin}")
-            return None
-    except FileNotFoundError:
-        print(f"--- ERRO FATAL ---")
-        print(f"Arquivo não encontrado no caminho: '{filepath}'")
-        return None
-    except Exception as e:
-        print(f"Ocorreu um erro inesperado ao ler o arquivo: {e}")
+        return raw_line.decode('latin-1')
+
+
+def _extract_attribute(line, field):
+    """
+    Extrai um único atributo de uma linha #EXTINF ('group', 'name', 'logo'
+    ou 'tvg-*'). Retorna a string sem espaços nas pontas, ou None.
+    """
+    if field == 'name':
+        match_name = RE_TVG_NAME.search(line)
+        if match_name:
+            return match_name.group(1).strip()
+        # Pega o nome após a última vírgula como fallback
+        return line.split(',')[-1].strip()
+
+    regex = _RE_ATRIBUTOS.get(field)
+    if regex is None:
+        regex = _RE_ATRIBUTOS[field] = re.compile(re.escape(field) + r'="(.*?)"')
+    match = regex.search(line)
+    return match.group(1).strip() if match else None
+
+
+class ExtinfFields(dict):
+    """
+    Atributos de uma linha #EXTINF, extraídos sob demanda e memorizados:
+    uma linha rejeitada pelo filtro só paga pelos campos que as regras consultam.
+    """
+
+    def __init__(self, line):
+        super().__init__()
+        self.line = line
+
+    def __missing__(self, field):
+        value = _extract_attribute(self.line, field)
+        self[field] = value
+        return value
+
+
+class ChannelFilter:
+    """
+    Filtro declarativo de canais (regras include/exclude sobre group, name
+    e atributos tvg-*), compilado uma única vez:
+
+    - regras "equals" viram um dict (busca O(1) por campo);
+    - regras "contains"/"regex" de um mesmo campo viram UMA regex combinada
+      com grupos nomeados, de modo que uma busca identifica a regra acertada.
+      Padrões com grupos de captura (ex: referências "\\1") ficam fora dela e
+      são testados um a um: na regex combinada os grupos seriam renumerados.
+
+    Um canal é rejeitado se alguma regra exclude casar, e aceito se não
+    houver regras include ou se alguma delas casar. Mantém contadores de
+    acertos por regra em `hits`.
+    """
+
+    REJECTED_NO_INCLUDE = 'rejeitados (nenhuma regra include casou)'
+
+    def __init__(self, config=None):
+        self.config = FILTRO_PADRAO if config is None else config
+        self.hits = {}
+        self._group_labels = {}
+        self.exclude = self._compile(self.config.get('exclude', []), 'exclude')
+        self.include = self._compile(self.config.get('include', []), 'include')
+        if self.include:
+            self.hits[self.REJECTED_NO_INCLUDE] = 0
+
+    def _compile(self, rules, kind):
+        """
+        Agrupa as regras por campo:
+        {campo: (equals, equals_ci, regex_combinada, [(regex, rótulo), ...])}.
+        """
+        by_field = {}
+        for idx, rule in enumerate(rules):
+            operators = [op for op in FILTER_OPERATORS if op in rule]
+            if len(operators) != 1:
+                raise ValueError(f"Regra de filtro inválida (use exatamente um de {FILTER_OPERATORS}): {rule}")
+            op = operators[0]
+            value = rule[op]
+            field = rule.get('field', 'group')
+            ignore_case = bool(rule.get('ignore_case', False))
+            label = rule.get('label') or f"{kind} {field} {op} {value!r}"
+            self.hits.setdefault(label, 0)
+
+            equals, equals_ci, patterns, separate = by_field.setdefault(field, ({}, {}, [], []))
+            if op == 'equals':
+                if ignore_case:
+                    equals_ci.setdefault(value.casefold(), label)
+                else:
+                    equals.setdefault(value, label)
+                continue
+
+            pattern = re.escape(value) if op == 'contains' else value
+            flags = re.IGNORECASE if ignore_case else 0
+            try:
+                # Compilada sozinha primeiro: valida a regra e conta os grupos de captura
+                regex = re.compile(pattern, flags)
+            except re.error as e:
+                raise ValueError(f"Regra de filtro inválida (regex): {rule}: {e}") from e
+            # Grupos (\1 mudaria de número) e flags globais como (?i) (só valem no
+            # início da expressão) não entram na regex combinada
+            if regex.groups or regex.flags != re.compile('', flags).flags:
+                separate.append((regex, label))
+                continue
+            if ignore_case:
+                pattern = f'(?i:{pattern})'
+            group_name = f'{kind[0]}{idx}'
+            self._group_labels[group_name] = label
+            patterns.append(f'(?P<{group_name}>{pattern})')
+
+        return {
+            field: (equals, equals_ci, re.compile('|'.join(patterns)) if patterns else None, separate)
+            for field, (equals, equals_ci, patterns, separate) in by_field.items()
+        }
+
+    def _first_hit(self, rules, fields):
+        """Retorna o rótulo da primeira regra que casa com os campos, ou None."""
+        for field, (equals, equals_ci, regex, separate) in rules.items():
+            value = fields[field]
+            if value is None:
+                continue
+            label = equals.get(value)
+            if label is None and equals_ci:
+                label = equals_ci.get(value.casefold())
+            if label is None and regex is not None:
+                match = regex.search(value)
+                if match:
+                    label = self._group_labels[match.lastgroup]
+            if label is None:
+                for pattern, pattern_label in separate:
+                    if pattern.search(value):
+                        label = pattern_label
+                        break
+            if label is not None:
+                return label
         return None
 
-    # Processa as linhas lidas
-    for line in content:
+    def match(self, line):
+        """
+        Avalia uma linha #EXTINF. Retorna os campos (ExtinfFields) se o canal
+        for aceito, ou None se for rejeitado.
+        """
+        fields = ExtinfFields(line)
+
+        label = self._first_hit(self.exclude, fields)
+        if label is not None:
+            self.hits[label] += 1
+            return None
+
+        if self.include:
+            label = self._first_hit(self.include, fields)
+            if label is None:
+                self.hits[self.REJECTED_NO_INCLUDE] += 1
+                return None
+            self.hits[label] += 1
+
+        return fields
+
+    def take_hits(self):
+        """Retorna os contadores acumulados e zera (usado pelos processos do parse paralelo)."""
+        hits = dict(self.hits)
+        self.hits = dict.fromkeys(self.hits, 0)
+        return hits
+
+    def merge_hits(self, hits):
+        """Soma contadores vindos de outro processo."""
+        for label, count in hits.items():
+            self.hits[label] = self.hits.get(label, 0) + count
+
+    def print_report(self):
+        """Imprime os acertos por regra do filtro."""
+        print("--- Filtro de canais: acertos por regra ---")
+        for label, count in self.hits.items():
+            print(f"  {label}: {count}")
+
+
+def load_channel_filter(path=None):
+    """
+    Carrega o filtro de canais do arquivo JSON (M3U_FILTER_FILE) ou usa o padrão.
+    """
+    path = ARQUIVO_FILTRO_M3U if path is None else path
+    if not path:
+        return ChannelFilter(FILTRO_PADRAO)
+    with open(path, 'r', encoding='utf-8') as f:
+        return ChannelFilter(json.load(f))
+
+
+def parse_m3u_lines(lines, channel_filter=None):
+    """
+    Parser incremental: consome um iterável de linhas (bytes ou str) e
+    gera um dict por canal, sem precisar carregar a playlist inteira.
+    Serve tanto para arquivos locais quanto para o corpo de uma resposta HTTP.
+    """
+    if channel_filter is None:
+        channel_filter = ChannelFilter()
+    current_channel_info = {}
+
+    for line in lines:
+        if isinstance(line, bytes):
+            line = _decode_line(line)
         line = line.strip()
 
         if line.startswith('#EXTINF:'):
-            # Encontrou uma linha de informação do canal
-            current_channel_info = {
-                'name': None,
-                'logo': None,
-                'group_title': None,
-            }
-
-            # Extrai group-title
-            match_group = re.search(r'group-title="(.*?)"', line)
-            
-            if match_group:
-                group_name = match_group.group(1).strip()
-                current_channel_info['group_title'] = group_name
-                
-                # FILTRAR APENAS CANAIS QUE CONTENHAM "CANAIS"
-                if "CANAIS" not in group_name:
-                    current_channel_info = {} # Ignora este canal
-                    continue
-            else:
-                # Se não tiver group-title, ignora
-                current_channel_info = {}
+            # O filtro roda antes de qualquer outra extração de atributos
+            fields = channel_filter.match(line)
+            if fields is None:
+                current_channel_info = {} # Ignora este canal
                 continue
 
-            # Extrai tvg-name
-            match_name = re.search(r'tvg-name="(.*?)"', line)
-            if match_name:
-                current_channel_info['name'] = match_name.group(1).strip()
-            else:
-                # Pega o nome após a última vírgula como fallback
-                try:
-                    current_channel_info['name'] = line.split(',')[-1].strip()
-                except Exception:
-                    pass  # Deixa como None se falhar
-
-            # Extrai tvg-logo
-            match_logo = re.search(r'tvg-logo="(.*?)"', line)
-            if match_logo:
-                logo_url = match_logo.group(1).strip()
+            # Encontrou uma linha de informação do canal; os campos já
+            # consultados pelo filtro não são extraídos de novo.
+            current_channel_info = {
+                'name': fields['name'],
                 # Trata logos vazios ("") como None
-                current_channel_info['logo'] = logo_url if logo_url else None
+                'logo': fields['logo'] or None,
+                'group_title': fields['group'],
+            }
 
         elif line and not line.startswith('#'):
             # Esta é a linha da URL, que vem DEPOIS da linha #EXTINF
             if current_channel_info:  # Se temos infos de um canal pendente
-                # Não salvamos a URL de stream, conforme a lógica anterior
-                channels.append(current_channel_info)
+                current_channel_info['stream_url'] = line
+                yield current_channel_info
                 # Reseta para o próximo canal
                 current_channel_info = {}
 
-    print(f"Leitura concluída. Total de {len(channels)} canais filtrados (contendo 'CANAIS').")
+
+def parse_m3u(filepath, channel_filter=None):
+    """
+    Lê um arquivo .m3u e extrai os dados de cada canal.
+    """
+    print(f"Iniciando leitura do arquivo: {filepath}...")
+    if channel_filter is None:
+        channel_filter = load_channel_filter()
+
+    try:
+        # Lê em modo binário, linha a linha; a decodificação é feita por linha
+        with open(filepath, 'rb') as f:
+            channels = list(parse_m3u_lines(f, channel_filter))
+    except FileNotFoundError:
+        print(f"--- ERRO FATAL ---")
+        print(f"Arquivo não encontrado no caminho: '{filepath}'")
+        return None
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado ao ler o arquivo: {e}")
+        return None
+
+    channel_filter.print_report()
+    print(f"Leitura concluída. Total de {len(channels)} canais aceitos pelo filtro.")
+    return channels
+
+
+def resolve_parse_workers(value=None):
+    """Converte M3U_PARSE_WORKERS ('auto' ou um número) em quantidade de processos."""
+    value = M3U_PARSE_WORKERS if value is None else value
+    if str(value).strip().lower() == 'auto':
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 1
+
+
+def _split_chunks(mm, num_chunks):
+    """
+    Divide o arquivo mapeado em até num_chunks intervalos [início, fim),
+    sempre cortando no início de uma linha #EXTINF para que cada canal
+    (#EXTINF + URL) fique inteiro dentro de um único bloco.
+    """
+    size = len(mm)
+    starts = [0]
+    for i in range(1, num_chunks):
+        target = max(size * i // num_chunks, starts[-1])
+        idx = mm.find(b'\n#EXTINF', target)
+        if idx == -1:
+            break
+        if idx + 1 > starts[-1]:
+            starts.append(idx + 1)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+# Filtro compilado uma vez por processo do pool (ver _init_parse_worker)
+_worker_filter = None
+
+
+def _init_parse_worker(filter_config):
+    """Inicializador dos processos filhos: compila o filtro uma única vez."""
+    global _worker_filter
+    _worker_filter = ChannelFilter(filter_config)
+
+
+def _parse_chunk(args):
+    """
+    Processo filho: parseia um intervalo de bytes do arquivo mapeado.
+    Retorna (canais, acertos do filtro neste bloco).
+    """
+    filepath, start, end = args
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Só '\n' separa linhas, como na iteração do arquivo em parse_m3u
+            # (splitlines() também quebraria em '\r', '\x0b', '\x0c'...); o '\r'
+            # de finais CRLF sai no strip() do parser
+            channels = list(parse_m3u_lines(mm[start:end].split(b'\n'), _worker_filter))
+    return channels, _worker_filter.take_hits()
+
+
+def parse_m3u_parallel(filepath, workers=None, channel_filter=None):
+    """
+    Versão multi-núcleo de parse_m3u para playlists muito grandes.
+
+    Mapeia o arquivo em memória (mmap), divide em blocos nas fronteiras
+    de #EXTINF, parseia os blocos num pool de processos e junta os
+    resultados na ordem original. Arquivos pequenos (ou workers=1) usam
+    o parser sequencial, pois o custo de subir processos não compensa.
+    """
+    workers = resolve_parse_workers(workers)
+    if channel_filter is None:
+        channel_filter = load_channel_filter()
+
+    try:
+        size = os.path.getsize(filepath)
+    except OSError:
+        # Deixa o parser sequencial reportar o erro de leitura
+        return parse_m3u(filepath, channel_filter)
+
+    if workers <= 1 or size < PARALLEL_MIN_BYTES:
+        return parse_m3u(filepath, channel_filter)
+
+    print(f"Iniciando leitura paralela do arquivo: {filepath} ({workers} processos)...")
+
+    try:
+        with open(filepath, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                chunks = _split_chunks(mm, workers * CHUNKS_PER_WORKER)
+
+        channels = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker,
+                                 initargs=(channel_filter.config,)) as pool:
+            # map() preserva a ordem dos blocos
+            for chunk_channels, chunk_hits in pool.map(_parse_chunk, [(filepath, start, end) for start, end in chunks]):
+                channels.extend(chunk_channels)
+                channel_filter.merge_hits(chunk_hits)
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado ao ler o arquivo: {e}")
+        return None
+
+    channel_filter.print_report()
+    print(f"Leitura concluída. Total de {len(channels)} canais aceitos pelo filtro.")
     return channels
 
 
+def is_remote_playlist(source):
+    """Indica se a fonte da playlist é uma URL http(s) em vez de um arquivo local."""
+    return source.lower().startswith(('http://', 'https://'))
+
+
+def carregar_estado_remoto(state_path):
+    """
+    Lê os validadores HTTP (ETag/Last-Modified) salvos na última importação.
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def salvar_estado_remoto(state_path, validators):
+    """
+    Grava os validadores HTTP da playlist importada com sucesso.
+    """
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(validators, f)
+    os.replace(tmp_path, state_path)
+
+
+def parse_m3u_remote(url, state_path=ARQUIVO_ESTADO_M3U, timeout=HTTP_TIMEOUT, channel_filter=None):
+    """
+    Baixa a playlist por HTTP em streaming e parseia o corpo diretamente,
+    sem gravar arquivo temporário.
+
+    Envia If-None-Match/If-Modified-Since com os validadores da última
+    importação. Retorna (canais, validadores); se o servidor responder 304,
+    retorna (PLAYLIST_NAO_MODIFICADA, None). Em caso de erro, (None, None).
+    """
+    print(f"Iniciando download da playlist: {url}...")
+    if channel_filter is None:
+        channel_filter = load_channel_filter()
+
+    headers = {}
+    estado = carregar_estado_remoto(state_path)
+    if estado.get('url') == url:
+        if estado.get('etag'):
+            headers['If-None-Match'] = estado['etag']
+        if estado.get('last_modified'):
+            headers['If-Modified-Since'] = estado['last_modified']
+
+    try:
+        with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 304:
+                return PLAYLIST_NAO_MODIFICADA, None
+            response.raise_for_status()
+
+            channels = list(parse_m3u_lines(response.iter_lines(chunk_size=HTTP_CHUNK_SIZE), channel_filter))
+            validators = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+    except requests.RequestException as e:
+        print(f"--- ERRO FATAL ---")
+        print(f"Não foi possível baixar a playlist: {e}")
+        return None, None
+
+    channel_filter.print_report()
+    print(f"Leitura concluída. Total de {len(channels)} canais aceitos pelo filtro.")
+    return channels, validators
+
+
 def limpar_todos_canais(db):
     """
     Remove TODOS os canais da tabela channels.
@@ -132,11 +535,12 @@ def salvar_canais_no_banco(db, channels_data):
     """
     RECOMENDAÇÃO: Salva os canais no banco de dados em um único
     lote (batch) para máxima eficiência.
+    Retorna True se a inserção foi confirmada (commit).
     """
     total = len(channels_data)
     if total == 0:
         print("Nenhum canal para inserir.")
-        return
+        return False
 
     print(f"Preparando {total} canais para inserção em lote...")
     data_to_insert = []
@@ -147,6 +551,7 @@ def salvar_canais_no_banco(db, channels_data):
         name = channel.get('name')
         logo = channel.get('logo') # Esta é a URL da imagem
         group_title = channel.get('group_title')
+        stream_url = channel.get('stream_url')
         description = None # Definido como None
 
         if not name:
@@ -154,17 +559,17 @@ def salvar_canais_no_banco(db, channels_data):
             continue
         
         # A tupla deve corresponder aos %s na query
-        # (name, logopath, category, description, imageurls)
-        data_to_insert.append((name, logo, group_title, description, logo))
+        # (name, logopath, streamurl, category, description, imageurls)
+        data_to_insert.append((name, logo, stream_url, group_title, description, logo))
     
     if not data_to_insert:
         print("Nenhum canal válido para inserir (todos foram pulados).")
-        return
+        return False
     
-    # 2. Define o SQL (streamurl é 'NULL' diretamente no SQL)
+    # 2. Define o SQL (a URL do stream é salva para o verificador de saúde)
     sql_insert = """
         INSERT INTO channels (name, logopath, streamurl, category, description, imageurls)
-        VALUES (%s, %s, NULL, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s)
     """
     
     # 3. Executa a transação
@@ -176,6 +581,9 @@ def salvar_canais_no_banco(db, channels_data):
             psycopg2.extras.execute_batch(cursor, sql_insert, data_to_insert)
             
             inserted_count = cursor.rowcount # Pega o número de linhas afetadas
+
+            # Avisa as instâncias da API (entregue só no commit, com os canais novos visíveis)
+            publish_catalog_change(cursor, SCOPE_CHANNELS)
             
             print("Realizando commit final...")
             db.commit()
@@ -187,16 +595,33 @@ def salvar_canais_no_banco(db, channels_data):
         print("Revertendo todas as alterações (rollback)...")
         db.rollback()
         print("Alterações revertidas.")
-        return # Sai da função em caso de erro
+        return False # Sai da função em caso de erro
 
     print(f"\n--- Resumo da Importação ---")
     print(f"Total de canais na lista M3U: {total}")
     print(f"Inseridos com sucesso: {inserted_count}")
     print(f"Pulados (sem nome): {skipped}")
+    return True
 
 
 def main():
-    # 1. Conecta ao banco de dados PostgreSQL
+    # 1. Lê e parseia a playlist (arquivo local ou URL remota)
+    # Feito antes de conectar: uma playlist remota inalterada (304)
+    # não deve custar nenhum trabalho no banco.
+    validadores = None
+    if is_remote_playlist(ARQUIVO_M3U):
+        lista_de_canais, validadores = parse_m3u_remote(ARQUIVO_M3U)
+        if lista_de_canais is PLAYLIST_NAO_MODIFICADA:
+            print("Playlist remota não foi modificada desde a última importação (304). Nada a fazer.")
+            return
+    else:
+        lista_de_canais = parse_m3u_parallel(ARQUIVO_M3U)
+
+    if not lista_de_canais:
+        print("Nenhum canal foi processado. Encerrando o script.")
+        return
+
+    # 2. Conecta ao banco de dados PostgreSQL
     try:
         # ATUALIZAÇÃO: Usa o dict DB_CONFIG (que usa env vars)
         db = psycopg2.connect(**DB_CONFIG)
@@ -206,26 +631,33 @@ def main():
         print("Verifique se o host, usuário, senha e porta estão corretos.")
         return
 
-    # 2. Lê e parseia o arquivo M3U
-    lista_de_canais = parse_m3u(ARQUIVO_M3U)
-
-    if not lista_de_canais:
-        print("Nenhum canal foi processado. Encerrando o script.")
-        db.close()
-        return
-        
     try:
         # 3. Remove todos os canais da tabela
         limpar_todos_canais(db)
 
         # 4. Salva os canais no banco
         print("\nIniciando inserção dos canais no banco de dados...")
-        salvar_canais_no_banco(db, lista_de_canais)
+        sucesso = salvar_canais_no_banco(db, lista_de_canais)
+
+        # 5. Só lembra ETag/Last-Modified depois de um commit bem-sucedido,
+        # senão uma importação com falha seria pulada na próxima execução.
+        if sucesso and validadores:
+            salvar_estado_remoto(ARQUIVO_ESTADO_M3U, validadores)
+
+        # 6. Baixa e redimensiona os logos novos para o proxy de imagens da API
+        if sucesso and AQUECER_IMAGENS:
+            logos = [canal.get('logo') for canal in lista_de_canais]
+            print(f"\nAquecendo cache de imagens com os logos importados...")
+            cache = ImageCache()
+            cache.warm(logos)
+
+            # 7. Recompõe os sprites das categorias cujos logos mudaram
+            LogoSpriteBuilder(image_cache=cache).build(group_logos_by_category(lista_de_canais))
 
     except Exception as e:
         print(f"Um erro crítico ocorreu durante a operação com o banco: {e}")
     finally:
-        # 5. Fecha a conexão
+        # 8. Fecha a conexão
         db.close()
         print("\nConexão com o banco de dados fechada.")
 
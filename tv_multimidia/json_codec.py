@@ -0,0 +1,162 @@
+"""
+Serialização JSON das respostas da API, com codificador plugável.
+
+    dumps(obj) -> bytes    (chaves ordenadas, compacto, '\\n' no final, como o jsonify)
+    encode(obj) -> bytes   (o mesmo, sem o '\\n': fragmento para juntar a outros)
+
+JSON_ENCODER escolhe o codificador:
+    orjson  (padrão, se instalado) escrito em C, várias vezes mais rápido
+    json    biblioteca padrão, com a saída idêntica à do jsonify do Flask
+
+Nos dois, datas saem no formato HTTP do Flask ("Sun, 01 Jan 2023 00:00:00 GMT")
+e Decimal/UUID como texto, para o app não perceber a troca. O orjson não escapa
+acentos (UTF-8 direto) — o JSON é equivalente.
+
+FragmentCache guarda listas de linhas já codificadas (bytes), por chave: as
+respostas quentes e imutáveis até a próxima alteração (ex: os canais de uma
+categoria depois de uma importação) são montadas juntando os fragmentos,
+sem codificar de novo. FastJSONProvider é o provider do Flask (app.json) que usa
+dumps() e devolve os bytes direto na resposta.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem ele, usa o json da biblioteca padrão
+    orjson = None
+
+try:
+    from tv_multimidia.prepared import Row
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from prepared import Row
+
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson' if orjson is not None else 'json')
+# Entradas (ex: categorias x filtros) e validade máxima (segundos) do FragmentCache;
+# a notificação de alteração do catálogo invalida antes disso
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 512))
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60 * 60))
+
+
+# Timestamps se repetem muito numa resposta (ex: streamcheckedat da mesma verificação)
+_http_date = lru_cache(maxsize=4096)(http_date)
+
+
+def _default(o):
+    """Tipos que nenhum dos codificadores converte no formato do Flask."""
+    if isinstance(o, Row):
+        return o._asdict()
+    if isinstance(o, date):
+        return _http_date(o)
+    if isinstance(o, (Decimal, uuid.UUID)):
+        return str(o)
+    raise TypeError(f"Objeto do tipo {type(o).__name__} não é serializável em JSON")
+
+
+if JSON_ENCODER == 'orjson':
+    if orjson is None:
+        raise ImportError("JSON_ENCODER=orjson, mas o pacote orjson não está instalado")
+    # Datas passam pelo _default (formato HTTP do Flask em vez de ISO)
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def encode(obj):
+        """Fragmento JSON (bytes, sem '\\n')."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+elif JSON_ENCODER == 'json':
+    def encode(obj):
+        """Fragmento JSON (bytes, sem '\\n')."""
+        return json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+    loads = json.loads
+else:
+    raise ValueError(f"JSON_ENCODER desconhecido: {JSON_ENCODER} (use orjson ou json)")
+
+
+def dumps(obj):
+    """Corpo de resposta JSON (bytes), terminado em '\\n' como o jsonify."""
+    return encode(obj) + b'\n'
+
+
+def encode_rows(rows):
+    """Fragmentos codificados de cada linha (sem '\\n'), para guardar e juntar depois."""
+    return [encode(row) for row in rows]
+
+
+def join_array(fragments):
+    """'[f1,f2,...]' a partir de fragmentos já codificados."""
+    return b'[' + b','.join(fragments) + b']'
+
+
+def join_object(members):
+    """'{"k":v,...}' a partir de (chave, fragmento), na ordem dada (já ordenada)."""
+    return b'{' + b','.join(encode(key) + b':' + value for key, value in members) + b'}'
+
+
+class FragmentCache:
+    """Listas de linhas codificadas por chave, com LRU, validade e invalidação."""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE, ttl=FRAGMENT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Muda a cada invalidação: quem carregou antes dela não grava resultado velho
+        self._generation = 0
+
+    def get(self, key, load):
+        """
+        Array JSON (bytes) das linhas de `key`; na falta, codifica load() e guarda.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+
+        body = join_array(encode_rows(load()))
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body
+
+    def invalidate(self, keys=None):
+        """Descarta as chaves (None = todas)."""
+        with self._lock:
+            self._generation += 1
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class FastJSONProvider(JSONProvider):
+    """app.json do Flask usando dumps(); jsonify devolve os bytes sem decodificar."""
+
+    def dumps(self, obj, **kwargs):
+        return encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
@@ -0,0 +1,333 @@
+"""
+Índice binário pré-compilado do logos.csv.
+
+O CSV (~42 mil linhas) é lido e normalizado uma única vez pelo passo de
+compilação; o resultado é um arquivo binário compacto que é mapeado em
+memória (mmap) e consultado por busca binária, sem carregar nada para o
+heap do Python. A carga é preguiçosa (o arquivo só é mapeado na primeira
+consulta) e o índice só é recompilado quando o hash do CSV muda.
+
+Seções do arquivo (todas com inteiros na ordem de bytes da máquina que
+compilou; o índice é um artefato local e é recompilado se a ordem diferir):
+    0 chaves normalizadas (ordenadas)      -> tabela de strings
+    1 URL do melhor logo de cada chave     -> tabela de strings
+    2 número de trigramas de cada chave    -> u16[n]
+    3 assinaturas de tokens (ordenadas)    -> tabela de strings
+    4 chave de cada assinatura             -> u32[m]
+    5 trigramas (ordenados)                -> tabela de strings
+    6 início das listas de chaves por trigrama -> u32[g + 1]
+    7 listas de chaves por trigrama        -> u32[...]
+
+Tabela de strings: u32 quantidade, u32 offsets[quantidade + 1], bytes UTF-8.
+
+Uso:
+    python -m tv_multimidia.logo_index [caminho/do/logos.csv]
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+try:
+    from tv_multimidia.logo_matcher import LogoMatcher, trigrams
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from logo_matcher import LogoMatcher, trigrams
+
+LOGOS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logos.csv')
+# Por padrão o índice fica ao lado do CSV (logos.csv -> logos.csv.idx)
+LOGO_INDEX_FILE = os.environ.get('LOGO_INDEX_FILE')
+
+MAGIC = b'LOGOIDX1'
+SECTION_COUNT = 8
+# magic, ordem de bytes, tamanho do CSV, mtime do CSV (ns), sha256 do CSV, offsets das seções
+_HEADER = struct.Struct(f'<8s1s7xQq32s{SECTION_COUNT}Q')
+_BYTEORDER = b'l' if sys.byteorder == 'little' else b'b'
+
+
+def default_index_path(csv_path):
+    return LOGO_INDEX_FILE or f'{csv_path}.idx'
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.digest()
+
+
+def _string_table(strings):
+    blob = bytearray()
+    offsets = array('I', [0])
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    return array('I', [len(strings)]).tobytes() + offsets.tobytes() + bytes(blob)
+
+
+def compile_logo_index(csv_path=LOGOS_CSV, index_path=None):
+    """Compila o CSV para o índice binário (gravação atômica). Retorna o caminho do índice."""
+    index_path = index_path or default_index_path(csv_path)
+    stat = os.stat(csv_path)
+    digest = _file_sha256(csv_path)
+
+    # Reaproveita as regras de normalização e de escolha do melhor logo do LogoMatcher
+    matcher = LogoMatcher.from_csv(csv_path)
+    keys = sorted(matcher.key_to_url, key=lambda k: k.encode('utf-8'))
+    key_id = {key: i for i, key in enumerate(keys)}
+
+    signatures = sorted(
+        ((_token_signature(tokens), key_id[key]) for tokens, key in matcher.token_index.items()),
+        key=lambda item: item[0].encode('utf-8')
+    )
+
+    postings = {}
+    counts = array('H')
+    for i, key in enumerate(keys):
+        grams = trigrams(key)
+        counts.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            postings.setdefault(gram, array('I')).append(i)
+    grams_sorted = sorted(postings, key=lambda g: g.encode('utf-8'))
+    posting_starts = array('I', [0])
+    posting_ids = array('I')
+    for gram in grams_sorted:
+        posting_ids.extend(postings[gram])
+        posting_starts.append(len(posting_ids))
+
+    sections = [
+        _string_table(keys),
+        _string_table([matcher.key_to_url[key] for key in keys]),
+        counts.tobytes(),
+        _string_table([signature for signature, _ in signatures]),
+        array('I', [i for _, i in signatures]).tobytes(),
+        _string_table(grams_sorted),
+        posting_starts.tobytes(),
+        posting_ids.tobytes(),
+    ]
+
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        position += (-position) % 4  # Alinha em 4 bytes para o memoryview.cast
+        offsets.append(position)
+        position += len(section)
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, _BYTEORDER, stat.st_size, stat.st_mtime_ns, digest, *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section)
+    os.replace(tmp_path, index_path)
+    print(f"Índice de logos compilado: {len(keys)} chaves, {len(grams_sorted)} trigramas -> {index_path}")
+    return index_path
+
+
+def _token_signature(tokens):
+    """Conjunto de tokens -> string canônica ('news globo' e 'globo news' -> 'globo news')."""
+    return ' '.join(sorted(tokens))
+
+
+def _read_header(index_path):
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(data) != _HEADER.size:
+        return None
+    header = _HEADER.unpack(data)
+    if header[0] != MAGIC or header[1] != _BYTEORDER:
+        return None
+    return header
+
+
+def index_is_current(csv_path, index_path):
+    """
+    True se o índice corresponde ao CSV. Tamanho e mtime iguais bastam;
+    se mudaram, compara o hash (um CSV apenas "tocado" não força recompilação).
+    """
+    header = _read_header(index_path)
+    if header is None:
+        return False
+    _, _, size, mtime_ns, digest = header[:5]
+    stat = os.stat(csv_path)
+    if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+        return True
+    if stat.st_size != size or _file_sha256(csv_path) != digest:
+        return False
+    # Mesmo conteúdo: atualiza o mtime no cabeçalho para a próxima verificação ser rápida
+    with open(index_path, 'r+b') as f:
+        f.write(_HEADER.pack(*header[:3], stat.st_mtime_ns, *header[4:]))
+    return True
+
+
+class _StringTable:
+    """Tabela de strings dentro do mmap; `find` faz busca binária em tabelas ordenadas."""
+
+    def __init__(self, mm, offset):
+        self.mm = mm
+        self.count = struct.unpack_from('=I', mm, offset)[0]
+        start = offset + 4
+        self.offsets = memoryview(mm)[start:start + 4 * (self.count + 1)].cast('I')
+        self.blob_start = start + 4 * (self.count + 1)
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, i):
+        return self.mm[self.blob_start + self.offsets[i]:self.blob_start + self.offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.raw(i).decode('utf-8')
+
+    def find(self, text):
+        """Posição de `text` na tabela ordenada, ou -1."""
+        target = text.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.raw(lo) == target else -1
+
+
+class _KeyUrls:
+    """Chave normalizada -> URL (interface de dict usada pelo LogoMatcher)."""
+
+    def __init__(self, keys, urls):
+        self.keys, self.urls = keys, urls
+
+    def get(self, key, default=None):
+        i = self.keys.find(key)
+        return self.urls[i] if i >= 0 else default
+
+    def __getitem__(self, key):
+        url = self.get(key)
+        if url is None:
+            raise KeyError(key)
+        return url
+
+    def __contains__(self, key):
+        return self.keys.find(key) >= 0
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class _TokenKeys:
+    """Conjunto de tokens -> chave normalizada."""
+
+    def __init__(self, signatures, key_ids, keys):
+        self.signatures, self.key_ids, self.keys = signatures, key_ids, keys
+
+    def get(self, tokens, default=None):
+        i = self.signatures.find(_token_signature(tokens))
+        return self.keys[self.key_ids[i]] if i >= 0 else default
+
+
+class _TrigramPostings:
+    """Trigrama -> ids das chaves que o contêm."""
+
+    def __init__(self, grams, starts, ids):
+        self.grams, self.starts, self.ids = grams, starts, ids
+
+    def get(self, gram, default=()):
+        i = self.grams.find(gram)
+        return self.ids[self.starts[i]:self.starts[i + 1]] if i >= 0 else default
+
+
+class LogoIndex:
+    """Índice binário mapeado em memória; o arquivo só é aberto na primeira consulta."""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._mm = None
+
+    def _open(self):
+        if self._mm is None:
+            with open(self.index_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = _HEADER.unpack_from(mm)[5:]
+            view = memoryview(mm)
+
+            def u32(section, end):
+                return view[offsets[section]:end].cast('I')
+
+            keys = _StringTable(mm, offsets[0])
+            signatures = _StringTable(mm, offsets[3])
+            grams = _StringTable(mm, offsets[5])
+            self._keys = keys
+            self._key_urls = _KeyUrls(keys, _StringTable(mm, offsets[1]))
+            self._trigram_counts = view[offsets[2]:offsets[2] + 2 * len(keys)].cast('H')
+            self._token_keys = _TokenKeys(signatures, u32(4, offsets[4] + 4 * len(signatures)), keys)
+            starts = u32(6, offsets[6] + 4 * (len(grams) + 1))
+            self._postings = _TrigramPostings(grams, starts, u32(7, offsets[7] + 4 * starts[-1]))
+            self._mm = mm
+        return self
+
+    @property
+    def keys(self):
+        return self._open()._keys
+
+    @property
+    def key_to_url(self):
+        return self._open()._key_urls
+
+    @property
+    def token_index(self):
+        return self._open()._token_keys
+
+    @property
+    def trigram_index(self):
+        return self._open()._postings
+
+    @property
+    def trigram_counts(self):
+        return self._open()._trigram_counts
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key, default=None):
+        """URL do logo para uma chave já normalizada."""
+        return self.key_to_url.get(key, default)
+
+
+def load_logo_index(csv_path=LOGOS_CSV, index_path=None):
+    """Retorna o LogoIndex do CSV, recompilando-o apenas se o CSV mudou."""
+    index_path = index_path or default_index_path(csv_path)
+    if not index_is_current(csv_path, index_path):
+        compile_logo_index(csv_path, index_path)
+    return LogoIndex(index_path)
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else LOGOS_CSV
+    inicio = time.perf_counter()
+    index_path = compile_logo_index(csv_path)
+    print(f"Compilado em {time.perf_counter() - inicio:.2f}s")
+
+    inicio = time.perf_counter()
+    matcher = LogoMatcher.from_index(load_logo_index(csv_path, index_path))
+    print(f"Carga do índice: {(time.perf_counter() - inicio) * 1000:.2f}ms")
+
+    amostra = ['GLOBO SP FHD', 'SPORTV 2 HD', 'HBO FAMILY', 'NEWS GLOBO', 'DISCOVERY KIDS']
+    inicio = time.perf_counter()
+    for nome in amostra:
+        matcher.match(nome)
+    por_busca = (time.perf_counter() - inicio) / len(amostra) * 1_000_000
+    print(f"Primeira busca (mapeia o arquivo) + {len(amostra) - 1} buscas: {por_busca:.0f}µs por busca")
+
+
+if __name__ == "__main__":
+    main()
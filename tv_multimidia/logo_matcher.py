@@ -0,0 +1,224 @@
+"""
+Casamento aproximado entre os nomes de canais do M3U ("GLOBO SP FHD") e o
+catálogo de logotipos logos.csv ("Globo.br", "GloboNews.br", ...).
+
+O índice é montado uma vez em memória:
+- chave normalizada (sem acentos, pontuação, espaços, sufixos de qualidade
+  e sufixo de país) -> melhor linha do CSV para aquela chave;
+- índice de tokens (conjunto de tokens -> chave), que casa nomes com as
+  palavras em outra ordem ("NEWS GLOBO" -> "GloboNews");
+- índice de trigramas (trigrama -> chaves) para gerar candidatos quando
+  não há casamento exato.
+
+Todos os nomes de canais são casados numa única passada (match_all), com
+memorização por chave normalizada. As mesmas estruturas podem vir de um
+índice binário pré-compilado (logo_index.py, LogoMatcher.from_index).
+"""
+
+import csv
+import re
+import unicodedata
+from collections import Counter
+
+# Tokens que descrevem a qualidade/variante do stream e não o canal
+QUALITY_TOKENS = frozenset({
+    'fhd', 'hd', 'sd', 'uhd', '4k', '8k', 'fullhd', 'hevc', 'h264', 'h265', 'x265',
+    '1080p', '1080', '720p', '720', '480p', '60fps', '50fps', 'hdr', 'alt', 'backup', 'bkp',
+})
+# Países preferidos quando a mesma chave existe em vários países (app pt-BR)
+PREFERRED_COUNTRIES = ('br', 'pt', 'us')
+# Casamento por prefixo de tokens: tamanho mínimo da chave (evita casar "tv")
+MIN_PREFIX_KEY_LENGTH = 4
+# Similaridade mínima (coeficiente de Dice sobre trigramas) para aceitar um candidato
+MIN_TRIGRAM_SCORE = 0.75
+
+_RE_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_RE_CAMEL_TOKENS = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+_RE_COUNTRY_SUFFIX = re.compile(r'\.([a-z]{2})$', re.IGNORECASE)
+
+MATCH_EXACT = 'exato'
+MATCH_TOKENS = 'tokens'
+MATCH_PREFIX = 'prefixo'
+MATCH_TRIGRAM = 'trigrama'
+
+
+def strip_accents(text):
+    """Remove acentos ('Ação' -> 'Acao') e normaliza formas compatíveis ('²' -> '2')."""
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(name):
+    """
+    Quebra um nome em tokens normalizados, descartando os sufixos de qualidade.
+    Entende tanto nomes com espaços ("GLOBO SP FHD") quanto CamelCase ("GloboNews").
+    """
+    name = strip_accents(name)
+    tokens = []
+    for part in _RE_NON_ALNUM.split(name.lower() if ' ' in name.strip() else _split_camel(name)):
+        if part and part not in QUALITY_TOKENS:
+            tokens.append(part)
+    return tokens
+
+
+def _split_camel(name):
+    """'GloboNewsHD' -> 'globo news hd'."""
+    return ' '.join(_RE_CAMEL_TOKENS.findall(name)).lower()
+
+
+def normalize_key(tokens):
+    """Chave de busca: tokens concatenados ('globo', 'news') -> 'globonews'."""
+    return ''.join(tokens)
+
+
+def trigrams(key):
+    """Conjunto de trigramas da chave, com bordas ('globo' -> {'  g', ' gl', 'glo', ...})."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def split_catalog_name(channel):
+    """'GloboNews.br' -> ('GloboNews', 'br')."""
+    match = _RE_COUNTRY_SUFFIX.search(channel)
+    if match:
+        return channel[:match.start()], match.group(1).lower()
+    return channel, None
+
+
+class LogoMatcher:
+    """Índice em memória do logos.csv para casar nomes de canais com logotipos."""
+
+    def __init__(self, rows):
+        """
+        rows: iterável de dicts com as colunas do logos.csv
+        (channel, feed, tags, width, height, format, url).
+        """
+        best = {}
+        key_tokens = {}
+        for row in rows:
+            url = (row.get('url') or '').strip()
+            channel = (row.get('channel') or '').strip()
+            if not url or not channel:
+                continue
+            base, country = split_catalog_name(channel)
+            tokens = tokenize(base)
+            key = normalize_key(tokens)
+            if not key:
+                continue
+            key_tokens.setdefault(key, tokens)
+            rank = self._rank(row, country)
+            current = best.get(key)
+            if current is None or rank < current[0]:
+                best[key] = (rank, url)
+
+        self.key_to_url = {key: url for key, (_, url) in best.items()}
+        self.keys = list(self.key_to_url)
+
+        self.token_index = {}
+        for key in self.keys:
+            self.token_index.setdefault(frozenset(key_tokens[key]), key)
+
+        self.trigram_index = {}
+        self.trigram_counts = []
+        for key_id, key in enumerate(self.keys):
+            grams = trigrams(key)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index.setdefault(gram, []).append(key_id)
+
+        self.stats = Counter()
+
+    @staticmethod
+    def _rank(row, country):
+        """Ordem de preferência entre linhas com a mesma chave (menor é melhor)."""
+        country_rank = PREFERRED_COUNTRIES.index(country) if country in PREFERRED_COUNTRIES else len(PREFERRED_COUNTRIES)
+        has_feed = 1 if (row.get('feed') or '').strip() else 0
+        try:
+            area = int(row.get('width') or 0) * int(row.get('height') or 0)
+        except ValueError:
+            area = 0
+        return (country_rank, has_feed, -area)
+
+    @classmethod
+    def from_csv(cls, csv_file_path):
+        """Monta o índice a partir do arquivo logos.csv."""
+        with open(csv_file_path, 'r', encoding='utf-8') as file:
+            return cls(csv.DictReader(file))
+
+    @classmethod
+    def from_index(cls, index):
+        """
+        Usa um índice pré-compilado (logo_index.LogoIndex) em vez de montar
+        tudo em memória: nada é lido do CSV e as buscas vão direto ao mmap.
+        """
+        matcher = cls.__new__(cls)
+        matcher.key_to_url = index.key_to_url
+        matcher.keys = index.keys
+        matcher.token_index = index.token_index
+        matcher.trigram_index = index.trigram_index
+        matcher.trigram_counts = index.trigram_counts
+        matcher.stats = Counter()
+        return matcher
+
+    def _trigram_lookup(self, key):
+        """Melhor chave do catálogo por similaridade de trigramas, ou None."""
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for key_id in self.trigram_index.get(gram, ()):
+                shared[key_id] += 1
+
+        best_id, best_score = None, MIN_TRIGRAM_SCORE
+        for key_id, count in shared.items():
+            score = 2.0 * count / (len(grams) + self.trigram_counts[key_id])
+            if score > best_score or (score == best_score and best_id is not None
+                                      and len(self.keys[key_id]) < len(self.keys[best_id])):
+                best_id, best_score = key_id, score
+        return self.keys[best_id] if best_id is not None else None
+
+    def match(self, name):
+        """
+        Casa um nome de canal. Retorna (url, método) ou (None, None).
+        Ordem: chave exata, mesmo conjunto de tokens, similaridade de trigramas
+        (erros de grafia) e, por fim, prefixo de tokens (remove sufixos
+        regionais como "SP"/"RJ").
+        """
+        tokens = tokenize(name)
+        key = normalize_key(tokens)
+        if not key:
+            return None, None
+
+        url = self.key_to_url.get(key)
+        if url:
+            return url, MATCH_EXACT
+
+        if len(tokens) > 1:
+            same_tokens = self.token_index.get(frozenset(tokens))
+            if same_tokens:
+                return self.key_to_url[same_tokens], MATCH_TOKENS
+
+        candidate = self._trigram_lookup(key)
+        if candidate:
+            return self.key_to_url[candidate], MATCH_TRIGRAM
+
+        for size in range(len(tokens) - 1, 0, -1):
+            prefix = normalize_key(tokens[:size])
+            if len(prefix) >= MIN_PREFIX_KEY_LENGTH and prefix in self.key_to_url:
+                return self.key_to_url[prefix], MATCH_PREFIX
+        return None, None
+
+    def match_all(self, names):
+        """
+        Casa todos os nomes numa única passada, memorizando por chave normalizada.
+        Retorna {nome: (url, método)} apenas para os nomes casados e atualiza `stats`.
+        """
+        memo = {}
+        matches = {}
+        for name in names:
+            key = normalize_key(tokenize(name))
+            if key not in memo:
+                memo[key] = self.match(name)
+            url, method = memo[key]
+            self.stats[method or 'sem_logo'] += 1
+            if url:
+                matches[name] = (url, method)
+        return matches
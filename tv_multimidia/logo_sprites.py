@@ -0,0 +1,251 @@
+"""
+Sprite sheets (atlas) dos logos por categoria de canais.
+
+Em vez de uma requisição de imagem por canal, o app baixa um único atlas
+WebP por categoria e recorta cada logo pelas coordenadas do mapa de offsets
+(chaveado pela URL do logo, a mesma de `logopath`).
+
+Os atlas são reconstruídos de forma incremental: cada categoria tem um
+digest calculado a partir das URLs dos logos e do hash do conteúdo de cada
+imagem no cache local. Uma categoria só é recomposta quando esse digest
+muda; o nome do arquivo inclui o digest, então ele pode ser servido com
+cache imutável.
+
+Estrutura em disco (LOGO_SPRITE_DIR):
+    manifest.json                 -> {categoria: {file, digest, offsets, ...}}
+    <slug>-<digest>.webp          -> atlas da categoria
+
+Uso:
+    python -m tv_multimidia.logo_sprites
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+try:
+    from tv_multimidia.image_cache import ImageCache, ImageFetchError
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from image_cache import ImageCache, ImageFetchError
+
+LOGO_SPRITE_DIR = os.environ.get(
+    'LOGO_SPRITE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logo_sprites')
+)
+# Cada logo é encaixado (sem distorcer) numa célula deste tamanho
+SPRITE_CELL_WIDTH = 128
+SPRITE_CELL_HEIGHT = 96
+# Espaço entre células, evita que a filtragem da GPU "vaze" o logo vizinho
+SPRITE_PADDING = 2
+SPRITE_COLUMNS = 16
+# Limite de altura do formato WebP
+SPRITE_MAX_HEIGHT = 16383
+SPRITE_QUALITY = 80
+# Muda quando o layout do atlas muda, para invalidar todos os atlas antigos
+SPRITE_LAYOUT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+
+_RE_SLUG = re.compile(r'[^0-9a-z]+')
+
+
+def category_slug(category):
+    """'CANAIS | ESPORTES' -> 'canais-esportes'."""
+    return _RE_SLUG.sub('-', category.lower()).strip('-') or 'categoria'
+
+
+def _max_logos():
+    rows = (SPRITE_MAX_HEIGHT + SPRITE_PADDING) // (SPRITE_CELL_HEIGHT + SPRITE_PADDING)
+    return rows * SPRITE_COLUMNS
+
+
+class LogoSpriteBuilder:
+    def __init__(self, sprite_dir=LOGO_SPRITE_DIR, image_cache=None):
+        self.sprite_dir = sprite_dir
+        self.image_cache = image_cache or ImageCache()
+        self.manifest_path = os.path.join(sprite_dir, MANIFEST_FILE)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.sprite_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _resolve_logos(self, urls):
+        """
+        Baixa (se preciso) cada logo e retorna [(url, hash do conteúdo)],
+        sem repetições e na ordem recebida. Logos que falham ficam de fora.
+        """
+        resolved = []
+        for url in dict.fromkeys(url for url in urls if url):
+            try:
+                resolved.append((url, self.image_cache.fetch(url)))
+            except ImageFetchError:
+                continue
+        return resolved[:_max_logos()]
+
+    @staticmethod
+    def _digest(logos):
+        """Digest do conteúdo do atlas: muda se qualquer logo (URL ou imagem) mudar."""
+        h = hashlib.sha256(f'v{SPRITE_LAYOUT_VERSION}:{SPRITE_CELL_WIDTH}x{SPRITE_CELL_HEIGHT}'.encode('ascii'))
+        for url, content_hash in sorted(logos):
+            h.update(b'\0' + url.encode('utf-8') + b'\0' + content_hash.encode('ascii'))
+        return h.hexdigest()[:16]
+
+    def _compose(self, logos, path):
+        """Monta o atlas em `path` e retorna {url: {x, y, w, h}}."""
+        # A API só lê o manifesto: o Pillow é importado só por quem monta atlas
+        from PIL import Image
+
+        rows = math.ceil(len(logos) / SPRITE_COLUMNS)
+        columns = min(len(logos), SPRITE_COLUMNS)
+        atlas = Image.new('RGBA', (
+            columns * (SPRITE_CELL_WIDTH + SPRITE_PADDING) - SPRITE_PADDING,
+            rows * (SPRITE_CELL_HEIGHT + SPRITE_PADDING) - SPRITE_PADDING,
+        ), (0, 0, 0, 0))
+
+        offsets = {}
+        slot = 0
+        for url, content_hash in logos:
+            try:
+                # A menor variante que cobre a célula, já redimensionada pelo cache
+                variant = self.image_cache.ensure_variant(
+                    content_hash, self.image_cache.snap_width(SPRITE_CELL_WIDTH))
+                with Image.open(variant) as image:
+                    logo = image.convert('RGBA')
+            except (ImageFetchError, OSError):
+                continue
+            logo.thumbnail((SPRITE_CELL_WIDTH, SPRITE_CELL_HEIGHT), Image.LANCZOS)
+
+            cell_x = (slot % SPRITE_COLUMNS) * (SPRITE_CELL_WIDTH + SPRITE_PADDING)
+            cell_y = (slot // SPRITE_COLUMNS) * (SPRITE_CELL_HEIGHT + SPRITE_PADDING)
+            # Centraliza o logo na célula
+            x = cell_x + (SPRITE_CELL_WIDTH - logo.width) // 2
+            y = cell_y + (SPRITE_CELL_HEIGHT - logo.height) // 2
+            atlas.paste(logo, (x, y))
+            offsets[url] = {'x': x, 'y': y, 'w': logo.width, 'h': logo.height}
+            slot += 1
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        atlas.save(tmp_path, format='WEBP', quality=SPRITE_QUALITY, method=4)
+        os.replace(tmp_path, path)
+        return offsets
+
+    def build(self, logos_by_category):
+        """
+        Reconstrói os atlas das categorias cujo conteúdo mudou.
+        logos_by_category: {categoria: [URLs dos logos dos canais]}.
+        Categorias ausentes do dicionário são removidas do manifesto.
+        Retorna (reconstruídas, inalteradas).
+        """
+        os.makedirs(self.sprite_dir, exist_ok=True)
+        old_manifest = self.load_manifest()
+        manifest = {}
+        rebuilt = unchanged = 0
+
+        for category, urls in logos_by_category.items():
+            logos = self._resolve_logos(urls)
+            if not logos:
+                continue
+            digest = self._digest(logos)
+            entry = old_manifest.get(category)
+            if entry and entry.get('digest') == digest and os.path.exists(os.path.join(self.sprite_dir, entry['file'])):
+                manifest[category] = entry
+                unchanged += 1
+                continue
+
+            filename = f'{category_slug(category)}-{digest}.webp'
+            offsets = self._compose(logos, os.path.join(self.sprite_dir, filename))
+            manifest[category] = {
+                'file': filename,
+                'digest': digest,
+                'cellWidth': SPRITE_CELL_WIDTH,
+                'cellHeight': SPRITE_CELL_HEIGHT,
+                'offsets': offsets,
+            }
+            rebuilt += 1
+
+        self._save_manifest(manifest)
+
+        # Remove os atlas que não são mais referenciados (depois de gravar o manifesto novo)
+        in_use = {entry['file'] for entry in manifest.values()}
+        for filename in os.listdir(self.sprite_dir):
+            if filename.endswith('.webp') and filename not in in_use:
+                os.remove(os.path.join(self.sprite_dir, filename))
+
+        print(f"Sprites de logos: {rebuilt} categorias reconstruídas, {unchanged} inalteradas.")
+        return rebuilt, unchanged
+
+
+class SpriteManifest:
+    """Leitura do manifesto pela API, recarregado apenas quando o arquivo muda."""
+
+    def __init__(self, sprite_dir=LOGO_SPRITE_DIR):
+        self.sprite_dir = sprite_dir
+        self.path = os.path.join(sprite_dir, MANIFEST_FILE)
+        self._mtime = None
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _current(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            self._data = json.load(f)
+                    except (OSError, json.JSONDecodeError):
+                        return self._data
+                    self._mtime = mtime
+        return self._data
+
+    def get(self, category):
+        """Entrada do manifesto para a categoria, ou None se ainda não houver atlas."""
+        return self._current().get(category)
+
+
+def group_logos_by_category(channels):
+    """{categoria: [logos]} a partir de dicts de canal (chaves category/logopath ou group_title/logo)."""
+    logos_by_category = {}
+    for channel in channels:
+        category = channel.get('category') or channel.get('group_title')
+        logo = channel.get('logopath') or channel.get('logo')
+        if category and logo:
+            logos_by_category.setdefault(category, []).append(logo)
+    return logos_by_category
+
+
+def main():
+    try:
+        from tv_multimidia.database import DatabaseService
+    except ImportError:  # Executado de dentro da pasta tv_multimidia/
+        from database import DatabaseService
+
+    db = DatabaseService()
+    db.connect()
+    try:
+        inicio = time.perf_counter()
+        LogoSpriteBuilder().build(group_logos_by_category(db.get_all_channels()))
+        print(f"Concluído em {time.perf_counter() - inicio:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Métricas no formato do Prometheus (prometheus_client), servidas em /metrics.
+
+    rotas       http_request_duration_seconds{route, method}
+                http_requests_total{route, method, status}
+                http_response_size_bytes{route}
+    banco       db_query_duration_seconds{query, target}   (target: primary/replica)
+                db_query_rows{query}
+                db_queries_in_progress, db_connections{role}
+    TMDB        tmdb_request_duration_seconds{endpoint}
+                tmdb_request_errors_total{endpoint, reason}
+                tmdb_throttled_total{endpoint}              (respostas 429)
+    sincronização
+                sync_phase_duration_seconds{phase}
+                sync_runs_total{result}, sync_last_success_timestamp_seconds
+
+Com vários processos (workers do gunicorn) os valores vão para arquivos em
+PROMETHEUS_MULTIPROC_DIR (o gunicorn.conf.py cria um diretório temporário) e
+o /metrics de qualquer worker soma todos. Sem o prometheus_client instalado
+ou com METRICS_ENABLED=0, tudo vira no-op.
+
+No caminho quente cada observação é um perf_counter() e uma escrita no
+filho já resolvido da métrica (os filhos por rótulo ficam num dicionário).
+"""
+
+import functools
+import os
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # Opcional: sem ele, as métricas ficam desligadas
+    prometheus_client = None
+
+METRICS_ENABLED = (prometheus_client is not None
+                   and os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no'))
+
+# Faixas dos histogramas
+REQUEST_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+ROWS_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000, 5000, 20000)
+TMDB_BUCKETS = (.05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+SYNC_BUCKETS = (.1, .5, 1, 5, 10, 30, 60, 120, 300, 600)
+
+if METRICS_ENABLED:
+    REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Latência das requisições por rota',
+                                 ['route', 'method'], buckets=REQUEST_BUCKETS)
+    REQUESTS = Counter('http_requests_total', 'Requisições por rota e status', ['route', 'method', 'status'])
+    RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Tamanho do corpo das respostas por rota',
+                              ['route'], buckets=SIZE_BUCKETS)
+
+    QUERY_DURATION = Histogram('db_query_duration_seconds', 'Duração dos comandos no banco',
+                               ['query', 'target'], buckets=QUERY_BUCKETS)
+    QUERY_ROWS = Histogram('db_query_rows', 'Linhas retornadas pelas leituras', ['query'], buckets=ROWS_BUCKETS)
+    QUERIES_IN_PROGRESS = Gauge('db_queries_in_progress', 'Comandos em execução (conexões em uso)',
+                                multiprocess_mode='livesum')
+    CONNECTIONS = Gauge('db_connections', 'Conexões abertas com o banco', ['role'],
+                        multiprocess_mode='livesum')
+
+    TMDB_DURATION = Histogram('tmdb_request_duration_seconds', 'Latência das chamadas ao TMDB',
+                              ['endpoint'], buckets=TMDB_BUCKETS)
+    TMDB_ERRORS = Counter('tmdb_request_errors_total', 'Chamadas ao TMDB com erro', ['endpoint', 'reason'])
+    TMDB_THROTTLED = Counter('tmdb_throttled_total', 'Respostas 429 (limite de requisições) do TMDB',
+                             ['endpoint'])
+
+    SYNC_PHASE_DURATION = Histogram('sync_phase_duration_seconds', 'Duração de cada fase da sincronização',
+                                    ['phase'], buckets=SYNC_BUCKETS)
+    SYNC_RUNS = Counter('sync_runs_total', 'Sincronizações com o TMDB por resultado', ['result'])
+    SYNC_LAST_SUCCESS = Gauge('sync_last_success_timestamp_seconds', 'Fim da última sincronização bem-sucedida',
+                              multiprocess_mode='max')
+
+# Filhos já resolvidos por rótulos: evita o labels() (lock + validação) a cada observação
+_children = {}
+
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def observe_request(route, method, status, seconds, size=None):
+    if not METRICS_ENABLED:
+        return
+    _child(REQUEST_DURATION, route, method).observe(seconds)
+    _child(REQUESTS, route, method, str(status)).inc()
+    if size is not None:
+        _child(RESPONSE_SIZE, route).observe(size)
+
+
+class _QueryTimer:
+    """Context manager de track_query (classe: mais barata que um @contextmanager)."""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        QUERIES_IN_PROGRESS.inc()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        QUERIES_IN_PROGRESS.dec()
+
+
+_NO_TIMER = nullcontext()
+
+
+def track_query(name, target='primary'):
+    """Mede um comando no banco: with track_query('save_movies_batch'): ..."""
+    if not METRICS_ENABLED:
+        return _NO_TIMER
+    return _QueryTimer(_child(QUERY_DURATION, name, target))
+
+
+def timed_query(name):
+    """Decorador de métodos de escrita do DatabaseService (ex: save_movies_batch)."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with track_query(name):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_rows(name, rows):
+    if METRICS_ENABLED:
+        _child(QUERY_ROWS, name).observe(len(rows))
+
+
+def connection_opened(connection, role='primary'):
+    """Conta a conexão até ela ser coletada (thread encerrada ou close())."""
+    if not METRICS_ENABLED:
+        return
+    gauge = _child(CONNECTIONS, role)
+    gauge.inc()
+    weakref.finalize(connection, gauge.dec)
+
+
+def observe_tmdb(endpoint, seconds, status=None, error=None):
+    """Chamada ao TMDB: status HTTP da resposta ou a exceção (timeout, conexão)."""
+    if not METRICS_ENABLED:
+        return
+    _child(TMDB_DURATION, endpoint).observe(seconds)
+    if status == 429:
+        _child(TMDB_THROTTLED, endpoint).inc()
+    if error is not None:
+        _child(TMDB_ERRORS, endpoint, type(error).__name__).inc()
+    elif status is not None and status != 200:
+        _child(TMDB_ERRORS, endpoint, str(status)).inc()
+
+
+@contextmanager
+def sync_phase(phase):
+    """Mede uma fase da sincronização (também quando ela falha)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if METRICS_ENABLED:
+            _child(SYNC_PHASE_DURATION, phase).observe(time.perf_counter() - started)
+
+
+def sync_finished(ok):
+    if not METRICS_ENABLED:
+        return
+    _child(SYNC_RUNS, 'success' if ok else 'error').inc()
+    if ok:
+        SYNC_LAST_SUCCESS.set(time.time())
+
+
+def render():
+    """(corpo, content-type) do /metrics; com vários processos, soma os arquivos de todos."""
+    if not METRICS_ENABLED:
+        return b'# metricas desligadas (METRICS_ENABLED=0 ou prometheus_client ausente)\n', 'text/plain'
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Worker encerrado (gunicorn child_exit): descarta os seus gauges 'live*'."""
+    if METRICS_ENABLED and 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
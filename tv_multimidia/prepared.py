@@ -0,0 +1,212 @@
+"""
+Registro de comandos preparados (PREPARE/EXECUTE) das consultas quentes.
+
+Cada consulta é registrada uma vez, com os placeholders do psycopg2 (%s ou
+%(nome)s), e preparada no servidor (PREPARE) na primeira execução em cada
+conexão — primário ou réplica. As execuções seguintes mandam só
+"EXECUTE nome (parâmetros)": o PostgreSQL pula a análise e o planejamento
+(depois de algumas execuções ele passa a reusar um plano genérico).
+
+A conexão de uma réplica é compartilhada entre as threads: o PREPARE de cada
+conexão é feito sob um lock dela (só na primeira execução; as seguintes não
+passam pelo lock).
+
+O resultado vem como tuplas (cursor comum, sem RealDictCursor) embrulhadas
+em Row: um objeto leve com acesso por nome (row['title'], row.get('x'),
+dict(row)) que não cria um dicionário por linha.
+"""
+
+import re
+import threading
+import weakref
+
+import psycopg2
+
+_RE_PLACEHOLDER = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+class Row:
+    """Linha de resultado: tupla de valores + índice de colunas compartilhado pela classe."""
+
+    __slots__ = ('_values',)
+    _columns = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        # Ex: imageurls montado por requisição na API (só colunas existentes)
+        if not isinstance(self._values, list):
+            self._values = list(self._values)
+        self._values[self._index[key]] = value
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return self._asdict() == other._asdict()
+        return self._asdict() == other
+
+    def __repr__(self):
+        return f"Row({self._asdict()!r})"
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
+
+    def keys(self):
+        return self._columns
+
+    def values(self):
+        return tuple(self._values)
+
+    def items(self):
+        return zip(self._columns, self._values)
+
+    def _asdict(self):
+        return dict(zip(self._columns, self._values))
+
+
+def row_class(columns):
+    """Subclasse de Row para um conjunto de colunas."""
+    columns = tuple(columns)
+    return type('Row', (Row,), {
+        '__slots__': (),
+        '_columns': columns,
+        '_index': {name: i for i, name in enumerate(columns)},
+    })
+
+
+def to_server_placeholders(sql):
+    """
+    '%s'/'%(nome)s' -> '$1', '$2'... (o mesmo nome reusa o mesmo número).
+    Retorna (sql, nomes, quantidade) — nomes é None para placeholders posicionais.
+    """
+    names = []
+    positional = [0]
+
+    def replace(match):
+        if match.group(0) == '%%':
+            return '%'
+        if match.group(1) is None:
+            positional[0] += 1
+            return f'${positional[0]}'
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f'${names.index(name) + 1}'
+
+    converted = _RE_PLACEHOLDER.sub(replace, sql)
+    if positional[0] and names:
+        raise ValueError('Não misture %s e %(nome)s no mesmo comando preparado')
+    return converted, (names if names else None), positional[0] or len(names)
+
+
+class PreparedStatements:
+    """Comandos registrados por nome; prepara sob demanda em cada conexão."""
+
+    def __init__(self):
+        self._statements = {}
+        # conexão -> nomes já preparados nela (some junto com a conexão)
+        self._prepared = weakref.WeakKeyDictionary()
+        # conexão -> lock do PREPARE nela; _registry_lock protege os dois dicionários
+        self._locks = weakref.WeakKeyDictionary()
+        self._registry_lock = threading.Lock()
+        self._row_classes = {}
+
+    def register(self, name, sql):
+        server_sql, names, count = to_server_placeholders(sql)
+        self._statements[name] = (sql, server_sql, names, count)
+        return name
+
+    def __contains__(self, name):
+        return name in self._statements
+
+    def sql(self, name):
+        """SQL original (placeholders do psycopg2), para executar sem preparar."""
+        return self._statements[name][0]
+
+    def _args(self, name, params):
+        _, _, names, count = self._statements[name]
+        if names is not None:
+            return tuple(params[n] for n in names)
+        params = tuple(params or ())
+        if len(params) != count:
+            raise ValueError(f"{name}: esperava {count} parâmetros, recebeu {len(params)}")
+        return params
+
+    def _connection_state(self, connection):
+        """(nomes preparados, lock do PREPARE) da conexão."""
+        with self._registry_lock:
+            lock = self._locks.get(connection)
+            if lock is None:
+                lock = self._locks[connection] = threading.Lock()
+            return self._prepared.setdefault(connection, set()), lock
+
+    def _prepare(self, cursor, connection, name, replace=False):
+        """
+        PREPARE do comando na conexão, uma vez só mesmo com várias threads nela.
+        replace=True descarta antes a versão preparada (ver execute).
+        """
+        prepared, lock = self._connection_state(connection)
+        with lock:
+            if replace:
+                cursor.execute(f'DEALLOCATE {name}')
+                prepared.discard(name)
+            elif name in prepared:
+                return  # Outra thread preparou enquanto esta esperava o lock
+            try:
+                cursor.execute(f'PREPARE {name} AS {self._statements[name][1]}')
+            except psycopg2.errors.DuplicatePreparedStatement:
+                # Já existe na sessão (preparado por fora deste registro): só desfaz a
+                # transação abortada, se houver; as escritas já fizeram commit
+                if not connection.autocommit:
+                    connection.rollback()
+            prepared.add(name)
+
+    def _rows(self, cursor):
+        if cursor.description is None:
+            return []
+        columns = tuple(column.name for column in cursor.description)
+        cls = self._row_classes.get(columns)
+        if cls is None:
+            cls = self._row_classes[columns] = row_class(columns)
+        return [cls(values) for values in cursor.fetchall()]
+
+    def execute(self, connection, name, params=None):
+        """Executa o comando `name` na conexão (preparando se preciso); retorna [Row]."""
+        args = self._args(name, params)
+        execute_sql = f'EXECUTE {name}'
+        if args:
+            execute_sql += ' (' + ', '.join(['%s'] * len(args)) + ')'
+
+        with connection.cursor() as cursor:
+            if name not in self._prepared.get(connection, ()):
+                self._prepare(cursor, connection, name)
+            try:
+                cursor.execute(execute_sql, args)
+            except psycopg2.errors.FeatureNotSupported:
+                # "cached plan must not change result type": a tabela ganhou colunas
+                # (ex: create_tables de outro processo); prepara de novo. As escritas
+                # do DatabaseService já fizeram commit, só há leitura a desfazer.
+                connection.rollback()
+                self._prepare(cursor, connection, name, replace=True)
+                cursor.execute(execute_sql, args)
+            return self._rows(cursor)
+
+    def forget(self, connection):
+        """Esquece os comandos de uma conexão (ex: após DISCARD ALL)."""
+        self._prepared.pop(connection, None)
@@ -0,0 +1,191 @@
+"""
+Poda dos títulos que saíram do catálogo.
+
+Cada sincronização carimba os filmes e séries que recebe com a geração atual
+(lastSeenGeneration). Títulos que não aparecem em nenhuma lista há
+PRUNE_KEEP_GENERATIONS gerações são apagados (ou movidos para
+<tabela>_archive com --archive) em lotes, cada lote na sua transação, para
+não segurar locks nem gerar uma transação gigante. As temporadas e os
+episódios saem junto com a série.
+
+O espaço informado é a soma de pg_column_size das linhas removidas; ele
+volta a ser usado pela tabela depois do VACUUM (--vacuum roda em seguida).
+
+Uso:
+    python -m tv_multimidia.prune_catalog [--keep-generations 7] [--batch-size 500]
+                                          [--archive] [--dry-run] [--vacuum]
+"""
+
+import argparse
+import os
+import time
+
+try:
+    from tv_multimidia.database import DatabaseService
+    from tv_multimidia.catalog_events import SCOPE_MOVIES, SCOPE_SERIES, publish_catalog_change
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import DatabaseService
+    from catalog_events import SCOPE_MOVIES, SCOPE_SERIES, publish_catalog_change
+
+# Uma geração por sincronização (diária): 7 = uma semana fora de todas as listas
+PRUNE_KEEP_GENERATIONS = int(os.environ.get('PRUNE_KEEP_GENERATIONS', 7))
+PRUNE_BATCH_SIZE = int(os.environ.get('PRUNE_BATCH_SIZE', 500))
+
+# Tabela podada -> (escopo da notificação, [(tabela dependente, coluna da FK)] apagadas antes)
+PRUNE_TABLES = {
+    'movies': (SCOPE_MOVIES, []),
+    'tv_series': (SCOPE_SERIES, [('episodes', 'seriesId'), ('seasons', 'seriesId')]),
+}
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def current_generation(db):
+    """Última geração alocada (0 se nenhuma sincronização gravou listas ainda)."""
+    db.cursor.execute('SELECT CASE WHEN is_called THEN last_value ELSE 0 END AS generation FROM sync_generation_seq')
+    return db.cursor.fetchone()['generation']
+
+
+def stale_ids(db, table, cutoff):
+    """IDs não vistos desde antes da geração `cutoff` (uma única leitura da tabela)."""
+    db.cursor.execute(f'SELECT id FROM {table} WHERE lastSeenGeneration < %s ORDER BY id', (cutoff,))
+    return [row['id'] for row in db.cursor.fetchall()]
+
+
+def ensure_archive_table(db, table):
+    # Sem INCLUDING: o arquivo não tem chave primária, defaults nem colunas geradas
+    db.cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table}_archive (
+            LIKE {table},
+            archivedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def remove_rows(db, table, column, ids, archive):
+    """Apaga (ou arquiva) as linhas com `column` em ids; retorna (linhas, bytes)."""
+    archived = ''
+    if archive:
+        archived = f', archived AS (INSERT INTO {table}_archive SELECT moved.*, CURRENT_TIMESTAMP FROM moved)'
+    db.cursor.execute(f'''
+        WITH moved AS (DELETE FROM {table} WHERE {column} = ANY(%s) RETURNING *){archived}
+        SELECT count(*) AS rows, COALESCE(sum(pg_column_size(moved.*)), 0) AS bytes FROM moved
+    ''', (ids,))
+    result = db.cursor.fetchone()
+    return result['rows'], int(result['bytes'])
+
+
+def measure_rows(db, table, column, ids):
+    """Como remove_rows, sem apagar nada (--dry-run)."""
+    db.cursor.execute(f'''
+        SELECT count(*) AS rows, COALESCE(sum(pg_column_size(t.*)), 0) AS bytes
+        FROM {table} t WHERE {column} = ANY(%s)
+    ''', (ids,))
+    result = db.cursor.fetchone()
+    return result['rows'], int(result['bytes'])
+
+
+def prune_table(db, table, cutoff, batch_size=PRUNE_BATCH_SIZE, archive=False, dry_run=False):
+    """Poda uma tabela em lotes. Retorna {tabela: [linhas, bytes]} incluindo as dependentes."""
+    scope, dependents = PRUNE_TABLES[table]
+    totals = {name: [0, 0] for name, _ in dependents + [(table, None)]}
+    ids = stale_ids(db, table, cutoff)
+    if not ids:
+        return totals
+
+    if archive and not dry_run:
+        for name, _ in dependents + [(table, None)]:
+            ensure_archive_table(db, name)
+        db.commit()
+
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        try:
+            # Dependentes primeiro (FKs episodes -> seasons -> tv_series)
+            for name, column in dependents + [(table, 'id')]:
+                if dry_run:
+                    rows, size = measure_rows(db, name, column, batch)
+                else:
+                    rows, size = remove_rows(db, name, column, batch, archive)
+                totals[name][0] += rows
+                totals[name][1] += size
+            if dry_run:
+                db.connection.rollback()
+            else:
+                publish_catalog_change(db.cursor, scope, batch)
+                db.commit()
+        except Exception:
+            db.connection.rollback()
+            raise
+        print(f"  {table}: {min(start + batch_size, len(ids))}/{len(ids)} títulos processados")
+    return totals
+
+
+def vacuum(db, tables):
+    """
+    VACUUM (ANALYZE) fora de transação: libera o espaço das linhas removidas
+    para reúso e atualiza as estatísticas. Retorna {tabela: tamanho total}.
+    """
+    sizes = {}
+    db.connection.rollback()
+    db.connection.autocommit = True
+    try:
+        for table in tables:
+            db.cursor.execute(f'VACUUM (ANALYZE) {table}')
+            db.cursor.execute('SELECT pg_total_relation_size(%s) AS size', (table,))
+            sizes[table] = db.cursor.fetchone()['size']
+    finally:
+        db.connection.autocommit = False
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove títulos que saíram de todas as listas do TMDB.')
+    parser.add_argument('--keep-generations', type=int, default=PRUNE_KEEP_GENERATIONS,
+                        help='gerações sem aparecer antes de podar (padrão: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE)
+    parser.add_argument('--archive', action='store_true', help='move para <tabela>_archive em vez de apagar')
+    parser.add_argument('--dry-run', action='store_true', help='só informa o que seria removido')
+    parser.add_argument('--vacuum', action='store_true', help='roda VACUUM (ANALYZE) nas tabelas podadas')
+    args = parser.parse_args()
+
+    db = DatabaseService(read_dsns=[])
+    db.connect()
+    try:
+        generation = current_generation(db)
+        cutoff = generation - args.keep_generations + 1
+        if cutoff <= 0:
+            print(f"Geração atual {generation}: menos de {args.keep_generations} gerações, nada a podar.")
+            return
+        acao = 'Simulando poda' if args.dry_run else ('Arquivando' if args.archive else 'Podando')
+        print(f"{acao} títulos não vistos desde a geração {cutoff} (atual: {generation})...")
+
+        inicio = time.perf_counter()
+        totals = {}
+        for table in PRUNE_TABLES:
+            totals.update(prune_table(db, table, cutoff, args.batch_size, args.archive, args.dry_run))
+
+        print("\n--- Resumo da Poda ---")
+        for table, (rows, size) in totals.items():
+            print(f"{table:<12} {rows:>8} linhas  {format_bytes(size):>10}")
+        total_rows = sum(rows for rows, _ in totals.values())
+        total_size = sum(size for _, size in totals.values())
+        verbo = 'seriam liberados' if args.dry_run else 'liberados'
+        print(f"Total: {total_rows} linhas, {format_bytes(total_size)} {verbo} "
+              f"em {time.perf_counter() - inicio:.1f}s")
+
+        if args.vacuum and not args.dry_run and total_rows:
+            for table, size in vacuum(db, list(totals)).items():
+                print(f"VACUUM (ANALYZE) {table}: {format_bytes(size)} (tabela + índices)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
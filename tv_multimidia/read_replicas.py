@@ -0,0 +1,202 @@
+"""
+Réplicas de leitura do PostgreSQL para o DatabaseService.
+
+As leituras pesadas (listagens, categorias, detalhes de séries) podem ir
+para uma ou mais réplicas, escolhidas em rodízio (round-robin) entre as
+saudáveis. Cada réplica é verificada periodicamente, numa thread em
+segundo plano (uma réplica que não responde nunca segura as leituras): fora
+do ar ou com atraso de replicação acima de DB_REPLICA_MAX_LAG ela sai do
+rodízio até a próxima verificação. Sem réplica disponível, a leitura vai
+para o primário.
+
+Configuração (variáveis de ambiente):
+    DB_READ_DSNS                 DSNs das réplicas separados por ';'
+                                 (ex: "host=replica1 port=5432 dbname=tv_multimidia user=... password=...")
+    DB_REPLICA_HEALTH_INTERVAL   segundos entre verificações de cada réplica
+    DB_REPLICA_MAX_LAG           atraso máximo (s) aceito de uma réplica
+    DB_REPLICA_CONNECT_TIMEOUT   segundos para conectar a uma réplica
+    DB_READ_YOUR_WRITES_SECONDS  após uma escrita, as leituras deste processo
+                                 ficam no primário por este tempo (0 = desligado)
+"""
+
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extras
+
+try:
+    from tv_multimidia import metrics
+    from tv_multimidia.slow_queries import connection_factory
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    import metrics
+    from slow_queries import connection_factory
+
+DB_READ_DSNS = [dsn.strip() for dsn in os.environ.get('DB_READ_DSNS', '').split(';') if dsn.strip()]
+REPLICA_HEALTH_INTERVAL = float(os.environ.get('DB_REPLICA_HEALTH_INTERVAL', 10))
+REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 30))
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 3))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 2))
+
+# Atraso de replicação em segundos; 0 se a réplica já aplicou tudo o que recebeu
+# (pg_last_xact_replay_timestamp sozinho "envelhece" com o primário ocioso).
+# Um servidor que não está em recuperação (ex: cópia independente em testes) conta como em dia.
+REPLICA_LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+'''
+
+
+class Replica:
+    def __init__(self, dsn):
+        self.dsn = dsn
+        # Compartilhada pelas threads de leitura (cada uma com o seu cursor)
+        self.connection = None
+        self.healthy = False
+        self.checked_at = 0
+        self.checking = False
+        self.lag = None
+
+    @property
+    def name(self):
+        """host:port para as mensagens (sem a senha do DSN)."""
+        params = psycopg2.extensions.parse_dsn(self.dsn)
+        return f"{params.get('host', 'localhost')}:{params.get('port', 5432)}"
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except psycopg2.Error:
+                pass
+        self.connection = None
+
+
+class ReplicaSet:
+    """Rodízio entre as réplicas saudáveis, com verificação periódica de cada uma."""
+
+    def __init__(self, dsns=None, health_interval=REPLICA_HEALTH_INTERVAL, max_lag=REPLICA_MAX_LAG,
+                 connect_timeout=REPLICA_CONNECT_TIMEOUT):
+        self.replicas = [Replica(dsn) for dsn in (DB_READ_DSNS if dsns is None else dsns)]
+        self.health_interval = health_interval
+        self.max_lag = max_lag
+        self.connect_timeout = connect_timeout
+        self._next = 0
+        # Protege só o estado das réplicas (rodízio, saúde, conexão atual); nunca é
+        # mantido durante I/O
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def connect(self):
+        for replica in self.replicas:
+            self.check(replica)
+        healthy = sum(replica.healthy for replica in self.replicas)
+        if self.replicas:
+            print(f"Réplicas de leitura: {healthy}/{len(self.replicas)} disponíveis")
+
+    def _open(self, replica):
+        connection = psycopg2.connect(replica.dsn, connect_timeout=self.connect_timeout,
+                                      connection_factory=connection_factory())
+        connection.set_client_encoding('UTF8')
+        metrics.connection_opened(connection, 'replica')
+        # Só leituras: sem transação aberta segurando snapshot (e conflitos de recuperação) na réplica
+        connection.autocommit = True
+        return connection
+
+    def check(self, replica):
+        """
+        (Re)conecta se preciso e mede o atraso; atualiza replica.healthy.
+        A conexão e a consulta acontecem fora do lock; só a troca do estado é feita nele.
+        """
+        connection = replica.connection
+        opened = None
+        try:
+            if connection is None or connection.closed:
+                connection = opened = self._open(replica)
+            with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute(REPLICA_LAG_QUERY)
+                lag = float(cursor.fetchone()['lag'])
+        except psycopg2.Error as e:
+            if opened is not None:
+                opened.close()
+            with self._lock:
+                was_healthy = replica.healthy
+                # A conexão com falha só é desligada da réplica (quem ainda a usa
+                # recebe o erro e cai no primário); o coletor fecha quando ninguém mais a usar
+                if replica.connection is connection:
+                    replica.connection = None
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+            if was_healthy:
+                print(f"Réplica {replica.name} indisponível: {e}")
+            return False
+
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.connection = connection
+            replica.lag = lag
+            replica.healthy = lag <= self.max_lag
+            replica.checked_at = time.monotonic()
+        if not replica.healthy:
+            print(f"Réplica {replica.name} fora do rodízio: atraso de {lag:.1f}s")
+        elif not was_healthy:
+            print(f"Réplica {replica.name} disponível (atraso {lag:.1f}s)")
+        return replica.healthy
+
+    def _check_in_background(self, replica):
+        try:
+            self.check(replica)
+        finally:
+            with self._lock:
+                replica.checking = False
+
+    def acquire(self):
+        """
+        (réplica, conexão) da próxima réplica saudável, ou None. As réplicas que
+        venceram o intervalo são verificadas em segundo plano; a leitura não espera.
+        """
+        due = []
+        chosen = None
+        with self._lock:
+            now = time.monotonic()
+            count = len(self.replicas)
+            for _ in range(count):
+                replica = self.replicas[self._next % count]
+                self._next += 1
+                if not replica.checking and now - replica.checked_at >= self.health_interval:
+                    replica.checking = True
+                    due.append(replica)
+                if replica.healthy and replica.connection is not None:
+                    chosen = (replica, replica.connection)
+                    break
+        for replica in due:
+            threading.Thread(target=self._check_in_background, args=(replica,),
+                             name='replica-health-check', daemon=True).start()
+        return chosen
+
+    def mark_failed(self, replica, error, connection=None):
+        """
+        Tira a réplica do rodízio até a próxima verificação. A conexão que
+        falhou é só desligada da réplica, não fechada: outras threads podem
+        estar no meio de uma leitura nela.
+        """
+        print(f"Leitura na réplica {replica.name} falhou ({error}); usando o primário.")
+        with self._lock:
+            if connection is None or replica.connection is connection:
+                replica.connection = None
+            replica.healthy = False
+            replica.checked_at = time.monotonic()
+
+    def status(self):
+        return [{'replica': replica.name, 'healthy': replica.healthy, 'lag': replica.lag}
+                for replica in self.replicas]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
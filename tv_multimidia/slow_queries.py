@@ -0,0 +1,270 @@
+"""
+Log de consultas lentas do DatabaseService, com EXPLAIN automático por amostragem.
+
+As conexões do DatabaseService (e das réplicas) são abertas com
+connection_factory=TimedConnection: todo cursor.execute() é cronometrado.
+Acima de SLOW_QUERY_MS o comando vai para o log com:
+
+    - quem chamou: o método do DatabaseService e o código fora dele
+      (ex: "get_trending_movies <- api_server.py:212 get_trending_movies");
+    - o SQL com os textos literais trocados por '?' e os parâmetros só pelos
+      tipos (nunca os valores: emails, hashes de senha, tokens).
+
+Uma fração (SLOW_QUERY_EXPLAIN_RATE) das leituras lentas é repetida com
+EXPLAIN (ANALYZE, BUFFERS) numa thread em segundo plano, com conexão
+própria, transação READ ONLY e statement_timeout — a requisição não espera
+e nada é gravado. Os planos mais recentes ficam num buffer circular
+(SLOW_QUERY_PLANS) servido pelo /api/admin/slow-queries; cada processo
+(worker) tem o seu.
+
+Configuração (variáveis de ambiente):
+    SLOW_QUERY_MS                   limite em ms (0 desliga a medição)
+    SLOW_QUERY_EXPLAIN_RATE         fração das leituras lentas com EXPLAIN (0 a 1)
+    SLOW_QUERY_EXPLAIN_COOLDOWN     segundos até o mesmo SQL ganhar outro EXPLAIN
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS   statement_timeout do EXPLAIN ANALYZE
+    SLOW_QUERY_PLANS                planos guardados (e também consultas lentas recentes)
+"""
+
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 250))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_EXPLAIN_COOLDOWN = float(os.environ.get('SLOW_QUERY_EXPLAIN_COOLDOWN', 60))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', 10000))
+SLOW_QUERY_PLANS = int(os.environ.get('SLOW_QUERY_PLANS', 50))
+# Tamanho máximo do SQL no log (os lotes do execute_values chegam a megabytes)
+SQL_LOG_LIMIT = 500
+
+_RE_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_PREPARE = re.compile(r'^PREPARE (\w+) AS (.*)$', re.S)
+_RE_EXECUTE = re.compile(r'^EXECUTE (\w+)')
+_READ_PREFIXES = ('select', 'with')
+
+# Pulados ao procurar quem chamou: a própria camada de acesso ao banco, a
+# biblioteca padrão e os pacotes instalados (psycopg2, flask...)
+_DB_FILES = ('database.py', 'prepared.py', 'read_replicas.py', 'metrics.py', 'slow_queries.py')
+_SKIPPED_PATHS = (os.path.dirname(os.__file__),)
+
+
+def redact_sql(sql):
+    """SQL de uma linha, sem os textos literais ('...' -> '?') e truncado."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _RE_WHITESPACE.sub(' ', _RE_STRING_LITERAL.sub("'?'", str(sql))).strip()
+    return sql if len(sql) <= SQL_LOG_LIMIT else sql[:SQL_LOG_LIMIT] + '...'
+
+
+def redact_params(params):
+    """Só os tipos dos parâmetros: (int, str) ou {email: str}."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def find_caller():
+    """
+    (método do DatabaseService, 'arquivo:linha função' fora da camada do banco)
+    da consulta em execução; o método é o mais externo (ex: get_trending_movies,
+    não get_ranked_list nem _read_prepared).
+    """
+    method = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        if filename == 'database.py' and not code.co_name.startswith('_'):
+            method = code.co_name
+        elif filename not in _DB_FILES and not code.co_filename.startswith(_SKIPPED_PATHS):
+            return method, f'{filename}:{frame.f_lineno} {code.co_name}'
+        frame = frame.f_back
+    return method, None
+
+
+class SlowQueryLog:
+    """Consultas lentas recentes, fila de EXPLAIN e buffer circular dos planos."""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, explain_rate=SLOW_QUERY_EXPLAIN_RATE,
+                 max_plans=SLOW_QUERY_PLANS):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.recent = deque(maxlen=max_plans)
+        self.plans = deque(maxlen=max_plans)
+        self._lock = threading.Lock()
+        # SQL -> quando ganhou o último EXPLAIN (evita repetir a mesma consulta em rajada)
+        self._explained_at = {}
+        self._jobs = queue.Queue(maxsize=16)
+        self._thread = None
+        # DSN -> conexão própria do EXPLAIN (primário e cada réplica)
+        self._connections = {}
+
+    def record(self, connection, query, params, elapsed):
+        """Chamado pelo cursor quando um comando passa do limite."""
+        method, caller = find_caller()
+        sql = redact_sql(query)
+        entry = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'elapsedMs': round(elapsed * 1000, 1),
+            'method': method,
+            'caller': caller,
+            'query': sql,
+            'params': redact_params(params),
+        }
+        print(f"Consulta lenta ({entry['elapsedMs']:.0f} ms) em {method or '?'} <- {caller or '?'}: "
+              f"{sql} | parâmetros: {entry['params']}")
+        with self._lock:
+            self.recent.append(entry)
+        self._maybe_explain(connection, query, params, entry)
+
+    def _maybe_explain(self, connection, query, params, entry):
+        if not isinstance(query, str) or random.random() >= self.explain_rate:
+            return
+        prepare = None
+        execute = _RE_EXECUTE.match(query)
+        if execute:
+            # Comando preparado: o EXPLAIN precisa do PREPARE na conexão dele
+            prepare_sql = getattr(connection, 'prepared_sql', {}).get(execute.group(1))
+            if prepare_sql is None:
+                return
+            prepare = (execute.group(1), prepare_sql)
+            statement = prepare_sql
+        else:
+            statement = query
+        # Só leituras: EXPLAIN ANALYZE executa o comando de verdade
+        if not statement.lstrip().lower().startswith(_READ_PREFIXES):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(statement, -SLOW_QUERY_EXPLAIN_COOLDOWN) < SLOW_QUERY_EXPLAIN_COOLDOWN:
+                return
+            if len(self._explained_at) >= 1000:
+                self._explained_at.clear()
+            self._explained_at[statement] = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-query-explain', daemon=True)
+                self._thread.start()
+        try:
+            self._jobs.put_nowait((connection.explain_dsn, query, params, prepare, entry))
+        except queue.Full:
+            pass  # Rajada de consultas lentas: as próximas amostras pegam os planos
+
+    def _run(self):
+        while True:
+            dsn, query, params, prepare, entry = self._jobs.get()
+            try:
+                plan = self._explain(dsn, query, params, prepare)
+            except psycopg2.Error as e:
+                plan = f'EXPLAIN falhou: {redact_sql(str(e).strip())}'
+                stale = self._connections.pop(dsn, None)
+                if stale is not None and not stale.closed:
+                    stale.close()
+            with self._lock:
+                self.plans.append({**entry, 'plan': plan})
+
+    def _explain(self, dsn, query, params, prepare):
+        connection = self._connections.get(dsn)
+        if connection is None or connection.closed:
+            # Conexão comum (não cronometrada): o EXPLAIN não entra no próprio log
+            connection = self._connections[dsn] = psycopg2.connect(dsn)
+            connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute('BEGIN READ ONLY')
+            try:
+                cursor.execute('SET LOCAL statement_timeout = %s', (SLOW_QUERY_EXPLAIN_TIMEOUT_MS,))
+                if prepare is not None:
+                    cursor.execute(f'PREPARE {prepare[0]} AS {prepare[1]}')
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {query}', params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute('ROLLBACK')
+                if prepare is not None:
+                    cursor.execute('DEALLOCATE ALL')
+        # Os valores comparados aparecem no plano ("email = 'x'::text")
+        return _RE_STRING_LITERAL.sub("'?'", plan)
+
+    def snapshot(self):
+        """Estado para o endpoint de admin: configuração, lentas recentes e planos (mais novos primeiro)."""
+        with self._lock:
+            return {
+                'thresholdMs': self.threshold * 1000,
+                'explainRate': self.explain_rate,
+                'recent': list(reversed(self.recent)),
+                'plans': list(reversed(self.plans)),
+            }
+
+
+slow_log = SlowQueryLog()
+
+
+class _TimedCursorMixin:
+    """execute()/executemany() cronometrados; acima do limite, vão para o slow_log."""
+
+    def execute(self, query, vars=None):
+        if query.__class__ is str and query.startswith('PREPARE '):
+            match = _RE_PREPARE.match(query)
+            if match:
+                self.connection.prepared_sql[match.group(1)] = match.group(2)
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        elapsed = time.perf_counter() - started
+        if elapsed >= slow_log.threshold:
+            slow_log.record(self.connection, query, vars, elapsed)
+        return result
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        result = super().executemany(query, vars_list)
+        elapsed = time.perf_counter() - started
+        if elapsed >= slow_log.threshold:
+            slow_log.record(self.connection, query, None, elapsed)
+        return result
+
+
+class TimedCursor(_TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class TimedRealDictCursor(_TimedCursorMixin, psycopg2.extras.RealDictCursor):
+    pass
+
+
+_TIMED_CURSORS = {
+    None: TimedCursor,
+    psycopg2.extensions.cursor: TimedCursor,
+    psycopg2.extras.RealDictCursor: TimedRealDictCursor,
+}
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Conexão cujos cursores (comuns ou RealDictCursor) são cronometrados."""
+
+    def __init__(self, dsn, *args, **kwargs):
+        super().__init__(dsn, *args, **kwargs)
+        # O EXPLAIN abre a sua conexão com o mesmo DSN (com a senha, que .dsn esconde)
+        self.explain_dsn = dsn
+        # Nome -> SQL dos comandos preparados nesta conexão (para o EXPLAIN de um EXECUTE)
+        self.prepared_sql = {}
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory
+        kwargs['cursor_factory'] = _TIMED_CURSORS.get(factory, factory)
+        return super().cursor(*args, **kwargs)
+
+
+def connection_factory():
+    """connection_factory para psycopg2.connect (None com SLOW_QUERY_MS=0: sem medição)."""
+    return TimedConnection if slow_log.threshold > 0 else None
@@ -0,0 +1,117 @@
+"""
+Verificador de saúde dos streams dos canais.
+
+Testa milhares de URLs de stream em paralelo (asyncio + aiohttp), com limite
+de conexões global e por host e timeouts de conexão/leitura, e grava o
+status e a latência de cada stream na tabela channel_health.
+
+Uso:
+    python -m tv_multimidia.stream_prober
+"""
+
+import asyncio
+import os
+import time
+
+import aiohttp
+
+try:
+    from tv_multimidia.database import DatabaseService
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from database import DatabaseService
+
+# Conexões simultâneas no total e por host (provedores IPTV costumam
+# bloquear contas que abrem muitas conexões ao mesmo tempo)
+PROBE_CONCURRENCY = int(os.environ.get('STREAM_PROBE_CONCURRENCY', 200))
+PROBE_PER_HOST = int(os.environ.get('STREAM_PROBE_PER_HOST', 4))
+# Timeout (s) para conectar e para receber o primeiro bloco de dados
+PROBE_TIMEOUT = float(os.environ.get('STREAM_PROBE_TIMEOUT', 8))
+PROBE_USER_AGENT = 'VLC/3.0.18 LibVLC/3.0.18'
+
+STATUS_ONLINE = 'online'
+STATUS_OFFLINE = 'offline'
+STATUS_TIMEOUT = 'timeout'
+STATUS_ERROR = 'error'
+
+
+async def probe_stream(session, url):
+    """
+    Abre o stream e lê apenas o primeiro bloco de dados.
+    Retorna (status, http_status, latency_ms); a latência é o tempo até o primeiro byte.
+    """
+    inicio = time.perf_counter()
+    try:
+        async with session.get(url, allow_redirects=True) as response:
+            if response.status >= 400:
+                return STATUS_OFFLINE, response.status, None
+            primeiro_bloco = await response.content.readany()
+            latency_ms = int((time.perf_counter() - inicio) * 1000)
+            status = STATUS_ONLINE if primeiro_bloco else STATUS_OFFLINE
+            return status, response.status, latency_ms
+    except asyncio.TimeoutError:
+        return STATUS_TIMEOUT, None, None
+    except (aiohttp.ClientError, OSError, ValueError):
+        return STATUS_ERROR, None, None
+
+
+async def probe_streams(urls, concurrency=PROBE_CONCURRENCY, per_host=PROBE_PER_HOST, timeout=PROBE_TIMEOUT):
+    """
+    Verifica todas as URLs em paralelo.
+    Retorna {url: (status, http_status, latency_ms)}.
+    """
+    urls = list(dict.fromkeys(urls))  # Remove duplicadas mantendo a ordem
+    if not urls:
+        return {}
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    # Sem timeout 'total': a espera na fila do limite por host não conta como falha do stream
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={'User-Agent': PROBE_USER_AGENT}) as session:
+        results = await asyncio.gather(*(probe_stream(session, url) for url in urls))
+    return dict(zip(urls, results))
+
+
+def print_summary(results, elapsed):
+    """Imprime o resumo da verificação."""
+    counts = {}
+    latencies = []
+    for status, _, latency_ms in results.values():
+        counts[status] = counts.get(status, 0) + 1
+        if latency_ms is not None:
+            latencies.append(latency_ms)
+    latencies.sort()
+
+    print("\n--- Resumo da Verificação de Streams ---")
+    print(f"Streams verificados: {len(results)} em {elapsed:.1f}s")
+    for status in (STATUS_ONLINE, STATUS_OFFLINE, STATUS_TIMEOUT, STATUS_ERROR):
+        print(f"{status}: {counts.get(status, 0)}")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Latência até o primeiro byte: p50={latencies[len(latencies) // 2]}ms p95={p95}ms")
+
+
+def main():
+    db = DatabaseService()
+    db.connect()
+    try:
+        db.create_tables()
+        urls = db.get_stream_urls()
+        print(f"Verificando {len(urls)} streams "
+              f"(máx. {PROBE_CONCURRENCY} conexões, {PROBE_PER_HOST} por host, timeout {PROBE_TIMEOUT}s)...")
+
+        inicio = time.perf_counter()
+        results = asyncio.run(probe_streams(urls))
+        print_summary(results, time.perf_counter() - inicio)
+
+        if results:
+            db.save_channel_health_batch([
+                (url, status, http_status, latency_ms)
+                for url, (status, http_status, latency_ms) in results.items()
+            ])
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+URLs de imagens do TMDB geradas por requisição, no tamanho que o cliente pede.
+
+O banco guarda apenas os caminhos crus do TMDB ("/abc123.jpg"); a URL final
+(base + tamanho + caminho) é montada na resposta da API a partir do
+parâmetro ?size= (ex: w185 no celular, w342 na TV). Os tamanhos válidos de
+cada tipo de imagem vêm do endpoint /configuration do TMDB, guardado no
+cache compartilhado (cache_store) com validade TMDB_CONFIG_TTL e em memória
+no processo.
+
+A chamada ao TMDB nunca acontece na requisição: quando a configuração vence
+(ou ainda não existe), ela é recarregada numa thread em segundo plano e as
+requisições seguem com a configuração anterior (ou a padrão) até lá.
+"""
+
+import os
+import re
+import threading
+import time
+
+TMDB_CONFIG_CACHE_KEY = 'tmdb_configuration'
+# O TMDB recomenda reconsultar /configuration a cada poucos dias
+TMDB_CONFIG_TTL = int(os.environ.get('TMDB_CONFIG_TTL', 3 * 24 * 60 * 60))
+# Sem configuração real (TMDB fora), tenta de novo depois deste tempo (segundos)
+TMDB_CONFIG_RETRY = 300
+# Tamanho usado quando o cliente não pede nenhum (o mesmo de antes)
+DEFAULT_IMAGE_SIZE = 'w500'
+
+# Usado se o /configuration ainda não foi consultado e o TMDB estiver fora
+DEFAULT_IMAGE_CONFIG = {
+    'secure_base_url': 'https://image.tmdb.org/t/p/',
+    'poster_sizes': ['w92', 'w154', 'w185', 'w342', 'w500', 'w780', 'original'],
+    'backdrop_sizes': ['w300', 'w780', 'w1280', 'original'],
+    'still_sizes': ['w92', 'w185', 'w300', 'original'],
+    'profile_sizes': ['w45', 'w185', 'h632', 'original'],
+    'logo_sizes': ['w45', 'w92', 'w154', 'w185', 'w300', 'w500', 'original'],
+}
+
+# Colunas de imagem de cada tabela -> tipo de imagem do TMDB, na ordem em
+# que entram em imageUrls
+IMAGE_COLUMNS = (
+    ('posterpath', 'poster'),
+    ('backdroppath', 'backdrop'),
+    ('stillpath', 'still'),
+)
+
+# URLs completas gravadas por versões anteriores ("https://image.tmdb.org/t/p/w500/abc.jpg")
+_RE_LEGACY_URL = re.compile(r'^https?://image\.tmdb\.org/t/p/[^/]+(/.+)$')
+_RE_SIZE = re.compile(r'^[wh]?(\d+)$')
+
+
+def raw_image_path(path_or_url):
+    """Caminho cru do TMDB, aceitando também URLs completas antigas."""
+    if not path_or_url:
+        return None
+    match = _RE_LEGACY_URL.match(path_or_url)
+    return match.group(1) if match else path_or_url
+
+
+class TMDBImageConfig:
+    """Tamanhos de imagem válidos do TMDB (com cache) e montagem das URLs."""
+
+    def __init__(self, cache=None, tmdb=None, ttl=TMDB_CONFIG_TTL):
+        self.cache = cache
+        self.tmdb = tmdb
+        self.ttl = ttl
+        self._config = None
+        self._expires_at = 0
+        # Protege só o estado em memória (nunca é mantido durante I/O)
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _cached(self):
+        """Configuração do cache compartilhado, ou None."""
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(TMDB_CONFIG_CACHE_KEY) or None
+        except Exception as e:
+            print(f"Erro ao ler a configuração de imagens do cache: {e}")
+            return None
+
+    def _load(self):
+        """cache compartilhado -> /configuration do TMDB -> None (valores padrão)."""
+        cached = self._cached()
+        if cached:
+            return cached
+        if self.tmdb is not None:
+            try:
+                images = self.tmdb.fetch_configuration()['images']
+                config = {key: images[key] for key in DEFAULT_IMAGE_CONFIG if key in images}
+                if self.cache is not None:
+                    self.cache.set(TMDB_CONFIG_CACHE_KEY, config, ttl=self.ttl)
+                return config
+            except Exception as e:
+                print(f"Erro ao buscar configuração de imagens do TMDB (usando padrão): {e}")
+        return None
+
+    def _refresh(self):
+        """Thread em segundo plano: recarrega a configuração (cache ou TMDB)."""
+        try:
+            self.prime(self._load())
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def images(self):
+        """
+        Configuração de imagens atual. Vencida, é recarregada em segundo plano
+        e, até lá, vale a anterior (ou a padrão).
+        """
+        config = self._config
+        if config is not None and time.monotonic() < self._expires_at:
+            return config
+        if config is None:
+            # Primeiro uso no processo: o cache compartilhado é uma leitura local e rápida
+            cached = self._cached()
+            self.prime(cached)
+            if cached:
+                return self._config
+        if self.tmdb is None:
+            return self._config  # Nada a buscar (ex: async_api, que usa prime())
+        with self._lock:
+            if self._refreshing:
+                return self._config
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='tmdb-image-config', daemon=True).start()
+        return self._config
+
+    def prime(self, config):
+        """Usa uma configuração já lida do cache (ex: pelo async_api, sem bloquear o loop)."""
+        with self._lock:
+            self._config = {**DEFAULT_IMAGE_CONFIG, **(config or {})}
+            # Sem configuração real, tenta de novo em breve em vez de esperar o TTL todo
+            self._expires_at = time.monotonic() + (self.ttl if config else TMDB_CONFIG_RETRY)
+
+    def sizes(self, kind):
+        return self.images().get(f'{kind}_sizes') or DEFAULT_IMAGE_CONFIG['poster_sizes']
+
+    def snap_size(self, kind, size=None):
+        """
+        Converte a dica do cliente ('w342', '342', 342, 'original') no menor
+        tamanho válido daquele tipo que a cobre.
+        """
+        sizes = self.sizes(kind)
+        size = str(size or DEFAULT_IMAGE_SIZE).strip().lower()
+        if size in sizes:
+            return size
+        match = _RE_SIZE.match(size) or _RE_SIZE.match(DEFAULT_IMAGE_SIZE)
+        wanted = int(match.group(1))
+        widths = [(int(s[1:]), s) for s in sizes if s.startswith('w') and s[1:].isdigit()]
+        for width, name in sorted(widths):
+            if width >= wanted:
+                return name
+        return 'original' if 'original' in sizes else sizes[-1]
+
+    def build_url(self, path, kind='poster', size=None):
+        """URL completa da imagem no tamanho pedido, ou None se não houver caminho."""
+        path = raw_image_path(path)
+        if not path:
+            return None
+        if not path.startswith('/'):
+            return path  # Não é uma imagem do TMDB (ex: logo de canal)
+        return f"{self.images()['secure_base_url']}{self.snap_size(kind, size)}{path}"
+
+    def apply_to_rows(self, rows, size=None):
+        """
+        Preenche imageUrls (string separada por vírgula, como antes) nas linhas
+        de filmes/séries/temporadas/episódios com URLs no tamanho pedido.
+        """
+        for row in rows:
+            urls = [self.build_url(row.get(column), kind, size)
+                    for column, kind in IMAGE_COLUMNS if row.get(column)]
+            row['imageurls'] = ','.join(url for url in urls if url)
+        return rows
@@ -2,6 +2,11 @@ import re
 import psycopg2
 import sys
 
+try:
+    from tv_multimidia.catalog_events import SCOPE_CHANNELS, publish_catalog_change
+except ImportError:  # Executado de dentro da pasta tv_multimidia/
+    from catalog_events import SCOPE_CHANNELS, publish_catalog_change
+
 # --- 1. CONFIGURAÇÕES ---
 
 # Caminho para o arquivo M3U
@@ -142,7 +147,9 @@ def update_channel_logos(db, logo_map):
                 if idx % 100 == 0 or idx == total:
                     print(f"Progresso: {idx}/{total} canais verificados...")
 
-            # Commita todas as atualizações de uma vez
+            # Avisa as instâncias da API e commita todas as atualizações de uma vez
+            if updated:
+                publish_catalog_change(cursor, SCOPE_CHANNELS)
             db.commit()
 
     except Exception as e: